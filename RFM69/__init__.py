@@ -4,4 +4,5 @@ from .registers import RF69_868MHZ as FREQ_868MHZ
 from .registers import RF69_915MHZ as FREQ_915MHZ
 from .registers import RF69_MAX_DATA_LEN
 from .radio import Radio
+from .exceptions import RadioTimeoutError, DutyCycleExceededError
 from .packet import Packet
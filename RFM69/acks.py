@@ -0,0 +1,180 @@
+import collections
+
+from .registers import RF69_ACK_TIMEOUT_INITIAL_S, RF69_ACK_TIMEOUT_MIN_S, RF69_ACK_TIMEOUT_MAX_S
+
+SEQUENCE_MAX = 255
+
+CTL_ACK_SENT = 0x80
+CTL_ACK_REQUESTED = 0x40
+# A sequence number byte from 1 to 255 follows the header, which acks echo back. LowPowerLab
+# nodes never set this bit: they keep 0x20 for ack RSSI requests and bits 3-0 for addressing.
+CTL_SEQUENCE = 0x10
+# The high two bits of 10-bit target and sender addresses, as LowPowerLab nodes send them
+CTL_TARGET_HIGH = 0x0C
+CTL_SENDER_HIGH = 0x03
+
+AckRecord = collections.namedtuple('AckRecord', 'node sequence rtt attempts')
+AckRecord.__doc__ = """An acknowledged frame: node ID, sequence number, round trip time in
+seconds from the end of the last transmission to the ack, and number of transmissions"""
+
+
+class _Pending:
+    # pylint: disable=too-few-public-methods
+    __slots__ = 'callback', 'sentAt', 'attempts'
+
+    def __init__(self, callback):
+        self.callback = callback
+        self.sentAt = None
+        self.attempts = 0
+
+
+class RttEstimator:
+    """Smoothed round trip time to one node, as TCP estimates it (RFC 6298).
+
+    The ack timeout is the smoothed RTT plus four times its mean deviation,
+    so it stays close to the RTT on a steady link and widens when acks
+    arrive irregularly, bounded by RF69_ACK_TIMEOUT_MIN_S and
+    RF69_ACK_TIMEOUT_MAX_S.
+
+    Attributes:
+        srtt (float): Smoothed round trip time in seconds, or None before the first sample
+        rttvar (float): Mean deviation of the round trip time in seconds
+        samples (int): Number of round trip times measured
+    """
+
+    ALPHA = 1 / 8
+    BETA = 1 / 4
+    K = 4
+
+    def __init__(self):
+        self.srtt = None
+        self.rttvar = None
+        self.samples = 0
+
+    def sample(self, rtt):
+        """Update the estimate with a measured round trip time in seconds"""
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar += self.BETA * (abs(self.srtt - rtt) - self.rttvar)
+            self.srtt += self.ALPHA * (rtt - self.srtt)
+        self.samples += 1
+
+    @property
+    def timeout(self):
+        """Seconds to wait for an ack"""
+        if self.srtt is None:
+            return RF69_ACK_TIMEOUT_INITIAL_S
+        return min(max(self.srtt + self.K * self.rttvar, RF69_ACK_TIMEOUT_MIN_S), RF69_ACK_TIMEOUT_MAX_S)
+
+
+class AckTracker:
+    """Frames waiting for acknowledgement, keyed by (node, sequence number).
+
+    Each outstanding frame has its own callback, so an ack wakes only the
+    sender of the frame it acknowledges. Frames are numbered only for the
+    nodes in :attr:`sequenced_nodes`, which have shown they read the
+    sequence byte. An ack without one, from any other node, is matched to
+    the oldest unnumbered frame outstanding to that node. Once an
+    unnumbered frame has been given up on, the first unnumbered ack from
+    its node within RF69_ACK_TIMEOUT_MAX_S of its last transmission is
+    taken to be the late ack for it and ignored, so it can't satisfy the
+    next frame; at worst that frame is sent again. Acks that match nothing
+    are counted in :attr:`unmatched` and otherwise ignored.
+
+    Round trip times feed a per-node :class:`RttEstimator`. Frames that
+    were retransmitted are left out, since the ack could be for any of the
+    attempts (Karn's algorithm).
+
+    Args:
+        history (int): Number of acknowledged frames to keep in :attr:`records`
+
+    Attributes:
+        records (collections.deque): The most recent AckRecord entries, oldest first
+        unmatched (int): Number of acks that matched no outstanding frame
+        rtt (dict): RttEstimator for each node that has acknowledged a frame
+        sequenced_nodes (set): Nodes configured as sequencePeers or that have sent a frame
+            with the sequence byte
+    """
+
+    def __init__(self, history=256):
+        self.records = collections.deque(maxlen=history)
+        self.unmatched = 0
+        self.rtt = {}
+        self.sequenced_nodes = set()
+        self._outstanding = {}
+        self._sequence = {}
+        self._stale = {}
+
+    def next_sequence(self, node):
+        """Returns the next sequence number, from 1 to SEQUENCE_MAX, for frames to node"""
+        sequence = self._sequence.get(node, 0) % SEQUENCE_MAX + 1
+        self._sequence[node] = sequence
+        return sequence
+
+    def timeout(self, node):
+        """Returns the ack timeout for frames to node in seconds, see RttEstimator"""
+        estimator = self.rtt.get(node)
+        return RF69_ACK_TIMEOUT_INITIAL_S if estimator is None else estimator.timeout
+
+    def expect(self, node, sequence, callback):
+        """Start waiting for an ack
+
+        Args:
+            node (int): Node the frame was sent to
+            sequence (int): Sequence number of the frame, or 0 if it has none
+            callback (function): Called with the AckRecord when the ack arrives
+        """
+        self._outstanding.setdefault(node, collections.OrderedDict())[sequence] = _Pending(callback)
+
+    def sent(self, node, sequence, when):
+        """Record that a (re)transmission of an outstanding frame finished at time when"""
+        pending = self._outstanding[node][sequence]
+        pending.sentAt = when
+        pending.attempts += 1
+
+    def forget(self, node, sequence):
+        """Stop waiting for an ack"""
+        frames = self._outstanding.get(node)
+        if frames is not None:
+            pending = frames.pop(sequence, None)
+            if not frames:
+                del self._outstanding[node]
+            if pending is not None and not sequence and pending.sentAt is not None:
+                # An ack without a sequence number could still be on its way
+                self._stale[node] = pending.sentAt + RF69_ACK_TIMEOUT_MAX_S
+
+    def received(self, node, sequence, when):
+        """Match an incoming ack and call the waiting frame's callback
+
+        Args:
+            node (int): Node the ack came from
+            sequence (int): Sequence number echoed in the ack, or 0
+            when (float): time.monotonic() value when the ack arrived
+
+        Returns:
+            AckRecord: The acknowledged frame, or None if the ack matched nothing
+        """
+        frames = self._outstanding.get(node)
+        if not sequence and self._stale.pop(node, 0) > when:
+            frames = None
+        if frames and sequence in frames:
+            pending = frames.pop(sequence)
+        elif frames and sequence == 0 and 0 in frames:
+            pending = frames.pop(0)
+        else:
+            self.unmatched += 1
+            return None
+        if not frames:
+            del self._outstanding[node]
+        rtt = None if pending.sentAt is None else when - pending.sentAt
+        if rtt is not None and pending.attempts == 1:
+            self.rtt.setdefault(node, RttEstimator()).sample(rtt)
+        record = AckRecord(node, sequence, rtt, pending.attempts)
+        self.records.append(record)
+        pending.callback(record)
+        return record
+
+    def __len__(self):
+        return sum(len(frames) for frames in self._outstanding.values())
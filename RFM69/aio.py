@@ -0,0 +1,118 @@
+import asyncio
+import collections
+
+# AsyncRadio hooks into the radio's receive path
+# pylint: disable=protected-access
+
+
+class AsyncRadio:
+    """asyncio interface to a :class:`RFM69.Radio`.
+
+    Received packets are handed from the interrupt thread to the event loop
+    with ``call_soon_threadsafe``, which wakes the coroutines waiting for
+    them directly. Messages are sent by the radio's transmit thread, see
+    :meth:`RFM69.Radio.send_async`, and awaited through the future it
+    returns. Packets that arrive while no coroutine is waiting are kept in
+    the radio's receive queue, where :meth:`RFM69.Radio.get_packets` can
+    still read them.
+
+    Must be created while the event loop is running, and before layers
+    that take some of the radio's packets, such as
+    :class:`RFM69.fragment.FragmentTransport`, which pass the rest on to it.
+    The radio is not shut down by :meth:`close`, it belongs to the caller::
+
+        with Radio(FREQ_433MHZ, 1) as radio:
+            async with AsyncRadio(radio) as aradio:
+                async for packet in aradio.packets():
+                    ...
+
+    Args:
+        radio (Radio): The radio to drive.
+    """
+
+    def __init__(self, radio):
+        self.radio = radio
+        self._loop = asyncio.get_running_loop()
+        self._packetWaiters = collections.deque()
+        self._closed = False
+        self._nextSink = radio._packetSink
+        # Bound once, so close can tell whether the radio still hands packets to this object
+        self._sink = self._packetFromThread
+        radio._packetSink = self._sink
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        self.close()
+
+    def close(self):
+        """Stop handing packets to the event loop and cancel pending waits"""
+        self._closed = True
+        if self.radio._packetSink is self._sink:
+            self.radio._packetSink = self._nextSink
+        for waiter in self._packetWaiters:
+            waiter.cancel()
+        self._packetWaiters.clear()
+
+    async def send(self, toAddress, buff="", **kwargs):
+        """Send a message without blocking the event loop
+
+        Takes the same arguments as :meth:`RFM69.Radio.send`.
+
+        Returns:
+            bool: If acknowledgement received or None is no acknowledgement requested
+        """
+        return await asyncio.wrap_future(self.radio.send_async(toAddress, buff, **kwargs))
+
+    async def get_packet(self, timeout=None):
+        """Wait for a packet
+
+        Args:
+            timeout (float): Seconds to wait. Set to None to wait forever
+
+        Returns:
+            Packet: The oldest packet received, or None if none arrived in time
+        """
+        with self.radio._packetLock:
+            if len(self.radio._packets) > 0:
+                return self.radio._packets.popleft()
+        waiter = self._loop.create_future()
+        self._packetWaiters.append(waiter)
+        try:
+            return await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            if waiter in self._packetWaiters:
+                self._packetWaiters.remove(waiter)
+
+    async def packets(self):
+        """Asynchronous iterator over received packets, waiting for each one"""
+        while True:
+            yield await self.get_packet()
+
+    def _packetFromThread(self, packet):
+        if self._closed:
+            # Still handed packets by a layer added after this one
+            self._passOn(packet)
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._onPacket, packet)
+        except RuntimeError:
+            # The loop is closed, keep the packet for the blocking API
+            self._passOn(packet)
+
+    def _passOn(self, packet):
+        if self._nextSink is not None:
+            self._nextSink(packet)
+        else:
+            self.radio._queuePacket(packet)
+
+    def _onPacket(self, packet):
+        while self._packetWaiters:
+            waiter = self._packetWaiters.popleft()
+            if not waiter.done():
+                waiter.set_result(packet)
+                return
+        self.radio._queuePacket(packet)
@@ -1,5 +1,6 @@
 
 from .registers import *
+from .modem import get_profile
 
 frfMSB = {RF69_315MHZ: RF_FRFMSB_315, RF69_433MHZ: RF_FRFMSB_433,
           RF69_868MHZ: RF_FRFMSB_868, RF69_915MHZ: RF_FRFMSB_915}
@@ -9,8 +10,8 @@ frfLSB = {RF69_315MHZ: RF_FRFLSB_315, RF69_433MHZ: RF_FRFLSB_433,
           RF69_868MHZ: RF_FRFLSB_868, RF69_915MHZ: RF_FRFLSB_915}
 
 # pylint: disable=missing-function-docstring
-def get_config(freqBand, networkID):
-    return {
+def get_config(freqBand, networkID, longPackets=False, profile=None):
+    config = {
         0x01: [REG_OPMODE, RF_OPMODE_SEQUENCER_ON | RF_OPMODE_LISTEN_OFF | RF_OPMODE_STANDBY],
         #no shaping
         0x02: [REG_DATAMODUL, RF_DATAMODUL_DATAMODE_PACKET | RF_DATAMODUL_MODULATIONTYPE_FSK | RF_DATAMODUL_MODULATIONSHAPING_00],
@@ -63,3 +64,12 @@ def get_config(freqBand, networkID):
         0x6F: [REG_TESTDAGC, RF_DAGC_IMPROVED_LOWBETA0],
         0x00: [255, 0]
     }
+    if longPackets:
+        # Accept frames longer than the FIFO, and raise FifoLevel while more than half of it is in use
+        config[0x38] = [REG_PAYLOADLENGTH, RF69_LONG_PACKET_LEN]
+        config[0x3C] = [REG_FIFOTHRESH, RF_FIFOTHRESH_TXSTART_FIFONOTEMPTY | RF69_LONG_FIFO_THRESHOLD]
+    if profile is not None:
+        # Bitrate, deviation, bandwidths, RX restart delay and DAGC from RFM69.modem
+        for reg, value in get_profile(profile, freqBand).registers.items():
+            config[reg] = [reg, value]
+    return config
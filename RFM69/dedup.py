@@ -0,0 +1,65 @@
+import collections
+
+from .registers import RF69_DEDUP_EXPIRY_S
+
+
+class DuplicateFilter:
+    """Recently received frames, to recognise retransmissions.
+
+    When an ack is lost the sender retransmits a frame that was already
+    received. Frames carrying the sequence byte (see RFM69.acks) are
+    remembered by (sender, sequence number) together with a hash of the
+    payload, and a frame matching one seen less than expiry seconds ago
+    is a duplicate. Frames without one are never checked, since a node
+    may send the same payload twice on purpose. The payload hash keeps a
+    sender that restarts its numbering from having new frames taken for
+    duplicates.
+
+    Lookups and insertions are O(1). The least recently seen entry is
+    discarded once capacity entries are held, so memory use is bounded.
+
+    Args:
+        capacity (int): Maximum number of frames remembered
+        expiry (float): Seconds after which a frame is forgotten
+
+    Attributes:
+        duplicates (int): Number of duplicate frames recognised
+    """
+
+    def __init__(self, capacity=256, expiry=RF69_DEDUP_EXPIRY_S):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.expiry = expiry
+        self.duplicates = 0
+        self._seen = collections.OrderedDict()
+
+    def seen(self, sender, sequence, payload, now):
+        """Record a received frame and check whether it is a duplicate
+
+        Args:
+            sender (int): Node the frame came from
+            sequence (int): Sequence number of the frame, which must not be 0
+            payload: The frame's data, as bytes or a list of ints
+            now (float): time.monotonic() value when the frame arrived
+
+        Returns:
+            bool: True if the same frame was received less than expiry seconds ago
+        """
+        key = (sender, sequence)
+        digest = hash(bytes(payload))
+        previous = self._seen.pop(key, None)
+        self._seen[key] = (now, digest)
+        if previous is not None and previous[1] == digest and now - previous[0] < self.expiry:
+            self.duplicates += 1
+            return True
+        if len(self._seen) > self.capacity:
+            self._seen.popitem(last=False)
+        return False
+
+    def clear(self):
+        """Forget every frame"""
+        self._seen.clear()
+
+    def __len__(self):
+        return len(self._seen)
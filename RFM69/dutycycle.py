@@ -0,0 +1,164 @@
+import collections
+import math
+import threading
+import time
+
+from .exceptions import DutyCycleExceededError
+from .registers import RF69_DUTY_CYCLE_WINDOW_S
+
+DELAY = 'delay'
+REJECT = 'reject'
+
+SubBand = collections.namedtuple('SubBand', 'low high limit')
+SubBand.__doc__ = """A frequency range from low (inclusive) to high (exclusive) in Hz, and the
+fraction of the time a transmitter in it may be on the air"""
+
+# Sub-bands of the 868 MHz band for non-specific short range devices without listen before
+# talk, from ETSI EN 300 220-2 and ERC Recommendation 70-03 annex 1
+SUB_BANDS_868 = (
+    SubBand(863000000, 865000000, 0.001),
+    SubBand(865000000, 868000000, 0.01),
+    SubBand(868000000, 868600000, 0.01),
+    SubBand(868700000, 869200000, 0.001),
+    SubBand(869400000, 869650000, 0.1),
+    SubBand(869700000, 870000000, 0.01),
+)
+
+
+def frame_airtime(length, bitrate, preamble=3, sync=2, crc=True, aes=False):
+    """Time in seconds to transmit a frame in packet mode
+
+    Args:
+        length (int): Bytes written to the FIFO, including the length byte
+        bitrate (float): Bits per second
+        preamble (int): Preamble bytes
+        sync (int): Sync word bytes, or 0 if the sync word is off
+        crc (bool): A two byte CRC follows the frame
+        aes (bool): The frame is encrypted, which pads it after the length byte to whole 16 byte blocks
+
+    Returns:
+        float: Airtime in seconds
+    """
+    if aes:
+        length = 1 + -(-(length - 1) // 16) * 16
+    return (preamble + sync + length + (2 if crc else 0)) * 8 / bitrate
+
+
+class DutyCycleBudget:
+    """Airtime used in each sub-band over a sliding window.
+
+    Regulations such as ETSI EN 300 220 limit the fraction of time a
+    transmitter may be on the air in each sub-band, measured over an
+    hour. The budget charges every transmission's airtime to the sub-band
+    its carrier frequency falls in and forgets it once it is window seconds
+    old. Frequencies outside every sub-band are not limited.
+
+    When a sub-band's budget is used up the policy decides what happens to
+    the next frame: ``delay`` holds it back until enough earlier
+    transmissions have left the window, ``reject`` fails it with
+    :class:`RFM69.DutyCycleExceededError`.
+
+    Args:
+        bands (list): SubBand entries, which must not overlap. Defaults to SUB_BANDS_868.
+        window (float): Seconds over which the duty cycle is measured. Defaults to RF69_DUTY_CYCLE_WINDOW_S.
+        policy (str): DELAY or REJECT. Defaults to DELAY.
+
+    Attributes:
+        delayed (int): Number of frames held back because the budget was used up
+        rejected (int): Number of frames refused
+    """
+
+    def __init__(self, bands=SUB_BANDS_868, window=RF69_DUTY_CYCLE_WINDOW_S, policy=DELAY):
+        if policy not in (DELAY, REJECT):
+            raise ValueError("Unknown duty cycle policy {!r}".format(policy))
+        self.bands = tuple(bands)
+        self.window = window
+        self.policy = policy
+        self.delayed = 0
+        self.rejected = 0
+        # Per sub-band, a deque of (time, airtime) and the airtime it adds up to
+        self._history = {band: collections.deque() for band in self.bands}
+        self._used = dict.fromkeys(self.bands, 0.0)
+        self._lock = threading.Lock()
+
+    def band(self, frequency):
+        """Returns the SubBand containing frequency in Hz, or None"""
+        for band in self.bands:
+            if band.low <= frequency < band.high:
+                return band
+        return None
+
+    def budget(self, frequency):
+        """Returns the airtime in seconds allowed per window at frequency in Hz"""
+        band = self.band(frequency)
+        return math.inf if band is None else band.limit * self.window
+
+    def used(self, frequency, now=None):
+        """Returns the airtime in seconds used in the window at frequency in Hz"""
+        band = self.band(frequency)
+        if band is None:
+            return 0.0
+        with self._lock:
+            return self._expire(band, time.monotonic() if now is None else now)
+
+    def remaining(self, frequency, now=None):
+        """Returns the airtime in seconds still available in the window at frequency in Hz"""
+        return max(self.budget(frequency) - self.used(frequency, now), 0.0)
+
+    def reserve(self, frequency, airtime, now=None):
+        """Charge a transmission to its sub-band if the budget allows it
+
+        Args:
+            frequency (int): Carrier frequency in Hz
+            airtime (float): Seconds the transmission takes
+            now (float): time.monotonic() value. Defaults to the current time.
+
+        Returns:
+            float: 0 if the airtime was charged, otherwise the seconds until it fits in the budget
+
+        Raises:
+            RFM69.DutyCycleExceededError: If the policy is REJECT and the budget is used up, or
+                if the transmission is longer than the whole budget
+        """
+        band = self.band(frequency)
+        if band is None:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        budget = band.limit * self.window
+        with self._lock:
+            excess = self._expire(band, now) + airtime - budget
+            if excess <= 0:
+                self._history[band].append((now, airtime))
+                self._used[band] += airtime
+                return 0.0
+            if self.policy == REJECT or airtime > budget:
+                self.rejected += 1
+                raise DutyCycleExceededError(
+                    "{:.3f} s of airtime left at {} Hz, the frame needs {:.3f} s".format(
+                        max(budget - self._used[band], 0.0), frequency, airtime))
+            # The frame fits once the oldest transmissions adding up to the excess have expired
+            fitsAt = now
+            for sentAt, used in self._history[band]:
+                excess -= used
+                fitsAt = sentAt + self.window
+                if excess <= 0:
+                    break
+            self.delayed += 1
+            return fitsAt - now
+
+    def clear(self):
+        """Forget every transmission"""
+        with self._lock:
+            for band in self.bands:
+                self._history[band].clear()
+                self._used[band] = 0.0
+
+    def _expire(self, band, now):
+        # Must be called with the lock held. Returns the airtime used in the window.
+        history = self._history[band]
+        while history and history[0][0] + self.window <= now:
+            self._used[band] -= history.popleft()[1]
+        if not history:
+            # Don't let rounding errors accumulate
+            self._used[band] = 0.0
+        return self._used[band]
@@ -0,0 +1,562 @@
+import heapq
+import itertools
+import threading
+import time
+
+from .registers import *
+from .transport import MemoryTransport
+from .dutycycle import frame_airtime
+
+# Register values after power on or a hard reset, from the SX1231 datasheet
+POWER_ON_REGISTERS = {
+    REG_OPMODE: 0x04, REG_BITRATEMSB: 0x1A, REG_BITRATELSB: 0x0B, REG_FDEVMSB: 0x00,
+    REG_FDEVLSB: 0x52, REG_FRFMSB: 0xE4, REG_FRFMID: 0xC0, REG_FRFLSB: 0x00, REG_OSC1: 0x41,
+    REG_LISTEN1: 0x92, REG_LISTEN2: 0xF5, REG_LISTEN3: 0x20, REG_VERSION: 0x24, REG_PALEVEL: 0x9F,
+    REG_PARAMP: 0x09, REG_OCP: 0x1A, REG_AGCREF: 0x40, REG_AGCTHRESH1: 0xB0, REG_AGCTHRESH2: 0x7B,
+    REG_AGCTHRESH3: 0x9B, REG_LNA: 0x08, REG_RXBW: 0x86, REG_AFCBW: 0x8A, REG_OOKPEAK: 0x40,
+    REG_OOKAVG: 0x80, REG_OOKFIX: 0x06, REG_AFCFEI: 0x10, REG_RSSICONFIG: 0x02,
+    REG_RSSIVALUE: 0xFF, REG_DIOMAPPING2: 0x07, REG_IRQFLAGS1: 0x80, REG_RSSITHRESH: 0xE4,
+    REG_PREAMBLELSB: 0x03, REG_SYNCCONFIG: 0x98, REG_SYNCVALUE1: 0x01, REG_SYNCVALUE2: 0x01,
+    REG_SYNCVALUE3: 0x01, REG_SYNCVALUE4: 0x01, REG_SYNCVALUE5: 0x01, REG_SYNCVALUE6: 0x01,
+    REG_SYNCVALUE7: 0x01, REG_SYNCVALUE8: 0x01, REG_PACKETCONFIG1: 0x10, REG_PAYLOADLENGTH: 0x40,
+    REG_FIFOTHRESH: 0x0F, REG_PACKETCONFIG2: 0x02, REG_TEMP1: 0x01, REG_TESTPA1: 0x55,
+    REG_TESTPA2: 0x70, REG_TESTDAGC: 0x00,
+}
+
+# Approximate time in seconds for the mode to become ready when entering it from standby
+MODE_READY_DELAYS = {
+    RF_OPMODE_SLEEP: 0.0,
+    RF_OPMODE_STANDBY: 0.0,
+    RF_OPMODE_SYNTHESIZER: 60e-6,
+    RF_OPMODE_RECEIVER: 120e-6,
+    RF_OPMODE_TRANSMITTER: 80e-6,
+}
+# Extra time for the crystal oscillator to start when leaving sleep mode
+OSCILLATOR_STARTUP = 250e-6
+TEMPERATURE_MEASUREMENT_TIME = 100e-6
+RC_CALIBRATION_TIME = 1e-3
+FXOSC = RF69_FXOSC
+# Frames longer than the FIFO move between it and the air in chunks of this many bytes
+STREAM_CHUNK = 8
+
+
+class Emulator(MemoryTransport):
+    """Register-level emulator of an SX1231 based RFM69 module.
+
+    The emulator is a transport, so it plugs into :class:`RFM69.Radio`
+    where spidev and RPi.GPIO would be used and runs the driver unmodified.
+    It implements the operating mode state machine with ModeReady timing,
+    the 66 byte FIFO with overrun, IRQFLAGS1/2, the DIO0 mapping for packet
+    mode, frames longer than the FIFO streamed through it at the bitrate
+    (with underrun in TX and overrun in RX), AES on/off, RSSI sampling, temperature measurement and RC
+    calibration. Transmissions take the airtime given by the configured
+    bitrate, preamble, sync word and CRC, and DIO0 fires on the rising edge
+    of whatever signal it is mapped to.
+
+    Delays run on a timer thread against the real clock, scaled by
+    time_scale. A time_scale of 0 makes everything instantaneous.
+    Emulators added to a :class:`RFM69.medium.Medium` transmit to and
+    receive from each other; otherwise frames are only recorded in
+    :attr:`sent` and received through :meth:`receive`.
+
+    Args:
+        temperature (int): Die temperature reported to read_temperature, in centigrade.
+        rssi (int): Signal strength of received frames in dBm, unless given to receive().
+        noise_floor (int): Signal strength reported while the channel is idle, in dBm.
+        time_scale (float): Multiplier applied to all chip timings. Defaults to 1.
+
+    Attributes:
+        sent (list): Frames transmitted so far, as bytes
+        dropped (int): Frames that arrived while the receiver could not take them, or
+            that overran the FIFO
+        underruns (int): Long frames abandoned because the FIFO ran empty during TX
+        medium (Medium): The shared channel this emulator is attached to, if any
+    """
+
+    def __init__(self, temperature=25, rssi=-60, noise_floor=-110, time_scale=1.0):
+        super().__init__()
+        self.temperature = temperature
+        self.rssi = rssi
+        self.noise_floor = noise_floor
+        self.time_scale = time_scale
+        self.dropped = 0
+        self.underruns = 0
+        self.channel_rssi = noise_floor
+        self.medium = None
+
+        self._lock = threading.RLock()
+        self._timers = []
+        self._timerSeq = itertools.count()
+        self._timerCond = threading.Condition(self._lock)
+        self._timerThread = None
+        self._closed = False
+
+        self._modeEpoch = 0
+        self._rxEpoch = 0
+        # (mode epoch, RX epoch) while a frame longer than the FIFO is arriving
+        self._streamIn = None
+        self._streamLength = 0
+        self._transmitting = False
+        self._dio0 = False
+        self._listenSince = None
+        self.reset()
+
+    #
+    # Time keeping
+    #
+
+    def _schedule(self, delay, callback, *args):
+        # Run callback(*args) on the timer thread after delay seconds of chip time
+        with self._lock:
+            due = time.monotonic() + delay * self.time_scale
+            heapq.heappush(self._timers, (due, next(self._timerSeq), callback, args))
+            if self._timerThread is None:
+                self._timerThread = threading.Thread(target=self._run_timers, name="rfm69-emulator",
+                                                     daemon=True)
+                self._timerThread.start()
+            self._timerCond.notify()
+
+    def _run_timers(self):
+        with self._lock:
+            while not self._closed:
+                if not self._timers:
+                    self._timerCond.wait()
+                    continue
+                due, _, callback, args = self._timers[0]
+                remaining = due - time.monotonic()
+                if remaining > 0:
+                    self._timerCond.wait(remaining)
+                    continue
+                heapq.heappop(self._timers)
+                callback(*args)
+
+    def airtime(self, length):
+        """Time in seconds to transmit a frame of length bytes with the current settings
+
+        Args:
+            length (int): Number of bytes written to the FIFO, including the length byte
+
+        Returns:
+            float: Airtime in seconds
+        """
+        regs = self.registers
+        return frame_airtime(length, self.bitrate(), 0, 0, regs[REG_PACKETCONFIG1] & RF_PACKET1_CRC_ON,
+                             regs[REG_PACKETCONFIG2] & RF_PACKET2_AES_ON) + self.preamble_time()
+
+    def bitrate(self):
+        """The configured bitrate in bits per second"""
+        return FXOSC / max((self.registers[REG_BITRATEMSB] << 8) | self.registers[REG_BITRATELSB], 1)
+
+    def preamble_time(self):
+        """Time in seconds from the start of a frame until its sync word has been sent"""
+        regs = self.registers
+        preamble = (regs[REG_PREAMBLEMSB] << 8) | regs[REG_PREAMBLELSB]
+        sync = ((regs[REG_SYNCCONFIG] >> 3) & 0x07) + 1 if regs[REG_SYNCCONFIG] & RF_SYNC_ON else 0
+        return (preamble + sync) * 8 / self.bitrate()
+
+    #
+    # Register access
+    #
+
+    def reset(self):
+        with self._lock:
+            self.registers[:] = bytes(len(self.registers))
+            for addr, value in POWER_ON_REGISTERS.items():
+                self.registers[addr] = value
+            self.fifo.clear()
+            self._modeEpoch += 1
+            self._transmitting = False
+            self._dio0 = False
+            self._listenSince = None
+
+    def _xfer(self, data):
+        with self._lock:
+            result = super()._xfer(data)
+            self._start_transmission()
+            return result
+
+    def _write(self, frame):
+        self._xfer(list(frame))
+
+    def _read_register(self, addr):
+        if addr == REG_RSSIVALUE and self.mode == RF_OPMODE_RECEIVER and \
+                not self.registers[REG_IRQFLAGS2] & RF_IRQFLAGS2_PAYLOADREADY:
+            return self._rssi_register(self._channel_rssi())
+        if addr == REG_IRQFLAGS2:
+            return self._irqflags2()
+        return super()._read_register(addr)
+
+    def _write_register(self, addr, value):
+        if addr == REG_FIFO:
+            if len(self.fifo) < RF69_FIFO_SIZE:
+                self.fifo.append(value)
+            else:
+                self.registers[REG_IRQFLAGS2] |= RF_IRQFLAGS2_FIFOOVERRUN
+            return
+        if addr == REG_IRQFLAGS2:
+            # Writing FifoOverrun clears the FIFO
+            if value & RF_IRQFLAGS2_FIFOOVERRUN:
+                self.fifo.clear()
+                self.registers[REG_IRQFLAGS2] &= ~RF_IRQFLAGS2_FIFOOVERRUN
+            return
+        if addr in (REG_IRQFLAGS1, REG_VERSION, REG_TEMP2, REG_RSSIVALUE):
+            return
+        if addr == REG_OSC1:
+            if value & RF_OSC1_RCCAL_START:
+                self.registers[REG_OSC1] = 0x01
+                self._schedule(RC_CALIBRATION_TIME, self._calibration_done, self._modeEpoch)
+            return
+        if addr == REG_TEMP1:
+            if value & RF_TEMP1_MEAS_START and self.mode in (RF_OPMODE_STANDBY, RF_OPMODE_SYNTHESIZER):
+                self.registers[REG_TEMP1] = (value & 0x03) | RF_TEMP1_MEAS_RUNNING
+                self._schedule(TEMPERATURE_MEASUREMENT_TIME, self._temperature_done)
+            return
+        if addr == REG_RSSICONFIG:
+            if value & RF_RSSI_START:
+                self.registers[REG_RSSIVALUE] = self._rssi_register(self._channel_rssi())
+            self.registers[REG_RSSICONFIG] = RF_RSSI_DONE
+            return
+        if addr == REG_PACKETCONFIG2 and value & RF_PACKET2_RXRESTART:
+            self._restart_rx()
+            value &= ~RF_PACKET2_RXRESTART
+        previous = self.registers[addr]
+        self.registers[addr] = value
+        if addr == REG_OPMODE and (previous ^ value) & 0x1C:
+            self._change_mode(previous & 0x1C)
+        self._update_dio0()
+
+    def _read_fifo(self):
+        if not self.fifo:
+            return 0
+        value = self.fifo.pop(0)
+        if not self.fifo and self.registers[REG_IRQFLAGS2] & RF_IRQFLAGS2_PAYLOADREADY:
+            self.registers[REG_IRQFLAGS2] &= ~(RF_IRQFLAGS2_PAYLOADREADY | RF_IRQFLAGS2_CRCOK)
+            if self.mode == RF_OPMODE_RECEIVER and self.registers[REG_PACKETCONFIG2] & RF_PACKET2_AUTORXRESTART_ON:
+                self._restart_rx()
+            self._update_dio0()
+        return value
+
+    def _irqflags2(self):
+        flags = self.registers[REG_IRQFLAGS2] & ~(RF_IRQFLAGS2_FIFOFULL | RF_IRQFLAGS2_FIFONOTEMPTY |
+                                                  RF_IRQFLAGS2_FIFOLEVEL)
+        if self.fifo:
+            flags |= RF_IRQFLAGS2_FIFONOTEMPTY
+        if len(self.fifo) >= RF69_FIFO_SIZE:
+            flags |= RF_IRQFLAGS2_FIFOFULL
+        if len(self.fifo) > self.registers[REG_FIFOTHRESH] & 0x7F:
+            flags |= RF_IRQFLAGS2_FIFOLEVEL
+        return flags
+
+    def _channel_rssi(self):
+        if self.medium is not None:
+            return self.medium.channel_rssi(self)
+        return self.channel_rssi
+
+    @staticmethod
+    def _rssi_register(rssi):
+        return max(0, min(255, int(-2 * rssi)))
+
+    #
+    # Operating modes
+    #
+
+    def _change_mode(self, previous):
+        self._modeEpoch += 1
+        self._listenSince = None
+        if self._transmitting and self.medium is not None:
+            self.medium.abort(self)
+        self._transmitting = False
+        mode = self.mode
+        flags = self.registers[REG_IRQFLAGS1] & RF_IRQFLAGS1_SYNCADDRESSMATCH
+        self.registers[REG_IRQFLAGS1] = flags if mode == RF_OPMODE_RECEIVER else 0
+        self.registers[REG_IRQFLAGS2] &= ~RF_IRQFLAGS2_PACKETSENT
+        if mode == RF_OPMODE_SLEEP:
+            self.fifo.clear()
+        if mode == RF_OPMODE_RECEIVER:
+            self._restart_rx()
+        delay = MODE_READY_DELAYS[mode]
+        if previous == RF_OPMODE_SLEEP:
+            delay += OSCILLATOR_STARTUP
+        if delay * self.time_scale > 0:
+            self._schedule(delay, self._mode_ready, self._modeEpoch)
+        else:
+            self._mode_ready(self._modeEpoch)
+
+    def _mode_ready(self, epoch):
+        if epoch != self._modeEpoch:
+            return
+        mode = self.mode
+        flags = RF_IRQFLAGS1_MODEREADY
+        if mode == RF_OPMODE_RECEIVER:
+            flags |= RF_IRQFLAGS1_RXREADY | RF_IRQFLAGS1_PLLLOCK
+            self._listenSince = time.monotonic()
+        elif mode == RF_OPMODE_TRANSMITTER:
+            flags |= RF_IRQFLAGS1_TXREADY | RF_IRQFLAGS1_PLLLOCK
+        elif mode == RF_OPMODE_SYNTHESIZER:
+            flags |= RF_IRQFLAGS1_PLLLOCK
+        self.registers[REG_IRQFLAGS1] |= flags
+        self._start_transmission()
+        self._update_dio0()
+
+    def _calibration_done(self, epoch):
+        if epoch == self._modeEpoch:
+            self.registers[REG_OSC1] = 0x01 | RF_OSC1_RCCAL_DONE
+
+    def _temperature_done(self):
+        self.registers[REG_TEMP1] &= ~RF_TEMP1_MEAS_RUNNING
+        # The driver reports (TEMP2 + 1) + COURSE_TEMP_COEF
+        self.registers[REG_TEMP2] = max(0, min(255, self.temperature - COURSE_TEMP_COEF - 1))
+
+    def _dio0_level(self):
+        mapping = self.registers[REG_DIOMAPPING1] & 0xC0
+        mode = self.mode
+        flags1 = self.registers[REG_IRQFLAGS1]
+        flags2 = self.registers[REG_IRQFLAGS2]
+        if mode == RF_OPMODE_RECEIVER:
+            signals = {RF_DIOMAPPING1_DIO0_00: flags2 & RF_IRQFLAGS2_CRCOK,
+                       RF_DIOMAPPING1_DIO0_01: flags2 & RF_IRQFLAGS2_PAYLOADREADY,
+                       RF_DIOMAPPING1_DIO0_10: flags1 & RF_IRQFLAGS1_SYNCADDRESSMATCH,
+                       RF_DIOMAPPING1_DIO0_11: flags1 & RF_IRQFLAGS1_RSSI}
+        elif mode == RF_OPMODE_TRANSMITTER:
+            signals = {RF_DIOMAPPING1_DIO0_00: flags2 & RF_IRQFLAGS2_PACKETSENT,
+                       RF_DIOMAPPING1_DIO0_01: flags1 & RF_IRQFLAGS1_TXREADY,
+                       RF_DIOMAPPING1_DIO0_11: flags1 & RF_IRQFLAGS1_PLLLOCK}
+        elif mode == RF_OPMODE_SYNTHESIZER:
+            signals = {RF_DIOMAPPING1_DIO0_11: flags1 & RF_IRQFLAGS1_PLLLOCK}
+        else:
+            signals = {}
+        return bool(signals.get(mapping, 0))
+
+    def _update_dio0(self):
+        level = self._dio0_level()
+        if level and not self._dio0:
+            self.interrupt()
+        self._dio0 = level
+
+    #
+    # Transmitter
+    #
+
+    def _start_transmission(self):
+        if self._transmitting or self.mode != RF_OPMODE_TRANSMITTER or not self.fifo or \
+                not self.registers[REG_IRQFLAGS1] & RF_IRQFLAGS1_TXREADY:
+            return
+        threshold = self.registers[REG_FIFOTHRESH]
+        if not threshold & RF_FIFOTHRESH_TXSTART_FIFONOTEMPTY and len(self.fifo) <= threshold & 0x7F:
+            return
+        length = self.fifo[0] + 1
+        self._transmitting = True
+        if length > len(self.fifo):
+            # The rest of the frame must be written while the start of it goes out
+            self._schedule(self.preamble_time(), self._stream_out, self._modeEpoch, length, bytearray())
+        else:
+            self._schedule(self.airtime(length), self._transmission_done, self._modeEpoch, length)
+        if self.medium is not None:
+            self.medium.begin(self)
+
+    def _stream_out(self, epoch, length, frame):
+        if epoch != self._modeEpoch:
+            return
+        if not self.fifo:
+            self.underruns += 1
+            if self.medium is not None:
+                self.medium.abort(self)
+            self._finish_transmission(None)
+            return
+        count = min(STREAM_CHUNK, length - len(frame), len(self.fifo))
+        chunk = bytes(self.fifo[:count])
+        frame += chunk
+        del self.fifo[:count]
+        if self.medium is not None:
+            self.medium.stream(self, chunk)
+        delay = count * 8 / self.bitrate()
+        if len(frame) < length:
+            self._schedule(delay, self._stream_out, epoch, length, frame)
+        else:
+            crc = 2 if self.registers[REG_PACKETCONFIG1] & RF_PACKET1_CRC_ON else 0
+            self._schedule(delay + crc * 8 / self.bitrate(), self._stream_done, epoch, frame)
+
+    def _stream_done(self, epoch, frame):
+        if epoch == self._modeEpoch:
+            self._finish_transmission(bytes(frame))
+
+    def _transmission_done(self, epoch, length):
+        if epoch != self._modeEpoch:
+            return
+        frame = bytes(self.fifo[:length])
+        del self.fifo[:length]
+        self._finish_transmission(frame)
+
+    def _finish_transmission(self, frame):
+        # frame is None if it was abandoned
+        self._transmitting = False
+        self.registers[REG_IRQFLAGS2] |= RF_IRQFLAGS2_PACKETSENT
+        if frame is not None:
+            self._transmit(frame)
+        self._update_dio0()
+        self._start_transmission()
+
+    def _transmit(self, frame):
+        self.sent.append(frame)
+        if self.medium is not None:
+            self.medium.end(self, frame, self._aes_key())
+
+    def signature(self):
+        """Settings that must match for two radios to hear each other
+
+        Returns:
+            tuple: Carrier frequency, bitrate and sync word registers
+        """
+        regs = self.registers
+        sync = ((regs[REG_SYNCCONFIG] >> 3) & 0x07) + 1 if regs[REG_SYNCCONFIG] & RF_SYNC_ON else 0
+        return (bytes(regs[REG_FRFMSB:REG_FRFLSB + 1]), bytes(regs[REG_BITRATEMSB:REG_BITRATELSB + 1]),
+                bytes(regs[REG_SYNCVALUE1:REG_SYNCVALUE1 + sync]))
+
+    def listening(self, since=None):
+        """Whether the receiver is ready to detect a sync word
+
+        Args:
+            since (float): If given, the receiver must also have been ready since this
+                time.monotonic() value
+
+        Returns:
+            bool: True if the receiver can pick up a frame
+        """
+        listenSince = self._listenSince
+        return listenSince is not None and (since is None or listenSince <= since)
+
+    #
+    # Receiver
+    #
+
+    def _restart_rx(self):
+        self._rxEpoch += 1
+        if self.mode == RF_OPMODE_RECEIVER and self.registers[REG_IRQFLAGS1] & RF_IRQFLAGS1_RXREADY:
+            self._listenSince = time.monotonic()
+        self.fifo.clear()
+        self.registers[REG_IRQFLAGS1] &= ~RF_IRQFLAGS1_SYNCADDRESSMATCH
+        self.registers[REG_IRQFLAGS2] &= ~(RF_IRQFLAGS2_PAYLOADREADY | RF_IRQFLAGS2_CRCOK |
+                                           RF_IRQFLAGS2_FIFOOVERRUN)
+
+    def _aes_key(self):
+        if self.registers[REG_PACKETCONFIG2] & RF_PACKET2_AES_ON:
+            return bytes(self.registers[REG_AESKEY1:REG_AESKEY16 + 1])
+        return None
+
+    def receive(self, frame, rssi=None, key=None):
+        """Deliver a frame that has just finished arriving over the air
+
+        The frame is dropped unless the receiver is ready and has no unread
+        payload, as on the real chip. Frames longer than the FIFO fill it at
+        once and the rest follows at the bitrate, so they must be drained as
+        they arrive, with PayloadReady set when the last byte is in. If the AES settings of the sender and
+        receiver differ the payload is received scrambled.
+
+        Args:
+            frame (bytes): Complete frame, starting with the length byte
+            rssi (int): Signal strength in dBm. Defaults to the rssi given to the constructor.
+            key (bytes): AES key the frame was sent with, or None if it was sent in the clear
+        """
+        with self._lock:
+            if len(frame) > RF69_FIFO_SIZE and frame[0] <= self.registers[REG_PAYLOADLENGTH]:
+                if self.receive_start(rssi, key):
+                    self._stream_in(bytes(frame), 0)
+                return
+            flags1 = self.registers[REG_IRQFLAGS1]
+            flags2 = self.registers[REG_IRQFLAGS2]
+            if self.mode != RF_OPMODE_RECEIVER or not flags1 & RF_IRQFLAGS1_RXREADY or \
+                    flags1 & RF_IRQFLAGS1_SYNCADDRESSMATCH or \
+                    flags2 & RF_IRQFLAGS2_PAYLOADREADY or not frame or \
+                    frame[0] > self.registers[REG_PAYLOADLENGTH]:
+                self.dropped += 1
+                return
+            frame = bytearray(frame)
+            if key != self._aes_key():
+                # Decrypting with the wrong key (or none) yields noise, the length byte is sent in clear
+                frame[1:] = bytes((value * 167 + 13) & 0xFF for value in frame[1:])
+            self.fifo[:] = frame[:RF69_FIFO_SIZE]
+            self.registers[REG_RSSIVALUE] = self._rssi_register(self.rssi if rssi is None else rssi)
+            self.registers[REG_IRQFLAGS1] = flags1 | RF_IRQFLAGS1_SYNCADDRESSMATCH
+            self.registers[REG_IRQFLAGS2] = flags2 | RF_IRQFLAGS2_PAYLOADREADY | RF_IRQFLAGS2_CRCOK
+            self._listenSince = None
+            self._update_dio0()
+
+    def _stream_in(self, frame, offset):
+        # Feed a frame given to receive() into the FIFO at the bitrate
+        if not self.receive_chunk(frame[offset:offset + STREAM_CHUNK]):
+            return
+        offset += STREAM_CHUNK
+        if offset < len(frame):
+            self._schedule(STREAM_CHUNK * 8 / self.bitrate(), self._stream_in, frame, offset)
+        else:
+            self.receive_end(True)
+
+    def receive_start(self, rssi=None, key=None):
+        """Start receiving a frame longer than the FIFO, which arrives through receive_chunk
+
+        Returns:
+            bool: False if the receiver can't take the frame, as for receive()
+        """
+        with self._lock:
+            flags1 = self.registers[REG_IRQFLAGS1]
+            if self.mode != RF_OPMODE_RECEIVER or not flags1 & RF_IRQFLAGS1_RXREADY or \
+                    flags1 & RF_IRQFLAGS1_SYNCADDRESSMATCH or \
+                    self.registers[REG_IRQFLAGS2] & RF_IRQFLAGS2_PAYLOADREADY or key != self._aes_key():
+                # With AES frames this long can't be sent, so a key mismatch loses the frame
+                self.dropped += 1
+                return False
+            self._streamIn = (self._modeEpoch, self._rxEpoch)
+            self._streamLength = 0
+            self.fifo.clear()
+            self.registers[REG_RSSIVALUE] = self._rssi_register(self.rssi if rssi is None else rssi)
+            self.registers[REG_IRQFLAGS1] = flags1 | RF_IRQFLAGS1_SYNCADDRESSMATCH
+            self._listenSince = None
+            self._update_dio0()
+            return True
+
+    def receive_chunk(self, data):
+        """Append the next bytes of the frame being received to the FIFO
+
+        Returns:
+            bool: False if the frame has been lost, because the FIFO overran,
+            the length byte is over the limit or the receiver was restarted
+        """
+        with self._lock:
+            if self._streamIn != (self._modeEpoch, self._rxEpoch):
+                return False
+            if len(self.fifo) + len(data) > RF69_FIFO_SIZE:
+                # Not drained in time
+                self._lose_stream()
+                self.registers[REG_IRQFLAGS2] |= RF_IRQFLAGS2_FIFOOVERRUN
+                return False
+            if self._streamLength == 0 and data[0] > self.registers[REG_PAYLOADLENGTH]:
+                self._lose_stream()
+                return False
+            self._streamLength += len(data)
+            self.fifo += data
+            return True
+
+    def receive_end(self, ok):
+        """Finish the frame being received, setting PayloadReady, or dropping it if not ok"""
+        with self._lock:
+            if self._streamIn != (self._modeEpoch, self._rxEpoch):
+                return
+            self._streamIn = None
+            if not ok:
+                # A CRC error, the FIFO is cleared and the receiver restarts
+                self._lose_stream()
+                return
+            self.registers[REG_IRQFLAGS2] |= RF_IRQFLAGS2_PAYLOADREADY | RF_IRQFLAGS2_CRCOK
+            self._update_dio0()
+
+    def _lose_stream(self):
+        self._streamIn = None
+        self.dropped += 1
+        self._restart_rx()
+        self._update_dio0()
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            self._timerCond.notify()
+        super().close()
@@ -0,0 +1,6 @@
+class RadioTimeoutError(TimeoutError):
+    """The radio did not reach the expected state before the deadline"""
+
+
+class DutyCycleExceededError(Exception):
+    """Sending the frame would exceed the duty cycle budget of its sub-band"""
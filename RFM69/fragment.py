@@ -0,0 +1,377 @@
+import collections
+import queue
+import random
+import threading
+import time
+import zlib
+
+from .acks import RttEstimator
+from .packetqueue import PacketQueue, DROP_OLDEST
+from .registers import RF69_MAX_DATA_LEN, RF69_LONG_MAX_DATA_LEN, RF69_FRAGMENT_TIMEOUT_S
+from .transmit import PRIORITY_CONTROL, PRIORITY_BULK
+
+# FragmentTransport hooks into the radio's receive path
+# pylint: disable=protected-access
+
+# First payload byte of the frames used by this layer. A poll is a fragment the
+# receiver answers with a SACK.
+FRAG_DATA = 0xF0
+FRAG_POLL = 0xF1
+FRAG_SACK = 0xF2
+
+# [type, message ID, index high, index low, count high, count low]
+FRAGMENT_HEADER_LEN = 6
+# [type, message ID, received high, received low] followed by a bitmap of SACK_BITS
+SACK_BITS = 32
+MAX_WINDOW = SACK_BITS + 1
+
+Message = collections.namedtuple('Message', 'sender data')
+Message.__doc__ = """A reassembled message: sender node ID and the data as bytes"""
+
+
+class _Transfer:
+    # pylint: disable=too-few-public-methods
+    __slots__ = 'acked', 'sacks'
+
+    def __init__(self, count):
+        self.acked = bytearray(count)
+        self.sacks = 0
+
+
+class _Reassembly:
+    # pylint: disable=too-few-public-methods
+    __slots__ = 'messageId', 'fragments', 'received', 'reserved', 'lastActivity'
+
+    def __init__(self, messageId, count, reserved, now):
+        self.messageId = messageId
+        self.fragments = [None] * count
+        self.received = 0
+        self.reserved = reserved
+        self.lastActivity = now
+
+    def contiguous(self):
+        # Number of fragments received without a gap from the first
+        for index, fragment in enumerate(self.fragments):
+            if fragment is None:
+                return index
+        return len(self.fragments)
+
+
+class FragmentTransport:
+    """Messages of up to several KB over a :class:`RFM69.Radio`.
+
+    Messages are split into numbered fragments sent as ordinary frames
+    without link-level acks. The sender keeps up to window fragments in
+    flight and marks the last of each burst as a poll. The receiver answers
+    a poll with a selective acknowledgement (SACK): the number of fragments
+    received without a gap, followed by a bitmap of those received beyond
+    the gap. The sender then sends only the missing fragments and the next
+    ones in the window, so a lost fragment costs one retransmission rather
+    than a stop-and-wait round trip per fragment. If the SACK doesn't come
+    back the poll is sent again, up to retries times in a row. The SACK
+    timeout adapts to the measured poll round trip time, see
+    :class:`RFM69.acks.RttEstimator`.
+
+    The receiver reassembles messages in one buffer per sender. A buffer
+    that has seen no fragment for timeout seconds is discarded, messages
+    larger than maxMessage bytes are refused, and buffers are evicted,
+    least recently active first, to keep the space reserved for all of them
+    under maxBuffered bytes. The space a message needs is worked out from
+    the length of the sender's fragments, which may differ from this end's
+    fragmentSize.
+
+    Each sender numbers its messages to each node from a random starting
+    point. A completed message is remembered for timeout seconds, with a
+    checksum of each fragment, so a fragment retransmitted because its
+    SACK was lost is answered again without delivering the message twice.
+    A fragment with the same message ID whose count or contents differ,
+    from a sender that restarted its numbering, starts a new message.
+
+    Received frames whose first byte is FRAG_DATA, FRAG_POLL or FRAG_SACK
+    are taken by this layer. Other packets are passed on to the radio's
+    receive queue as usual.
+
+    Args:
+        radio (Radio): The radio to send and receive with
+
+    Keyword Args:
+        window (int): Fragments in flight before waiting for a SACK, at most 33. Defaults to 16.
+        retries (int): SACK timeouts in a row before a send fails. Defaults to 5.
+        fragmentSize (int): Message bytes per fragment. Defaults to what fits in RF69_MAX_DATA_LEN,
+            or in RF69_LONG_MAX_DATA_LEN if the radio uses long packets.
+        timeout (float): Seconds a partly received message is kept. Defaults to RF69_FRAGMENT_TIMEOUT_S.
+        maxMessage (int): Largest message accepted, in bytes. Defaults to 16384.
+        maxBuffered (int): Bytes reserved for reassembly across all senders. Defaults to 65536.
+        queueSize (int): Reassembled messages held until they are read. Defaults to 64.
+
+    Attributes:
+        rtt (dict): RttEstimator of the poll round trip time for each node sent to
+        stats (collections.Counter): Counts of fragments 'sent', 'retransmitted' and
+            'received', of 'sacks_sent' and 'sacks_received', and of reassemblies
+            'expired', 'evicted' and 'refused'
+    """
+
+    def __init__(self, radio, **kwargs):
+        self.radio = radio
+        self.window = kwargs.get('window', 16)
+        if not 1 <= self.window <= MAX_WINDOW:
+            raise ValueError("window must be from 1 to {}".format(MAX_WINDOW))
+        self.retries = kwargs.get('retries', 5)
+        maxData = RF69_LONG_MAX_DATA_LEN if radio.long_packets else RF69_MAX_DATA_LEN
+        self.fragmentSize = kwargs.get('fragmentSize', maxData - FRAGMENT_HEADER_LEN)
+        # The longest fragment that fits in a frame this radio receives
+        self._maxFragment = maxData - FRAGMENT_HEADER_LEN
+        self.timeout = kwargs.get('timeout', RF69_FRAGMENT_TIMEOUT_S)
+        self.maxMessage = kwargs.get('maxMessage', 16384)
+        self.maxBuffered = kwargs.get('maxBuffered', 65536)
+        self.rtt = {}
+        self.stats = collections.Counter()
+
+        self._lock = threading.Condition()
+        self._messageIds = {}
+        self._transfers = {}
+        self._reassembly = collections.OrderedDict()
+        # Sender to (message ID, count, fragment checksums, completion time), oldest first
+        self._completed = collections.OrderedDict()
+        self._buffered = 0
+        self._messages = PacketQueue(kwargs.get('queueSize', 64), DROP_OLDEST)
+
+        self._nextSink = radio._packetSink
+        # Bound once, so close can tell whether the radio still hands packets to this transport
+        self._sink = self._onPacket
+        radio._packetSink = self._sink
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """Stop taking fragments from the radio"""
+        if self.radio._packetSink is self._sink:
+            self.radio._packetSink = self._nextSink
+
+    def send(self, toAddress, data):
+        """Send a message, blocking until the receiver has all of it
+
+        Args:
+            toAddress (int): Recipient node's ID
+            data (bytes): The message, up to 65535 fragments long
+
+        Returns:
+            bool: True if every fragment was acknowledged, False if the receiver stopped answering
+
+        Raises:
+            queue.Full: If the radio's bulk transmit queue filled up. The message is abandoned
+                and the fragments of it still queued are not sent.
+        """
+        data = bytes(data)
+        size = self.fragmentSize
+        count = max((len(data) + size - 1) // size, 1)
+        if count > 0xFFFF:
+            raise ValueError("Message too long")
+        with self._lock:
+            messageId = self._messageIds.get(toAddress)
+            # A random start makes it unlikely that a restarted sender reuses the ID of the
+            # message the receiver completed last
+            messageId = random.randrange(256) if messageId is None else (messageId + 1) & 0xFF
+            self._messageIds[toAddress] = messageId
+            transfer = self._transfers[(toAddress, messageId)] = _Transfer(count)
+        estimator = self.rtt.setdefault(toAddress, RttEstimator())
+        sent = bytearray(count)
+        try:
+            base, failures, resend = 0, 0, None
+            while base < count:
+                if resend is None:
+                    burst = [index for index in range(base, min(base + self.window, count))
+                             if not transfer.acked[index]]
+                else:
+                    burst = [resend]
+                with self._lock:
+                    sacks = transfer.sacks
+                futures = []
+                for index in burst:
+                    frameType = FRAG_POLL if index == burst[-1] else FRAG_DATA
+                    chunk = data[index * size:(index + 1) * size]
+                    header = bytes([frameType, messageId, index >> 8, index & 0xFF, count >> 8, count & 0xFF])
+                    try:
+                        futures.append(self._sendFrame(toAddress, header + chunk, PRIORITY_BULK))
+                    except queue.Full as error:
+                        # The rest of the burst would only take up airtime now
+                        for future in futures:
+                            future.cancel()
+                        raise queue.Full("Transmit queue full, abandoned message {} to node {} at fragment {} of {}"
+                                         .format(messageId, toAddress, index + 1, count)) from error
+                    self.stats['retransmitted' if sent[index] else 'sent'] += 1
+                    sent[index] = 1
+                futures[-1].result()
+                polledAt = time.monotonic()
+                with self._lock:
+                    answered = self._lock.wait_for(lambda: transfer.sacks > sacks, estimator.timeout)
+                if answered:
+                    if resend is None:
+                        estimator.sample(time.monotonic() - polledAt)
+                    failures, resend = 0, None
+                    while base < count and transfer.acked[base]:
+                        base += 1
+                else:
+                    failures += 1
+                    if failures > self.retries:
+                        return False
+                    # A SACK for the poll says what else is missing
+                    resend = burst[-1]
+            return True
+        finally:
+            with self._lock:
+                del self._transfers[(toAddress, messageId)]
+
+    def get_message(self, timeout=None):
+        """Wait for a reassembled message
+
+        Args:
+            timeout (float): Seconds to wait. Set to None to wait forever
+
+        Returns:
+            Message: The oldest message received, or None if none arrived in time
+        """
+        with self._lock:
+            if not self._lock.wait_for(lambda: len(self._messages) > 0, timeout):
+                return None
+            return self._messages.popleft()
+
+    def _sendFrame(self, toAddress, payload, priority):
+        if self.radio.raw_frames:
+            payload = bytes([len(payload) + 3, toAddress & 0xFF, self.radio.address,
+                             (toAddress & 0x300) >> 6]) + payload
+        return self.radio.send_async(toAddress, payload, attempts=1, require_ack=False, priority=priority)
+
+    def _onPacket(self, packet):
+        # Called on the interrupt thread for every received packet
+        data = packet.payload
+        if len(data) >= 4 and data[0] == FRAG_SACK:
+            self._onSack(packet.sender, data)
+        elif len(data) >= FRAGMENT_HEADER_LEN and data[0] in (FRAG_DATA, FRAG_POLL):
+            self._onFragment(packet.sender, data)
+        elif self._nextSink is not None:
+            self._nextSink(packet)
+        else:
+            self.radio._queuePacket(packet)
+
+    def _onSack(self, sender, data):
+        messageId, received = data[1], (data[2] << 8) | data[3]
+        with self._lock:
+            transfer = self._transfers.get((sender, messageId))
+            if transfer is None:
+                return
+            acked = transfer.acked
+            acked[:min(received, len(acked))] = bytes([1]) * min(received, len(acked))
+            for byte, bits in enumerate(data[4:4 + SACK_BITS // 8]):
+                for bit in range(8):
+                    index = received + 1 + byte * 8 + bit
+                    if bits & (0x80 >> bit) and index < len(acked):
+                        acked[index] = 1
+            transfer.sacks += 1
+            self.stats['sacks_received'] += 1
+            self._lock.notify_all()
+
+    def _onFragment(self, sender, data):
+        frameType, messageId = data[0], data[1]
+        index, count = (data[2] << 8) | data[3], (data[4] << 8) | data[5]
+        if index >= count:
+            return
+        chunk = data[FRAGMENT_HEADER_LEN:]
+        now = time.monotonic()
+        self.stats['received'] += 1
+        with self._lock:
+            self._expire(now)
+            completed = self._completed.get(sender)
+            if completed is not None and completed[:2] == (messageId, count) and \
+                    completed[2][index] == zlib.crc32(chunk):
+                # A retransmission after the message was complete, whose SACK was lost
+                buffer = None
+            else:
+                buffer = self._buffer(sender, messageId, count, index, len(chunk), now)
+                if buffer is None:
+                    return
+                buffer.lastActivity = now
+                if buffer.fragments[index] is None:
+                    buffer.fragments[index] = chunk
+                    buffer.received += 1
+                if buffer.received == count:
+                    self._release(sender)
+                    self._completed.pop(sender, None)
+                    checksums = [zlib.crc32(fragment) for fragment in buffer.fragments]
+                    self._completed[sender] = (messageId, count, checksums, now)
+                    self._messages.append(Message(sender, b"".join(buffer.fragments)))
+                    self._lock.notify_all()
+                    buffer = None
+        if frameType == FRAG_POLL:
+            self._sendSack(sender, messageId, count if buffer is None else buffer)
+
+    def _buffer(self, sender, messageId, count, index, length, now):
+        # Every fragment but the last is as long as the sender's fragment size
+        sized = index < count - 1
+        buffer = self._reassembly.get(sender)
+        if buffer is not None and buffer.messageId == messageId and len(buffer.fragments) == count:
+            self._reassembly.move_to_end(sender)
+            if sized and buffer.reserved > count * length:
+                # The sender's fragment size is known now, not just its last fragment
+                if (count - 1) * length + 1 > self.maxMessage:
+                    self._release(sender)
+                    self.stats['refused'] += 1
+                    return None
+                self._buffered -= buffer.reserved - count * length
+                buffer.reserved = count * length
+            return buffer
+        if buffer is not None:
+            # The sender has moved on to another message, or restarted its numbering
+            self._release(sender)
+        if sized:
+            reserved, smallest = count * length, (count - 1) * length + 1
+        else:
+            # The last fragment may be shorter than the others, which are no longer than a frame
+            reserved, smallest = (count - 1) * self._maxFragment + length, count * length
+        if smallest > self.maxMessage:
+            self.stats['refused'] += 1
+            return None
+        while self._reassembly and self._buffered + reserved > self.maxBuffered:
+            self._release(next(iter(self._reassembly)))
+            self.stats['evicted'] += 1
+        if self._buffered + reserved > self.maxBuffered:
+            self.stats['refused'] += 1
+            return None
+        buffer = self._reassembly[sender] = _Reassembly(messageId, count, reserved, now)
+        self._buffered += reserved
+        return buffer
+
+    def _release(self, sender):
+        self._buffered -= self._reassembly.pop(sender).reserved
+
+    def _expire(self, now):
+        while self._reassembly:
+            sender, buffer = next(iter(self._reassembly.items()))
+            if now - buffer.lastActivity < self.timeout:
+                break
+            self._release(sender)
+            self.stats['expired'] += 1
+        while self._completed and now - next(iter(self._completed.values()))[3] >= self.timeout:
+            self._completed.popitem(last=False)
+
+    def _sendSack(self, sender, messageId, buffer):
+        if isinstance(buffer, int):
+            received, bitmap = buffer, 0
+        else:
+            received = buffer.contiguous()
+            bitmap = 0
+            for bit in range(SACK_BITS):
+                index = received + 1 + bit
+                if index < len(buffer.fragments) and buffer.fragments[index] is not None:
+                    bitmap |= 1 << (SACK_BITS - 1 - bit)
+        payload = bytes([FRAG_SACK, messageId, received >> 8, received & 0xFF]) + bitmap.to_bytes(SACK_BITS // 8, 'big')
+        try:
+            self._sendFrame(sender, payload, PRIORITY_CONTROL)
+        except (queue.Full, RuntimeError):
+            # The sender polls again
+            return
+        self.stats['sacks_sent'] += 1
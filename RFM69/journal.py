@@ -0,0 +1,393 @@
+import glob
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+
+from .packet import Packet, HEADER
+
+# A journal is a directory of segment files, each preallocated to the segment size and
+# written through a shared memory mapping. A segment starts with SEGMENT_MAGIC followed by
+# records: a CRC32 of the rest of the record, a packet.HEADER and the payload. The first
+# record whose CRC doesn't match marks the end of the data, so readers never need to know
+# how far the writer has got, and a torn write after a crash is discarded.
+SEGMENT_MAGIC = b"RFM69JN1"
+CRC = struct.Struct('<I')
+RECORD_HEADER_LEN = CRC.size + HEADER.size
+# Offset of the sender ID in a record, after the CRC, receive time and receiver
+_SENDER_OFFSET = CRC.size + 10
+# Each segment has a sparse index beside it, with one entry per block of records: the offset
+# of the block's first record, the earliest and latest receive times, the number of records
+# and a bitmap of the low bytes of the sender IDs in the block
+INDEX_ENTRY = struct.Struct('<QqqI32s')
+
+
+def _segments(path):
+    # Segment numbers in order
+    return sorted(int(os.path.basename(name)[:-4]) for name in glob.glob(os.path.join(path, '*.seg')))
+
+
+def _segmentPath(path, number, suffix='.seg'):
+    return os.path.join(path, '{:08d}{}'.format(number, suffix))
+
+
+def _readRecord(buffer, offset):
+    # Returns the packet and the next record's offset, or None at the end of the data
+    if offset + RECORD_HEADER_LEN > len(buffer):
+        return None
+    length = buffer[offset + RECORD_HEADER_LEN - 1]
+    end = offset + RECORD_HEADER_LEN + length
+    if end > len(buffer) or CRC.unpack_from(buffer, offset)[0] != zlib.crc32(buffer[offset + CRC.size:end]):
+        return None
+    return Packet.from_bytes(buffer, offset + CRC.size), end
+
+
+class _Block:
+    # pylint: disable=too-few-public-methods
+    __slots__ = 'offset', 'earliest', 'latest', 'count', 'senders'
+
+    def __init__(self, offset):
+        self.offset = offset
+        self.earliest = None
+        self.latest = None
+        self.count = 0
+        self.senders = 0
+
+    def add(self, wallNs, sender):
+        # Receive times are wall-clock times, which go backwards when the clock is stepped
+        if self.earliest is None or wallNs < self.earliest:
+            self.earliest = wallNs
+        if self.latest is None or wallNs > self.latest:
+            self.latest = wallNs
+        self.count += 1
+        self.senders |= 1 << (sender & 0xFF)
+
+    def pack(self):
+        return INDEX_ENTRY.pack(self.offset, self.earliest, self.latest, self.count, self.senders.to_bytes(32, 'little'))
+
+
+class PacketJournal:
+    """Append-only log of received packets in memory-mapped segment files.
+
+    Records are the binary packet encoding (see Packet.to_bytes) behind a
+    CRC32, copied straight into a memory mapping of the current segment,
+    so appending a packet makes no system call. Once a segment is full the
+    journal moves on to the next file. The mapping is flushed to storage
+    every syncEvery records or syncInterval seconds, whichever comes
+    first, and on close, so a crash loses at most that much traffic.
+
+    Every indexInterval records a sparse index entry is written beside the
+    segment with the block's time range and the set of senders in it, so
+    :class:`JournalReader` can skip blocks outside a time range or without
+    a given node. Reopening a journal continues after the last complete
+    record.
+
+    The journal has its own lock and never touches the radio's, and readers
+    in other processes need no lock at all.
+
+    Args:
+        path (str): Directory for the segment files, created if needed
+
+    Keyword Args:
+        segmentSize (int): Bytes per segment file. Defaults to 16 MiB.
+        syncEvery (int): Records between flushes. Defaults to 256.
+        syncInterval (float): Seconds between flushes. Defaults to 1.
+        indexInterval (int): Records per index entry. Defaults to 64.
+
+    Attributes:
+        appended (int): Number of records appended since the journal was opened
+        syncs (int): Number of flushes to storage
+    """
+
+    def __init__(self, path, **kwargs):
+        self.path = path
+        self.segmentSize = kwargs.get('segmentSize', 16 * 1024 * 1024)
+        if self.segmentSize < len(SEGMENT_MAGIC) + RECORD_HEADER_LEN + 255:
+            raise ValueError("segmentSize is too small for a record")
+        self.syncEvery = kwargs.get('syncEvery', 256)
+        self.syncInterval = kwargs.get('syncInterval', 1)
+        self.indexInterval = kwargs.get('indexInterval', 64)
+        self.appended = 0
+        self.syncs = 0
+
+        self._lock = threading.Lock()
+        self._file = None
+        self._map = None
+        self._index = None
+        self._segment = None
+        self._offset = 0
+        self._syncedTo = 0
+        self._unsynced = 0
+        self._syncedAt = time.monotonic()
+        self._block = None
+
+        os.makedirs(path, exist_ok=True)
+        segments = _segments(path)
+        if segments:
+            self._open(segments[-1])
+        else:
+            self._create(0)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def append(self, packet):
+        """Add a packet to the end of the journal"""
+        payload = packet.payload
+        wallNs = packet.received_wall_ns
+        size = RECORD_HEADER_LEN + len(payload)
+        with self._lock:
+            if self._map is None:
+                raise ValueError("Journal is closed")
+            if self._offset + size > self.segmentSize:
+                self._rotate()
+            start, end = self._offset, self._offset + size
+            HEADER.pack_into(self._map, start + CRC.size, wallNs, packet.receiver, packet.sender,
+                             packet.RSSI, len(payload))
+            self._map[start + RECORD_HEADER_LEN:end] = payload
+            # The CRC goes in last, which is what makes the record visible to readers
+            CRC.pack_into(self._map, start, zlib.crc32(self._map[start + CRC.size:end]))
+            self._offset = end
+            self.appended += 1
+            self._block.add(wallNs, packet.sender)
+            if self._block.count >= self.indexInterval:
+                self._index.write(self._block.pack())
+                self._block = _Block(self._offset)
+            self._unsynced += 1
+            if self._unsynced >= self.syncEvery or time.monotonic() - self._syncedAt >= self.syncInterval:
+                self._sync()
+
+    def sync(self):
+        """Flush appended records and the index to storage"""
+        with self._lock:
+            if self._map is not None:
+                self._sync()
+
+    def close(self):
+        """Flush and close the journal"""
+        with self._lock:
+            if self._map is not None:
+                self._closeSegment()
+
+    def _sync(self):
+        # Only the pages written since the last flush, which must start on a page boundary
+        start = self._syncedTo - self._syncedTo % mmap.PAGESIZE
+        self._map.flush(start, self._offset - start)
+        self._index.flush()
+        os.fsync(self._index.fileno())
+        self._syncedTo = self._offset
+        self._unsynced = 0
+        self._syncedAt = time.monotonic()
+        self.syncs += 1
+
+    def _create(self, number):
+        # Readers map the whole file, so it only appears under its name at its full size
+        segmentPath = _segmentPath(self.path, number)
+        with open(segmentPath + '.tmp', 'wb') as f:
+            f.write(SEGMENT_MAGIC)
+            f.truncate(self.segmentSize)
+        open(_segmentPath(self.path, number, '.idx'), 'wb').close()
+        os.replace(segmentPath + '.tmp', segmentPath)
+        self._open(number)
+
+    def _open(self, number):
+        self._segment = number
+        self._file = open(_segmentPath(self.path, number), 'r+b')
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        if self._map[:len(SEGMENT_MAGIC)] != SEGMENT_MAGIC:
+            raise ValueError("{} is not a journal segment".format(_segmentPath(self.path, number)))
+        # Find the end of the data and rebuild the index, which may be behind it after a crash
+        self._index = open(_segmentPath(self.path, number, '.idx'), 'wb')
+        self._offset = len(SEGMENT_MAGIC)
+        self._block = _Block(self._offset)
+        while True:
+            record = _readRecord(self._map, self._offset)
+            if record is None:
+                break
+            packet, self._offset = record
+            self._block.add(packet.received_wall_ns, packet.sender)
+            if self._block.count >= self.indexInterval:
+                self._index.write(self._block.pack())
+                self._block = _Block(self._offset)
+        self._syncedTo = self._offset
+        self._index.flush()
+
+    def _rotate(self):
+        self._closeSegment()
+        self._create(self._segment + 1)
+
+    def _closeSegment(self):
+        if self._block.count:
+            self._index.write(self._block.pack())
+            self._block = _Block(self._offset)
+        self._sync()
+        self._index.close()
+        self._map.close()
+        self._file.close()
+        self._map = None
+
+
+class JournalReader:
+    """Reads a :class:`PacketJournal`, including one another process is writing.
+
+    Segments are mapped read-only and records are only trusted once their
+    CRC matches, so reading needs no lock and never waits for the writer.
+
+    Args:
+        path (str): Directory of the journal
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._maps = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def scan(self, start=None, end=None, sender=None):
+        """Iterate over the packets in the journal, oldest first
+
+        Index blocks outside the time range or without the sender are
+        skipped without being read.
+
+        Args:
+            start (int): Only packets received at or after this time, in nanoseconds since the epoch
+            end (int): Only packets received before this time, in nanoseconds since the epoch
+            sender (int): Only packets from this node
+
+        Yields:
+            Packet: The matching packets
+        """
+        for number in _segments(self.path):
+            buffer = self._map(number)
+            if buffer is None:
+                continue
+            entries = self._indexEntries(number)
+            for offset, earliest, latest, count, senders in entries:
+                if (start is not None and latest < start) or (end is not None and earliest >= end):
+                    continue
+                if sender is not None and not senders[(sender & 0xFF) >> 3] & (1 << (sender & 7)):
+                    continue
+                yield from self._read(buffer, offset, count, start, end, sender)
+            # The writer's current block isn't indexed yet
+            offset = self._blockEnd(buffer, entries[-1][0], entries[-1][3]) if entries else len(SEGMENT_MAGIC)
+            yield from self._read(buffer, offset, None, start, end, sender)
+
+    def tail(self, fromStart=False, poll=0.1, timeout=None):
+        """Follow the journal as packets are appended to it
+
+        Args:
+            fromStart (bool): Begin with the oldest packet instead of the next one appended
+            poll (float): Seconds to sleep when there is nothing new
+            timeout (float): Stop after this many seconds without a new packet. Set to None to follow forever.
+
+        Returns:
+            generator: Yields each Packet as it is appended. Where it starts is fixed when tail is called.
+        """
+        segments = _segments(self.path)
+        if fromStart or not segments:
+            return self._follow((segments[0] if segments else 0), len(SEGMENT_MAGIC), poll, timeout)
+        return self._follow(segments[-1], self._end(segments[-1]), poll, timeout)
+
+    def close(self):
+        """Unmap every segment"""
+        for number in list(self._maps):
+            self._unmap(number)
+
+    def _follow(self, number, offset, poll, timeout):
+        idleSince = time.monotonic()
+        while True:
+            buffer = self._map(number)
+            record = None if buffer is None else _readRecord(buffer, offset)
+            if record is not None:
+                packet, offset = record
+                idleSince = time.monotonic()
+                yield packet
+                continue
+            later = [other for other in _segments(self.path) if other > number]
+            # The writer only starts a new segment once it has finished with this one, but look
+            # again in case the last record has only become visible since
+            if later and (buffer is None or _readRecord(buffer, offset) is None):
+                self._unmap(number)
+                number, offset = later[0], len(SEGMENT_MAGIC)
+                continue
+            if timeout is not None and time.monotonic() - idleSince >= timeout:
+                return
+            time.sleep(poll)
+
+    def _map(self, number):
+        buffer = self._maps.get(number)
+        if buffer is None:
+            try:
+                with open(_segmentPath(self.path, number), 'rb') as f:
+                    buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (FileNotFoundError, ValueError):
+                # Missing, or still empty while the writer creates it
+                return None
+            if buffer[:len(SEGMENT_MAGIC)] != SEGMENT_MAGIC:
+                buffer.close()
+                return None
+            self._maps[number] = buffer
+        return buffer
+
+    def _unmap(self, number):
+        buffer = self._maps.pop(number, None)
+        if buffer is not None:
+            buffer.close()
+
+    def _indexEntries(self, number):
+        try:
+            with open(_segmentPath(self.path, number, '.idx'), 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return []
+        # A partly written last entry is ignored
+        return list(INDEX_ENTRY.iter_unpack(data[:len(data) - len(data) % INDEX_ENTRY.size]))
+
+    def _end(self, number):
+        buffer = self._map(number)
+        if buffer is None:
+            return len(SEGMENT_MAGIC)
+        entries = self._indexEntries(number)
+        offset = self._blockEnd(buffer, entries[-1][0], entries[-1][3]) if entries else len(SEGMENT_MAGIC)
+        while True:
+            record = _readRecord(buffer, offset)
+            if record is None:
+                return offset
+            offset = record[1]
+
+    @staticmethod
+    def _read(buffer, offset, count, start, end, sender):
+        # Up to count records from offset, or all of them to the end of the data if count is None
+        while count is None or count > 0:
+            if sender is not None and count is not None and \
+                    buffer[offset + _SENDER_OFFSET] | buffer[offset + _SENDER_OFFSET + 1] << 8 != sender:
+                # Indexed records are known to be complete, so one from another node is stepped over
+                offset += RECORD_HEADER_LEN + buffer[offset + RECORD_HEADER_LEN - 1]
+                count -= 1
+                continue
+            record = _readRecord(buffer, offset)
+            if record is None:
+                return
+            packet, offset = record
+            if count is not None:
+                count -= 1
+            wallNs = packet.received_wall_ns
+            if ((start is None or wallNs >= start) and (end is None or wallNs < end) and
+                    (sender is None or packet.sender == sender)):
+                yield packet
+
+    @staticmethod
+    def _blockEnd(buffer, offset, count):
+        # Step over count records by their lengths, without decoding them
+        for _ in range(count):
+            offset += RECORD_HEADER_LEN + buffer[offset + RECORD_HEADER_LEN - 1]
+        return offset
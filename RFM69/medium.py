@@ -0,0 +1,182 @@
+import queue
+import random
+import threading
+import time
+
+# The medium stands in for the air between emulated radios and reads their encryption keys
+# pylint: disable=protected-access
+
+
+class _Transmission:
+    # pylint: disable=too-few-public-methods
+    __slots__ = 'sender', 'signature', 'syncTime', 'overlaps', 'streamTo'
+
+    def __init__(self, sender):
+        self.sender = sender
+        self.signature = sender.signature()
+        # Receivers must be listening by the time the sync word has gone out
+        self.syncTime = time.monotonic() + sender.preamble_time() * sender.time_scale
+        self.overlaps = set()
+        # Receivers of a frame longer than the FIFO, which is passed on as it goes out
+        self.streamTo = None
+
+
+class Medium:
+    """Virtual RF channel shared by a number of emulated radios.
+
+    Every :class:`RFM69.emulator.Emulator` added to the medium hears the
+    transmissions of the others. A frame reaches a receiver only if the
+    receiver was listening with matching frequency, bitrate and sync word
+    by the time the frame's sync word was sent, did not transmit itself
+    while the frame was on the air, and no overlapping transmission arrived within
+    capture_threshold dB of the frame's strength. Each link has its own
+    RSSI and loss probability. While a frame is on the air, receivers read
+    its strength from RegRssiValue, so carrier sense in ``Radio._canSend``
+    sees a busy channel. Frames longer than the FIFO reach receivers chunk
+    by chunk while they are on the air, and are completed or, if collided
+    or lost, discarded as a CRC error would be once they end.
+
+    Args:
+        rssi (int): Default signal strength of a link in dBm.
+        loss (float): Default probability of a link losing a frame, from 0 to 1.
+        capture_threshold (float): How many dB stronger a frame must be than any
+            overlapping frame to survive the collision.
+        seed (int): Seed for the random number generator deciding losses.
+
+    Attributes:
+        stats (dict): Number of frames transmitted, delivered, collided, lost and aborted.
+            A frame reaching several receivers is counted once per receiver.
+    """
+
+    def __init__(self, rssi=-60, loss=0.0, capture_threshold=6, seed=None):
+        self.rssi = rssi
+        self.loss = loss
+        self.capture_threshold = capture_threshold
+        self.stats = dict(transmitted=0, delivered=0, collisions=0, lost=0, aborted=0)
+        self._random = random.Random(seed)
+        self._radios = []
+        self._links = {}
+        self._onAir = {}
+        self._lock = threading.Lock()
+        self._deliveries = queue.Queue()
+        self._thread = threading.Thread(target=self._deliver, name="rfm69-medium", daemon=True)
+        self._thread.start()
+
+    def add(self, emulator):
+        """Attach an emulator to the medium
+
+        Args:
+            emulator (Emulator): The emulated radio
+
+        Returns:
+            Emulator: The emulator, so it can be passed straight to Radio
+        """
+        with self._lock:
+            self._radios.append(emulator)
+        emulator.medium = self
+        return emulator
+
+    def set_link(self, a, b, rssi=None, loss=None, symmetric=True):
+        """Set the signal strength and loss probability from one emulator to another
+
+        Args:
+            a (Emulator): Transmitting emulator
+            b (Emulator): Receiving emulator
+            rssi (int): Signal strength at b in dBm. Defaults to the medium default.
+            loss (float): Probability of b losing a frame from a. Defaults to the medium default.
+            symmetric (bool): Also apply the settings from b to a. Defaults to True.
+        """
+        with self._lock:
+            link = (self.rssi if rssi is None else rssi, self.loss if loss is None else loss)
+            self._links[(a, b)] = link
+            if symmetric:
+                self._links[(b, a)] = link
+
+    def link(self, a, b):
+        """Returns (rssi, loss) for frames from emulator a heard by emulator b"""
+        return self._links.get((a, b), (self.rssi, self.loss))
+
+    def channel_rssi(self, receiver):
+        """Signal strength the receiver currently measures, in dBm"""
+        with self._lock:
+            rssi = receiver.noise_floor
+            for sender in self._onAir:
+                if sender is not receiver:
+                    rssi = max(rssi, self.link(sender, receiver)[0])
+            return rssi
+
+    def begin(self, sender):
+        """Called by an emulator when a frame starts going on the air"""
+        transmission = _Transmission(sender)
+        with self._lock:
+            for other in self._onAir.values():
+                other.overlaps.add(transmission)
+                transmission.overlaps.add(other)
+            self._onAir[sender] = transmission
+            self.stats['transmitted'] += 1
+
+    def abort(self, sender):
+        """Called by an emulator when it leaves TX mode in the middle of a frame"""
+        with self._lock:
+            transmission = self._onAir.pop(sender, None)
+            if transmission is not None:
+                self.stats['aborted'] += 1
+                for receiver in transmission.streamTo or ():
+                    self._deliveries.put((receiver.receive_end, (False,)))
+
+    def stream(self, sender, chunk):
+        """Called by an emulator as each chunk of a frame longer than the FIFO goes on the air"""
+        with self._lock:
+            transmission = self._onAir.get(sender)
+            if transmission is None:
+                return
+            if transmission.streamTo is None:
+                transmission.streamTo = self._listeners(transmission)
+                for receiver in transmission.streamTo:
+                    self._deliveries.put((receiver.receive_start, (self.link(sender, receiver)[0], sender._aes_key())))
+            for receiver in transmission.streamTo:
+                self._deliveries.put((receiver.receive_chunk, (chunk,)))
+
+    def _listeners(self, transmission):
+        return [radio for radio in self._radios if radio is not transmission.sender and
+                radio.listening(transmission.syncTime) and radio.signature() == transmission.signature]
+
+    def end(self, sender, frame, key):
+        """Called by an emulator when a frame has been completely transmitted"""
+        with self._lock:
+            transmission = self._onAir.pop(sender, None)
+            if transmission is None:
+                return
+            streamed = transmission.streamTo is not None
+            listeners = transmission.streamTo if streamed else self._listeners(transmission)
+            for receiver in listeners:
+                rssi, loss = self.link(sender, receiver)
+                interferers = [other for other in transmission.overlaps if other.sender is not receiver]
+                delivered = False
+                if any(other.sender is receiver for other in transmission.overlaps) or \
+                        any(self.link(other.sender, receiver)[0] > rssi - self.capture_threshold
+                            for other in interferers):
+                    self.stats['collisions'] += 1
+                elif self._random.random() < loss:
+                    self.stats['lost'] += 1
+                else:
+                    self.stats['delivered'] += 1
+                    delivered = True
+                if streamed:
+                    self._deliveries.put((receiver.receive_end, (delivered,)))
+                elif delivered:
+                    self._deliveries.put((receiver.receive, (frame, rssi, key)))
+
+    def _deliver(self):
+        # Frames are handed over on a separate thread so no emulator lock is held while
+        # another emulator's lock is taken
+        while True:
+            delivery = self._deliveries.get()
+            if delivery is None:
+                return
+            method, args = delivery
+            method(*args)
+
+    def close(self):
+        """Stop delivering frames"""
+        self._deliveries.put(None)
@@ -0,0 +1,103 @@
+import collections
+import math
+
+from .registers import *
+
+# Frequency synthesizer step, the deviation is Fdev * FSTEP
+FSTEP = RF69_FXOSC / 2 ** 19
+# Nominal carrier frequency of each band in Hz, for the frequency error allowance
+BAND_FREQUENCIES = {RF69_315MHZ: 315e6, RF69_433MHZ: 433e6, RF69_868MHZ: 868e6, RF69_915MHZ: 915e6}
+# Frequency tolerance of each crystal. A transmitter and receiver can be twice this far apart.
+CRYSTAL_TOLERANCE_PPM = 10
+# PA ramp-down time with the power-on RegPaRamp, which the RX restart delay should match
+PA_RAMP_S = 40e-6
+
+# Receiver bandwidth settings from widest to narrowest: (bandwidth in Hz, mantissa bits, exponent)
+_BANDWIDTHS = sorted(((RF69_FXOSC / (mantissa * 2 ** (exponent + 2)), bits, exponent)
+                      for mantissa, bits in ((16, RF_RXBW_MANT_16), (20, RF_RXBW_MANT_20), (24, RF_RXBW_MANT_24))
+                      for exponent in range(8)), reverse=True)
+
+ModemProfile = collections.namedtuple('ModemProfile', 'bitrate fdev rxbw afcbw registers')
+ModemProfile.__doc__ = """Compiled modem settings: the bitrate in bits per second, frequency deviation,
+receiver and AFC bandwidths in Hz as the registers give them, and a dict of register address to value"""
+
+# Named presets, as (bitrate, frequency deviation)
+PRESETS = {
+    '4.8k': (4800, 5000),
+    '38.4k': (38400, 40000),
+    '55.5k': (55555, 50000),
+    '200k': (200000, 100000),
+    '300k': (300000, 150000),
+}
+
+
+def compile_profile(bitrate, fdev, freqBand=RF69_433MHZ):
+    """Compute the register settings for an FSK modem
+
+    The receiver bandwidth is the narrowest setting that passes the signal,
+    half its Carson bandwidth (the deviation plus half the bitrate), with
+    room for the transmitter's and receiver's crystals to be
+    CRYSTAL_TOLERANCE_PPM apart each. The AFC bandwidth allows for twice
+    that offset. The RX restart delay is the power of two bit times
+    nearest to the PA ramp-down time. The DAGC uses the improved fading
+    margin recommended while AfcLowBetaOn is off, as it is in this driver.
+    The modulation index, 2 * fdev / bitrate, must be from 0.5 to 10.
+
+    Args:
+        bitrate (int): Bits per second, from 1200 to 300000
+        fdev (int): Frequency deviation in Hz
+        freqBand: Frequency band the profile is for, which sets the crystal offset allowance
+
+    Returns:
+        ModemProfile: The settings. The registers cover BitRate, Fdev, RxBw, AfcBw, the RX restart
+        delay in PacketConfig2 and TestDagc.
+
+    Raises:
+        ValueError: If the settings are outside the SX1231's limits
+    """
+    if not 1200 <= bitrate <= 300000:
+        raise ValueError("FSK bitrate must be from 1200 to 300000 bps")
+    if not 600 <= fdev <= 0x3FFF * FSTEP:
+        raise ValueError("Frequency deviation must be from 600 Hz to {:.0f} Hz".format(0x3FFF * FSTEP))
+    carson = fdev + bitrate / 2
+    if carson > _BANDWIDTHS[0][0]:
+        raise ValueError("Fdev + bitrate / 2 is {:.0f} Hz, more than the 500 kHz limit".format(carson))
+    beta = 2 * fdev / bitrate
+    if not 0.5 <= beta <= 10:
+        raise ValueError("Modulation index 2 * Fdev / bitrate is {:.2f}, outside 0.5 to 10".format(beta))
+
+    bitrateReg = int(round(RF69_FXOSC / bitrate))
+    fdevReg = int(round(fdev / FSTEP))
+    offset = 2 * CRYSTAL_TOLERANCE_PPM * 1e-6 * BAND_FREQUENCIES[freqBand]
+    rxbw, rxbwBits = _bandwidth(carson + offset)
+    afcbw, afcbwBits = _bandwidth(carson + 2 * offset)
+    restartDelay = min(max(int(round(math.log2(PA_RAMP_S * bitrate))), 0), 11)
+    registers = {
+        REG_BITRATEMSB: bitrateReg >> 8,
+        REG_BITRATELSB: bitrateReg & 0xFF,
+        REG_FDEVMSB: fdevReg >> 8,
+        REG_FDEVLSB: fdevReg & 0xFF,
+        REG_RXBW: RF_RXBW_DCCFREQ_010 | rxbwBits,
+        REG_AFCBW: RF_AFCBW_DCCFREQAFC_100 | afcbwBits,
+        REG_PACKETCONFIG2: (restartDelay << 4) | RF_PACKET2_AUTORXRESTART_ON | RF_PACKET2_AES_OFF,
+        REG_TESTDAGC: RF_DAGC_IMPROVED_LOWBETA0,
+    }
+    return ModemProfile(RF69_FXOSC / bitrateReg, fdevReg * FSTEP, rxbw, afcbw, registers)
+
+
+def get_profile(profile, freqBand=RF69_433MHZ):
+    """Returns a ModemProfile given one, or the name of one of the PRESETS compiled for freqBand"""
+    if isinstance(profile, ModemProfile):
+        return profile
+    if profile not in PRESETS:
+        raise ValueError("Unknown modem profile {!r}, the presets are {}".format(profile, ", ".join(PRESETS)))
+    return compile_profile(*PRESETS[profile], freqBand)
+
+
+def _bandwidth(required):
+    # The narrowest receiver bandwidth of at least required Hz, or the widest there is
+    for bandwidth, mantissa, exponent in reversed(_BANDWIDTHS):
+        if bandwidth >= required:
+            return bandwidth, mantissa | exponent
+    bandwidth, mantissa, exponent = _BANDWIDTHS[0]
+    return bandwidth, mantissa | exponent
@@ -1,27 +1,89 @@
 import json
-from datetime import datetime
+import struct
+import time
+from datetime import datetime, timedelta, timezone
+
+_EPOCH = datetime(1970, 1, 1)
+# Binary encoding: receive time in nanoseconds since the epoch, receiver and sender as 16-bit
+# node IDs, RSSI and payload length, little-endian, followed by the payload
+HEADER = struct.Struct('<qHHbB')
+_BYTE_STRINGS = [str(value) for value in range(256)]
 
 class Packet:
     """Object to represent received packet. Created internally and
     returned by radio when getPackets() is called.
 
+    The payload is held as immutable bytes and the receive time as
+    integer nanoseconds, on both the monotonic clock and the system clock,
+    which keeps a packet small and cheap to create on the interrupt thread.
+    The system clock is read for every packet, so packets received after
+    NTP sets or steps the clock carry the corrected time. The received
+    datetime and data_string are only built when first used, and then
+    cached. data builds a new list on every access.
+
     Args:
         receiver (int): Node ID of receiver
         sender (int): Node ID of sender
         RSSI (int): Received Signal Strength Indicator i.e. the power present in a received radio signal
-        data (list): Raw transmitted data
+        data (bytes): Raw transmitted data, as bytes or a list of ints
+        received_ns (int): time.monotonic_ns() value when the packet arrived. Defaults to now, or to
+            received_wall_ns on the monotonic clock as it stands now.
+        received_wall_ns (int): time.time_ns() value when the packet arrived. Defaults to now, or to
+            received_ns on the system clock as it stands now.
 
+    Attributes:
+        payload (bytes): The data
+        received_ns (int): time.monotonic_ns() value when the packet arrived
+        received_wall_ns (int): When the packet arrived, in nanoseconds since the epoch
     """
 
     # Declare slots to reduce memory
-    __slots__ = 'received', 'receiver', 'sender', 'RSSI', 'data'
+    __slots__ = ('receiver', 'sender', 'RSSI', 'payload', 'received_ns', 'received_wall_ns',
+                 '_received', '_dataString')
 
-    def __init__(self, receiver, sender, RSSI, data):
-        self.received = datetime.utcnow()
+    def __init__(self, receiver, sender, RSSI, data, received_ns=None, received_wall_ns=None):
         self.receiver = receiver
         self.sender = sender
         self.RSSI = RSSI
-        self.data = data
+        self.payload = data if isinstance(data, bytes) else bytes(data)
+        if received_ns is None and received_wall_ns is None:
+            received_ns, received_wall_ns = time.monotonic_ns(), time.time_ns()
+        elif received_wall_ns is None:
+            received_wall_ns = received_ns + time.time_ns() - time.monotonic_ns()
+        elif received_ns is None:
+            received_ns = received_wall_ns - time.time_ns() + time.monotonic_ns()
+        self.received_ns = received_ns
+        self.received_wall_ns = received_wall_ns
+        self._received = None
+        self._dataString = None
+
+    @property
+    def received(self):
+        """When the packet arrived, as a naive UTC datetime"""
+        if self._received is None:
+            self._received = _EPOCH + timedelta(microseconds=self.received_wall_ns // 1000)
+        return self._received
+
+    @received.setter
+    def received(self, value):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        self._received = value
+        self.received_wall_ns = (value - _EPOCH) // timedelta(microseconds=1) * 1000
+
+    @property
+    def data(self):
+        """Returns a new list of the payload bytes as ints
+
+        The list is built on every access, so changing it does not change the
+        packet. Assign to ``data`` to replace the payload.
+        """
+        return list(self.payload)
+
+    @data.setter
+    def data(self, value):
+        self.payload = bytes(value)
+        self._dataString = None
 
     def to_dict(self, dateFormat=None):
         """Returns a dictionary representation of the class data"""
@@ -35,10 +97,92 @@ class Packet:
     @property
     def data_string(self):
         """Returns the data as a string"""
-        return "".join([chr(letter) for letter in self.data])
+        if self._dataString is None:
+            self._dataString = self.payload.decode('latin-1')
+        return self._dataString
+
+    def to_bytes(self):
+        """Returns the packet in the binary encoding, a HEADER followed by the payload"""
+        return HEADER.pack(self.received_wall_ns, self.receiver, self.sender,
+                           self.RSSI, len(self.payload)) + self.payload
+
+    @classmethod
+    def from_bytes(cls, data, offset=0):
+        """Decode a packet encoded by to_bytes or to_binary
+
+        Args:
+            data (bytes): The encoding
+            offset (int): Where in data the packet starts
+
+        Returns:
+            Packet: The packet. Its received_ns is on this machine's monotonic clock as it stands now.
+        """
+        wallNs, receiver, sender, rssi, length = HEADER.unpack_from(data, offset)
+        start = offset + HEADER.size
+        if start + length > len(data):
+            raise ValueError("Truncated packet")
+        return cls(receiver, sender, rssi, bytes(data[start:start + length]), None, wallNs)
 
     def __str__(self):
         return json.dumps(self.to_dict('%c'))
 
     def __repr__(self):
         return "Radio({}, {}, {}, [data])".format(self.receiver, self.sender, self.RSSI)
+
+
+def to_binary(packets):
+    """Encode packets as one blob of to_bytes encodings, each length-prefixed by its HEADER
+
+    Args:
+        packets (iterable): Packet objects
+
+    Returns:
+        bytes: The blob, decoded by from_binary
+    """
+    pack = HEADER.pack
+    parts = []
+    for packet in packets:
+        payload = packet.payload
+        parts.append(pack(packet.received_wall_ns, packet.receiver, packet.sender,
+                          packet.RSSI, len(payload)))
+        parts.append(payload)
+    return b"".join(parts)
+
+
+def from_binary(data):
+    """Returns the list of packets in a blob from to_binary"""
+    packets = []
+    offset = 0
+    view = memoryview(data)
+    while offset < len(data):
+        packet = Packet.from_bytes(view, offset)
+        packets.append(packet)
+        offset += HEADER.size + len(packet.payload)
+    return packets
+
+
+def to_ndjson(packets):
+    """Encode packets as newline-delimited JSON, one object per line
+
+    Each object has the keys of Packet.to_dict, with the receive time as an
+    ISO 8601 UTC string with microseconds. The date and time of day are
+    formatted once for each second the packets arrived in, rather than once
+    per packet.
+
+    Args:
+        packets (iterable): Packet objects
+
+    Returns:
+        str: The lines, each ending with a newline
+    """
+    lines = []
+    second, prefix = None, None
+    for packet in packets:
+        micros = packet.received_wall_ns // 1000
+        if micros // 1000000 != second:
+            second = micros // 1000000
+            prefix = (_EPOCH + timedelta(seconds=second)).strftime('{"received": "%Y-%m-%dT%H:%M:%S.')
+        lines.append('%s%06dZ", "receiver": %d, "sender": %d, "rssi": %d, "data": [%s]}\n' % (
+            prefix, micros % 1000000, packet.receiver, packet.sender, packet.RSSI,
+            ", ".join([_BYTE_STRINGS[value] for value in packet.payload])))
+    return "".join(lines)
@@ -0,0 +1,119 @@
+from collections import deque
+
+DROP_OLDEST = 'drop_oldest'
+DROP_NEWEST = 'drop_newest'
+SENDER_QUOTA = 'sender_quota'
+
+
+class PacketQueue:
+    """Bounded first-in first-out queue of received packets.
+
+    Adding and removing packets is O(1). When the queue is full the
+    overflow policy decides which packet is lost:
+
+    * ``drop_oldest`` discards the oldest queued packet to make room.
+    * ``drop_newest`` discards the packet being added.
+    * ``sender_quota`` discards packets from a sender that already has
+      sender_quota packets queued, so one chatty node cannot crowd out the
+      others, and otherwise behaves like ``drop_oldest``.
+
+    The queue is not thread-safe on its own; :class:`RFM69.Radio` guards it
+    with its packet lock.
+
+    Args:
+        capacity (int): Maximum number of queued packets, or None for no limit.
+        policy (str): Overflow policy, one of the constants above. Defaults to drop_oldest.
+        sender_quota (int): Maximum queued packets per sender for the sender_quota policy.
+            Defaults to a tenth of the capacity.
+
+    Attributes:
+        dropped (int): Number of packets discarded because of the capacity or quota
+        dropped_by_sender (dict): Number of discarded packets for each sender node ID
+        high_water (int): Largest number of packets that have been queued at once
+    """
+
+    def __init__(self, capacity=None, policy=DROP_OLDEST, sender_quota=None):
+        if policy not in (DROP_OLDEST, DROP_NEWEST, SENDER_QUOTA):
+            raise ValueError("Unknown overflow policy {!r}".format(policy))
+        if capacity is not None and capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.policy = policy
+        if sender_quota is None and policy == SENDER_QUOTA:
+            sender_quota = max((capacity or 0) // 10, 1)
+        self.sender_quota = sender_quota
+        self.dropped = 0
+        self.dropped_by_sender = {}
+        self.high_water = 0
+        self._queue = deque()
+        self._perSender = {}
+
+    def append(self, packet):
+        """Queue a packet, applying the overflow policy
+
+        Args:
+            packet (Packet): The received packet
+
+        Returns:
+            bool: False if the packet itself was discarded
+        """
+        queue = self._queue
+        if self.policy == SENDER_QUOTA:
+            queued = self._perSender.get(packet.sender, 0)
+            if queued >= self.sender_quota:
+                self._drop(packet)
+                return False
+            self._perSender[packet.sender] = queued + 1
+        if self.capacity is not None and len(queue) >= self.capacity:
+            if self.policy == DROP_NEWEST:
+                self._drop(packet)
+                return False
+            self._drop(self.popleft())
+        queue.append(packet)
+        if len(queue) > self.high_water:
+            self.high_water = len(queue)
+        return True
+
+    def popleft(self):
+        """Remove and return the oldest packet
+
+        Raises:
+            IndexError: If the queue is empty
+        """
+        packet = self._queue.popleft()
+        if self.policy == SENDER_QUOTA:
+            self._forget(packet.sender)
+        return packet
+
+    def drain(self):
+        """Remove and return all queued packets, oldest first"""
+        packets = list(self._queue)
+        self._queue.clear()
+        self._perSender.clear()
+        return packets
+
+    def reset_counters(self):
+        """Zero the drop counters and the high-water mark"""
+        self.dropped = 0
+        self.dropped_by_sender = {}
+        self.high_water = len(self._queue)
+
+    def _forget(self, sender):
+        queued = self._perSender[sender] - 1
+        if queued:
+            self._perSender[sender] = queued
+        else:
+            del self._perSender[sender]
+
+    def _drop(self, packet):
+        self.dropped += 1
+        self.dropped_by_sender[packet.sender] = self.dropped_by_sender.get(packet.sender, 0) + 1
+
+    def __len__(self):
+        return len(self._queue)
+
+    def __iter__(self):
+        return iter(self._queue)
+
+    def __getitem__(self, index):
+        return self._queue[index]
@@ -1,14 +1,21 @@
+import math
 import time
+import queue
 import logging
 import threading
 import warnings
 
-import spidev
-import RPi.GPIO as GPIO # pylint: disable=consider-using-from-import
-
 from .registers import *
 from .packet import Packet
+from .packetqueue import PacketQueue, DROP_OLDEST
 from .config import get_config
+from .modem import get_profile
+from .exceptions import RadioTimeoutError
+from .transport import SpiDevTransport
+from .acks import AckTracker, CTL_ACK_SENT, CTL_ACK_REQUESTED, CTL_SEQUENCE, CTL_TARGET_HIGH, CTL_SENDER_HIGH
+from .dedup import DuplicateFilter
+from .dutycycle import frame_airtime
+from .transmit import TxScheduler, TxWorker, PRIORITY_ACK, PRIORITY_DATA
 
 
 class Radio:
@@ -34,7 +41,62 @@ class Radio:
         spiDevice (int): SPI device number.
         promiscuousMode (bool): Listen to all messages not just those addressed to this node ID.
         encryptionKey (str): 16 character encryption key.
+        transport (Transport): Connection to the module. Defaults to a SpiDevTransport built from
+            the pin and SPI arguments above, see RFM69.transport for the alternatives.
+        registerCache (bool): Shadow configuration registers to avoid read-back over SPI. Defaults to True.
+        receiveQueueSize (int): Maximum number of received packets held until they are read.
+            Defaults to 1000. Set to None for no limit.
+        overflowPolicy (str): What to discard when the receive queue is full: 'drop_oldest'
+            (the default), 'drop_newest' or 'sender_quota', see RFM69.packetqueue.PacketQueue.
+        senderQuota (int): Maximum queued packets per sender with the 'sender_quota' policy.
+        txQueueDepths (dict): Maximum number of queued outgoing frames for each priority class,
+            see RFM69.transmit.TxScheduler.
+        rawFrames (bool): Send data frames as given, with the caller writing the
+            [length, toAddress, fromAddress, ctl] header. Defaults to True. Set to False to have
+            the header written for you.
+        sequenceHeader (bool): Number frames to nodes that run this driver, so each ack is
+            matched to the frame it acknowledges, see RFM69.acks.AckTracker. The number is a
+            byte after the header, flagged by CTL_SEQUENCE in the CTL byte, which acks echo
+            back. Only nodes in sequencePeers, or that have sent a numbered frame, are sent
+            numbered frames and acks; everyone else, LowPowerLab nodes included, gets the
+            plain 4-byte header. Raw frames are numbered if they start with a header for the
+            node they are sent to. Defaults to True.
+        sequencePeers (iterable): IDs of nodes known to run this driver, numbered from the first
+            frame. A node sent a numbered frame numbers its own frames back, so configuring one
+            side of a link is enough. Defaults to none.
+        modemProfile (str): Bitrate and frequency deviation, as the name of one of the presets in
+            RFM69.modem.PRESETS ('4.8k', '38.4k', '55.5k', '200k' or '300k') or a ModemProfile from
+            RFM69.modem.compile_profile. Defaults to None, for 55.5 kbps with 50 kHz deviation and
+            a 125 kHz receiver bandwidth.
+        longPackets (bool): Send and receive frames of up to RF69_LONG_PACKET_LEN bytes, more than
+            the FIFO holds, by refilling and draining it during the transmission. Defaults to
+            False. Can't be combined with encryption.
+        dedupCache (int): Number of recently received frames remembered to recognise
+            retransmissions, which are acked again but not queued. Only frames with the
+            sequence byte of sequenceHeader are checked, so frames from LowPowerLab nodes are
+            always queued. Defaults to 256, set to 0 to queue every frame. There is no cache
+            if sequenceHeader is False.
+        dutyCycle (DutyCycleBudget): Airtime budget per sub-band, charged with every frame sent,
+            whose policy decides whether frames over budget are delayed or fail with
+            RFM69.DutyCycleExceededError. See RFM69.dutycycle. Defaults to None, for no limit.
         verbose (bool): Verbose mode - Activates logging to console.
+
+    Attributes:
+        transport (Transport): Connection to the module, which also counts SPI transactions.
+        register_cache_hits (int): Number of register reads answered from the register shadow
+            instead of the SPI bus.
+        receive_queue (PacketQueue): Received packets waiting to be read, with counters for
+            dropped packets and the high-water mark.
+        transmit_queue (TxScheduler): Outgoing frames waiting for the transmit thread, with
+            counters for frames rejected or dropped past their deadline.
+        wait_stats (dict): For each kind of wait on the chip, such as 'mode_ready' or 'csma',
+            a dict with the number of waits, polls and timeouts and the total time spent waiting.
+        ack_tracker (AckTracker): Frames waiting for an ack, and the round trip time of the
+            most recently acknowledged ones.
+        duplicate_filter (DuplicateFilter): Recently received frames, with a count of the
+            duplicates dropped, or None if dedupCache is 0 or sequenceHeader is False.
+        duty_cycle (DutyCycleBudget): The dutyCycle budget, or None.
+        modem_profile: The modemProfile given or last applied with apply_profile, or None.
     """
 
     def __init__(self, freqBand, nodeID, networkID=100, **kwargs):
@@ -51,6 +113,12 @@ class Radio:
         self.spiDevice = kwargs.get('spiDevice', 0)
         self.promiscuousMode = kwargs.get('promiscuousMode', 0)
 
+        # Write-through shadow of the configuration registers
+        self._useRegCache = kwargs.get('registerCache', True)
+        self._regCache = {}
+        self.register_cache_hits = 0
+        self.wait_stats = {}
+
         # Thread-safe locks
         self._spiLock = threading.Lock()
         self._sendLock = threading.Condition()
@@ -69,13 +137,44 @@ class Radio:
         self._encryptKey = None
         self.listen_mode_set_durations(DEFAULT_LISTEN_RX_US, DEFAULT_LISTEN_IDLE_US)
 
-        self._packets = []
+        # Transmit and receive buffers are allocated once and reused for every frame
+        self.long_packets = kwargs.get('longPackets', False)
+        self.modem_profile = kwargs.get('modemProfile', None)
+        frameSize = RF69_LONG_PACKET_LEN + 1 if self.long_packets else RF69_FIFO_SIZE
+        self._txBuffer = bytearray(1 + frameSize)
+        self._txBuffer[0] = REG_FIFO | 0x80
+        self._rxHeaderRequest = [REG_FIFO & 0x7F, 0, 0, 0, 0]
+        # Room for the FIFO address, the length byte and the longest payload the length byte allows
+        self._maxPayloadLength = RF69_LONG_PACKET_LEN if self.long_packets else RF69_FIFO_SIZE
+        self._rxBuffer = bytearray(2 + self._maxPayloadLength)
+
+        self._packets = PacketQueue(kwargs.get('receiveQueueSize', 1000),
+                                    kwargs.get('overflowPolicy', DROP_OLDEST),
+                                    kwargs.get('senderQuota', None))
+        self.receive_queue = self._packets
         self._packetLock = threading.Condition()
+        # Set by RFM69.aio.AsyncRadio to take received packets off the interrupt thread
+        self._packetSink = None
+        # Every transmission goes through the priority queues and the transmit thread,
+        # which is started on first use
+        self.transmit_queue = TxScheduler(kwargs.get('txQueueDepths', None))
+        self._txWorker = None
+        self._txClosed = False
+        self.raw_frames = kwargs.get('rawFrames', True)
+        self.sequence_header = kwargs.get('sequenceHeader', True)
+        self.ack_tracker = AckTracker()
+        if self.sequence_header:
+            self.ack_tracker.sequenced_nodes.update(kwargs.get('sequencePeers', ()))
+        dedupCache = kwargs.get('dedupCache', 256)
+        self.duplicate_filter = DuplicateFilter(dedupCache) if dedupCache and self.sequence_header else None
+        self.duty_cycle = kwargs.get('dutyCycle', None)
         # self._packetQueue = queue.Queue()
         self.acks = {}
 
-        self._init_spi()
-        self._init_gpio()
+        self.transport = kwargs.get('transport', None)
+        if self.transport is None:
+            self.transport = SpiDevTransport(self.spiBus, self.spiDevice, self.intPin, self.rstPin,
+                                             self._use_board_pin_numbers)
         self._initialize(freqBand, nodeID, networkID)
 
         self._encrypt(kwargs.get('encryptionKey', 0))
@@ -84,58 +183,45 @@ class Radio:
 
     def _initialize(self, freqBand, nodeID, networkID):
         self._reset_radio()
-        self._set_config(get_config(freqBand, networkID))
+        self._set_config(get_config(freqBand, networkID, self.long_packets, self.modem_profile))
         self._setHighPower(self.isRFM69HW)
-        # Wait for ModeReady
-        while (self._readReg(REG_IRQFLAGS1) & RF_IRQFLAGS1_MODEREADY) == 0x00:
-            pass
+        self._waitModeReady()
 
         self._setAddress(nodeID)
         self._freqBand = freqBand
         self._networkID = networkID
         self._init_interrupt()
 
-    def _init_gpio(self):
-        if self._use_board_pin_numbers:
-            GPIO.setmode(GPIO.BOARD)
-        else:
-            GPIO.setmode(GPIO.BCM)
-        GPIO.setup(self.intPin, GPIO.IN)
-        if self.rstPin:
-            GPIO.setup(self.rstPin, GPIO.OUT)
-
-    def _init_spi(self):
-        #initialize SPI
-        self.spi = spidev.SpiDev()
-        self.spi.open(self.spiBus, self.spiDevice)
-        self.spi.max_speed_hz = 4000000
-
     def _reset_radio(self):
-        if self.rstPin:
-            # Hard reset the RFM module
-            GPIO.output(self.rstPin, GPIO.HIGH)
-            time.sleep(0.3)
-            GPIO.output(self.rstPin, GPIO.LOW)
-            time.sleep(0.3)
+        # The chip is back at its power-on defaults after a reset
+        self._regCache.clear()
+        # Hard reset the RFM module
+        self.transport.reset()
         #verify chip is syncing?
-        start = time.time()
-        while self._readReg(REG_SYNCVALUE1) != 0xAA: # pragma: no cover
-            self._writeReg(REG_SYNCVALUE1, 0xAA)
-            if time.time() - start > 15:
-                raise Exception('Failed to sync with radio')
-        start = time.time()
-        while self._readReg(REG_SYNCVALUE1) != 0x55: # pragma: no cover
-            self._writeReg(REG_SYNCVALUE1, 0x55)
-            if time.time() - start > 15:
-                raise Exception('Failed to sync with radio')
+        for value in (0xAA, 0x55):
+            self._waitFor('sync', lambda value=value: self._checkSyncValue(value), RF69_RESET_TIMEOUT_S)
+
+    def _checkSyncValue(self, value):
+        if self._readReg(REG_SYNCVALUE1, bypassCache=True) == value:
+            return True
+        self._writeReg(REG_SYNCVALUE1, value)
+        return False
 
     def _set_config(self, config):
-        for value in config.values():
-            self._writeReg(value[0], value[1])
+        self._writeRegisters({reg[0]: reg[1] for reg in config.values() if reg[0] <= 0x7F})
+
+    def _writeRegisters(self, values):
+        # Write runs of contiguous registers as auto-incrementing bursts
+        registers = sorted(values.items())
+        start = 0
+        for i in range(1, len(registers) + 1):
+            if i == len(registers) or registers[i][0] != registers[i - 1][0] + 1:
+                self._writeBurst(registers[start][0], [reg[1] for reg in registers[start:i]])
+                start = i
 
     def _init_interrupt(self):
-        GPIO.remove_event_detect(self.intPin)
-        GPIO.add_event_detect(self.intPin, GPIO.RISING, callback=self._interruptHandler)
+        self.transport.remove_interrupt_callback()
+        self.transport.add_interrupt_callback(self._interruptHandler)
 
 
     #
@@ -155,9 +241,7 @@ class Radio:
 
     def set_frequency(self, FRF): # pragma: no cover
         """Set the radio frequency"""
-        self._writeReg(REG_FRFMSB, FRF >> 16)
-        self._writeReg(REG_FRFMID, FRF >> 8)
-        self._writeReg(REG_FRFLSB, FRF)
+        self._writeBurst(REG_FRFMSB, [(FRF >> 16) & 0xFF, (FRF >> 8) & 0xFF, FRF & 0xFF])
 
     def set_frequency_in_Hz(self, frequency_in_Hz): # pragma: no cover
         """Set the radio frequency in Hertz
@@ -168,9 +252,7 @@ class Radio:
         """
         step = 61.03515625
         freq = int(round(frequency_in_Hz / step))
-        self._writeReg(REG_FRFMSB, freq >> 16)
-        self._writeReg(REG_FRFMID, freq >> 8)
-        self._writeReg(REG_FRFLSB, freq)
+        self.set_frequency(freq)
 
     def get_frequency_in_Hz(self):
         """Get the radio frequency in Hertz"""
@@ -206,13 +288,120 @@ class Radio:
         self._writeReg(REG_PALEVEL, (self._readReg(REG_PALEVEL) & 0xE0) | self.powerLevel)
 
 
-    def _send(self, toAddress, buff="", requestACK=False):
+    def apply_profile(self, profile):
+        """Switch to other modem settings without reinitialising the radio
+
+        Only the registers whose values differ from the register shadow are
+        written, contiguous ones in a single burst, so switching between two
+        profiles takes a few SPI transfers. Without registerCache every
+        register of the profile is written. A frame being transmitted is
+        finished first, and a frame that has been received but not yet
+        handled is read out of the FIFO, queued and acknowledged as usual
+        before the switch. The radio leaves RX for the switch and is back in
+        RX before the mode lock is released.
+
+        Args:
+            profile: The name of one of the presets in RFM69.modem.PRESETS, or a ModemProfile
+
+        Raises:
+            ValueError: If the profile is unknown or invalid
+            RFM69.RadioTimeoutError: If a transmission didn't finish in time
+        """
+        compiled = get_profile(profile, self._freqBand)
+        deadline = time.monotonic() + RF69_TX_LIMIT_S
+        while True:
+            ackTo, ackSequence = None, 0
+            with self._intLock, self._modeLock:
+                if self.mode != RF69_MODE_TX:
+                    # Keep AES and the automatic RX restart as they are, only the restart delay changes
+                    target = dict(compiled.registers)
+                    target[REG_PACKETCONFIG2] = ((self._readReg(REG_PACKETCONFIG2) & 0x0B) |
+                                                 (target[REG_PACKETCONFIG2] & 0xF0))
+                    changed = {reg: value for reg, value in target.items() if self._regCache.get(reg) != value}
+                    if changed:
+                        mode = self.mode
+                        if mode == RF69_MODE_RX:
+                            # A frame that has arrived but whose interrupt hasn't been handled yet
+                            # would be lost when RX restarts
+                            received, ackTo, ackSequence = self._receiveFrame()
+                            self._setMode(RF69_MODE_STANDBY)
+                        self._writeRegisters(changed)
+                        if mode == RF69_MODE_RX:
+                            if received:
+                                # Flush what is left of it, as begin_receive would
+                                self._writeReg(REG_PACKETCONFIG2,
+                                               (self._readReg(REG_PACKETCONFIG2) & 0xFB) | RF_PACKET2_RXRESTART)
+                            self._setMode(RF69_MODE_RX)
+                    self.modem_profile = compiled
+                    break
+            if time.monotonic() > deadline:
+                raise RadioTimeoutError("Timed out waiting for a transmission to finish")
+            time.sleep(RF69_WAIT_MIN_SLEEP_S)
+        if ackTo is not None:
+            self._queueAck(ackTo, ackSequence)
+
+    def airtime(self, length):
+        """Time a frame takes to transmit with the current bitrate, preamble, sync word, CRC and encryption settings
+
+        Args:
+            length (int): Bytes in the frame, including the length byte
+
+        Returns:
+            float: Airtime in seconds
+        """
+        bitrate = RF69_FXOSC / max((self._readReg(REG_BITRATEMSB) << 8) | self._readReg(REG_BITRATELSB), 1)
+        preamble = (self._readReg(REG_PREAMBLEMSB) << 8) | self._readReg(REG_PREAMBLELSB)
+        syncConfig = self._readReg(REG_SYNCCONFIG)
+        sync = ((syncConfig >> 3) & 0x07) + 1 if syncConfig & RF_SYNC_ON else 0
+        return frame_airtime(length, bitrate, preamble, sync,
+                             self._readReg(REG_PACKETCONFIG1) & RF_PACKET1_CRC_ON,
+                             self._readReg(REG_PACKETCONFIG2) & RF_PACKET2_AES_ON)
+
+    def remaining_airtime(self):
+        """Airtime left in the duty cycle budget of the sub-band the radio is tuned to
+
+        Returns:
+            float: Seconds, or math.inf if there is no dutyCycle budget or it doesn't cover the frequency
+        """
+        if self.duty_cycle is None:
+            return math.inf
+        return self.duty_cycle.remaining(self.get_frequency_in_Hz())
+
+    def _reserveAirtime(self, buff, overhead):
+        # Called by the transmit thread before each transmission, with the number of header
+        # bytes the driver adds to buff. Returns 0 once the frame's airtime is charged to the
+        # duty cycle budget, or the seconds to hold it back.
+        if self.duty_cycle is None:
+            return 0
+        length = min(len(buff) + overhead, len(self._txBuffer) - 1)
+        return self.duty_cycle.reserve(self.get_frequency_in_Hz(), self.airtime(length))
+
+    def _send(self, toAddress, buff="", requestACK=False, sequence=0):
         self._writeReg(REG_PACKETCONFIG2,
                        (self._readReg(REG_PACKETCONFIG2) & 0xFB) | RF_PACKET2_RXRESTART)
-        now = time.time()
-        while (not self._canSend()) and time.time() - now < RF69_CSMA_LIMIT_S:
-            pass #self.has_received_packet()
-        self._sendFrame(toAddress, buff, requestACK, False)
+        self._waitCanSend()
+        return self._sendFrame(toAddress, buff, requestACK, False, sequence)
+
+    def _numberedAck(self, toAddress, buff, sequence):
+        # Acks carry the sequence byte, echoing the frame's number or 0, only to nodes that
+        # have shown they read it, and only if they have no payload of their own
+        return bool(sequence) or (self.sequence_header and not buff and
+                                  toAddress in self.ack_tracker.sequenced_nodes)
+
+    def _nextSequence(self, toAddress, buff):
+        # Returns the sequence number for a data frame, or 0 to leave it unnumbered. Raw
+        # frames are only numbered if they start with a header for toAddress.
+        if not self.sequence_header or toAddress not in self.ack_tracker.sequenced_nodes:
+            return 0
+        if self.raw_frames:
+            if isinstance(buff, str):
+                buff = buff.encode('latin-1')
+            elif not isinstance(buff, (bytes, bytearray, list, tuple)):
+                buff = memoryview(buff).cast('B')
+            if not 4 <= len(buff) < len(self._txBuffer) - 1 or buff[0] != len(buff) - 1 or \
+                    buff[1] | (buff[3] & CTL_TARGET_HIGH) << 6 != toAddress:
+                return 0
+        return self.ack_tracker.next_sequence(toAddress)
 
 
     def broadcast(self, buff=""):
@@ -226,35 +415,72 @@ class Radio:
     def send(self, toAddress, buff="", **kwargs):
         """Send a message
 
+        The message goes through the transmit queue, see send_async, and this
+        waits for the outcome.
+
         Args:
             toAddress (int): Recipient node's ID
             buff (str): Message buffer to send
 
         Keyword Args:
             attempts (int): Number of attempts
-            wait (int): Milliseconds to wait for acknowledgement
+            wait (int): Milliseconds to wait for acknowledgement. By default the wait adapts to
+                the measured round trip time to the node and doubles on every retry, see
+                RFM69.acks.RttEstimator. waitTime is accepted as an alias.
             require_ack(bool): Require Acknowledgement. If Attempts > 1 this is auto set to True.
+            priority (int): Priority class from RFM69.transmit: PRIORITY_CONTROL, PRIORITY_DATA
+                (the default) or PRIORITY_BULK.
+            deadline (int): Milliseconds from now after which the message is dropped instead
+                of being sent or retried.
 
         Returns:
             bool: If acknowledgement received or None is no acknowledgement requested
+
+        Raises:
+            queue.Full: If the transmit queue for the priority class is full
+            RFM69.RadioTimeoutError: If the deadline passed before the message was sent at all
         """
-        attempts = kwargs.get('attempts', 3)
-        wait_time = kwargs.get('wait', 50)
-        require_ack = kwargs.get('require_ack', True)
-        if attempts > 1:
-            require_ack = True
+        return self.send_async(toAddress, buff, **kwargs).result()
 
-        for _ in range(0, attempts):
-            self._send(toAddress, buff, attempts > 1)
+    def send_async(self, toAddress, buff="", **kwargs):
+        """Queue a message for the transmit thread and return straight away
 
-            if not require_ack:
-                return None
+        Messages are sent by a single background thread, highest priority
+        class first and in order within a class for each node, so any number
+        of application threads can send without each of them waiting for a
+        clear channel or an acknowledgement. A message waiting for its ack
+        holds up later messages to the same node, but not to other nodes
+        once a normal ack round trip has passed. See RFM69.transmit.TxWorker.
 
-            with self._ackLock:
-                if self._ackLock.wait_for(lambda: self._ACKReceived(toAddress), wait_time/1000):
-                    return True
+        Args:
+            toAddress (int): Recipient node's ID
+            buff (str): Message buffer to send. It is read when the message is sent,
+                so mutable buffers must not be changed until the future resolves.
 
-        return False
+        Keyword Args:
+            attempts (int): Number of attempts
+            wait (int): Milliseconds to wait for acknowledgement, see send
+            require_ack(bool): Require Acknowledgement. If Attempts > 1 this is auto set to True.
+            priority (int): Priority class, see send
+            deadline (int): Milliseconds from now after which the message is dropped, see send
+
+        Returns:
+            concurrent.futures.Future: Resolves to what send would return
+
+        Raises:
+            queue.Full: If the transmit queue for the priority class is full
+        """
+        attempts = kwargs.get('attempts', 3)
+        # waitTime is accepted for compatibility with older examples
+        wait_time = kwargs.get('wait', kwargs.get('waitTime', None))
+        require_ack = kwargs.get('require_ack', True)
+        if attempts > 1:
+            require_ack = True
+        deadline = kwargs.get('deadline', None)
+        if deadline is not None:
+            deadline = time.monotonic() + deadline / 1000
+        return self._transmitter().submit(toAddress, buff, attempts, wait_time, require_ack,
+                                          kwargs.get('priority', PRIORITY_DATA), deadline)
 
     def read_temperature(self, calFactor=0):
         """Read the temperature of the radios CMOS chip.
@@ -267,8 +493,8 @@ class Radio:
         """
         self._setMode(RF69_MODE_STANDBY)
         self._writeReg(REG_TEMP1, RF_TEMP1_MEAS_START)
-        while self._readReg(REG_TEMP1) & RF_TEMP1_MEAS_RUNNING:
-            pass
+        self._waitFor('temperature', lambda: not self._readReg(REG_TEMP1) & RF_TEMP1_MEAS_RUNNING,
+                      RF69_TEMPERATURE_TIMEOUT_S)
         # COURSE_TEMP_COEF puts reading in the ballpark, user can add additional correction
         #'complement'corrects the slope, rising temp = rising val
         return (int(~self._readReg(REG_TEMP2)) * -1) + COURSE_TEMP_COEF + calFactor
@@ -280,8 +506,8 @@ class Radio:
         See RFM69 datasheet section [4.3.5. RC Timer Accuracy] for more information.
         """
         self._writeReg(REG_OSC1, RF_OSC1_RCCAL_START)
-        while self._readReg(REG_OSC1) & RF_OSC1_RCCAL_DONE == 0x00:
-            pass
+        self._waitFor('rc_calibration', lambda: self._readReg(REG_OSC1) & RF_OSC1_RCCAL_DONE,
+                      RF69_RCCAL_TIMEOUT_S)
 
     def read_registers(self):
         """Get all register values.
@@ -291,7 +517,7 @@ class Radio:
         """
         results = []
         for address in range(1, 0x50):
-            results.append([str(hex(address)), str(bin(self._readReg(address)))])
+            results.append([str(hex(address)), str(bin(self._readReg(address, bypassCache=True)))])
         return results
 
     def begin_receive(self):
@@ -300,8 +526,12 @@ class Radio:
             if self._readReg(REG_IRQFLAGS2) & RF_IRQFLAGS2_PAYLOADREADY:
                 # avoid RX deadlocks
                 self._writeReg(REG_PACKETCONFIG2, (self._readReg(REG_PACKETCONFIG2) & 0xFB) | RF_PACKET2_RXRESTART)
-            #set DIO0 to "PAYLOADREADY" in receive mode
-            self._writeReg(REG_DIOMAPPING1, RF_DIOMAPPING1_DIO0_01)
+            if self.long_packets:
+                # DIO0 is "SyncAddress", the FIFO is drained while the frame arrives
+                self._writeReg(REG_DIOMAPPING1, RF_DIOMAPPING1_DIO0_10)
+            else:
+                #set DIO0 to "PAYLOADREADY" in receive mode
+                self._writeReg(REG_DIOMAPPING1, RF_DIOMAPPING1_DIO0_01)
             self._setMode(RF69_MODE_RX)
 
     def has_received_packet(self):
@@ -328,21 +558,19 @@ class Radio:
         #     pass
         # return packets
         with self._packetLock:
-            packets = list(self._packets)
-            self._packets = []
-            return packets
+            return self._packets.drain()
 
 
     def send_ack(self, toAddress, buff=""):
         """Send an acknowledgement packet
 
+        Acks jump ahead of every other queued message.
+
         Args:
             toAddress (int): Recipient node's ID
 
         """
-        while not self._canSend():
-            pass #self.has_received_packet()
-        self._sendFrame(toAddress, buff, False, True)
+        self._transmitter().submit(toAddress, buff, 1, 0, False, PRIORITY_ACK).result()
 
 
     # pylint: disable=missing-function-docstring
@@ -350,7 +578,9 @@ class Radio:
     def packets(self):
         warnings.simplefilter("default")
         warnings.warn("The packets property will be deprecated in a future version. Please use get_packets() and num_packets() instead.", DeprecationWarning)
-        return self._packets
+        # A list as before, now a snapshot of the receive queue
+        with self._packetLock:
+            return list(self._packets)
 
 
     def num_packets(self):
@@ -380,13 +610,13 @@ class Radio:
         with self._packetLock:
             # Regardless of blocking, if there's a packet available, return it
             if len(self._packets) > 0:
-                return self._packets.pop(0)
+                return self._packets.popleft()
             # Otherwise, if we're blocking...
             if block:
                 # Wait for us to get a packet
                 if self._packetLock.wait_for(self.has_received_packet, timeout):
                     # If we didn't timeout, the above is True, so we pop a packet
-                    return self._packets.pop(0)
+                    return self._packets.popleft()
 
         return None
 
@@ -394,6 +624,30 @@ class Radio:
     # Internal functions
     #
 
+    def _transmitter(self):
+        with self._modeLock:
+            if self._txClosed:
+                raise RuntimeError("Radio was shut down")
+            if self._txWorker is None:
+                self._txWorker = TxWorker(self, self.transmit_queue)
+            return self._txWorker
+
+    def _queueAck(self, toAddress, sequence=0):
+        # Acks are sent by the transmit thread so the interrupt handler never waits for
+        # the channel. One that can't go out before the sender stops waiting is dropped.
+        # With sequenceHeader they echo the frame's sequence number, 0 if it had none.
+        try:
+            self._transmitter().submit(toAddress, "", 1, 0, False, PRIORITY_ACK,
+                                       time.monotonic() + RF69_ACK_DEADLINE_S, sequence)
+        except (queue.Full, RuntimeError) as error:
+            self._debug("Not sending ack to {}: {}".format(toAddress, error))
+
+    def _queuePacket(self, packet):
+        with self._packetLock:
+            if not self._packets.append(packet):
+                self._debug("Receive queue full, dropped packet from {}".format(packet.sender))
+            self._packetLock.notify_all()
+
     def _setMode(self, newMode):
         with self._modeLock:
             if newMode == self.mode or newMode not in [RF69_MODE_TX, RF69_MODE_RX, RF69_MODE_SYNTH, RF69_MODE_STANDBY, RF69_MODE_SLEEP]:
@@ -419,8 +673,8 @@ class Radio:
                 self._writeReg(REG_OPMODE, (self._readReg(REG_OPMODE) & 0xE3) | RF_OPMODE_SLEEP)
             # we are using packet mode, so this check is not really needed
             # but waiting for mode ready is necessary when going from sleep because the FIFO may not be immediately available from previous mode
-            while self.mode == RF69_MODE_SLEEP and self._readReg(REG_IRQFLAGS1) & RF_IRQFLAGS1_MODEREADY == 0x00:
-                pass
+            if self.mode == RF69_MODE_SLEEP:
+                self._waitModeReady()
 
             self.mode = newMode
 
@@ -438,72 +692,244 @@ class Radio:
             return True
         return False
 
-    def _ACKReceived(self, fromNodeID):
-        if fromNodeID in self.acks:
-            self.acks.pop(fromNodeID, None)
-            return True
-        return False
-
-    def _sendFrame(self, toAddress, buff, requestACK, sendACK):
+    def _sendFrame(self, toAddress, buff, requestACK, sendACK, sequence=0):
         #turn off receiver to prevent reception while filling fifo
         self._setMode(RF69_MODE_STANDBY)
-        #wait for modeReady
-        while (self._readReg(REG_IRQFLAGS1) & RF_IRQFLAGS1_MODEREADY) == 0x00:
-            pass
+        self._waitModeReady()
         # DIO0 is "Packet Sent"
         self._writeReg(REG_DIOMAPPING1, RF_DIOMAPPING1_DIO0_00)
 
         # if len(buff) > RF69_MAX_DATA_LEN:
         #     buff = buff[0:RF69_MAX_DATA_LEN]
 
-        ack = 0
+        # Bits 3-2 hold the high bits of a 10-bit target address, as LowPowerLab nodes expect
+        ack = (toAddress & 0x300) >> 6
         if sendACK:
-            ack = 0x80
+            ack |= CTL_ACK_SENT
         elif requestACK:
-            ack = 0x40
+            ack |= CTL_ACK_REQUESTED
+        numbered = self._numberedAck(toAddress, buff, sequence) if sendACK else sequence
         with self._spiLock:
-            if isinstance(buff, str):
-                # self.spi.xfer2([REG_FIFO | 0x80, len(buff) + 3, toAddress, self.address, ack] + [int(ord(i)) for i in list(buff)])
-                self.spi.xfer2([REG_FIFO | 0x80] + [int(ord(i)) for i in list(buff)])
-            elif isinstance(buff, bytes):
-                self.spi.xfer2([REG_FIFO | 0x80] + list(buff))
+            if sendACK or not self.raw_frames:
+                # Acks are recognised by the CTL byte of their header, so they always carry one
+                if numbered:
+                    length = self._fillTxBuffer(6, buff)
+                    self._txBuffer[1:6] = bytes([length - 2, toAddress & 0xFF, self.address,
+                                                 ack | CTL_SEQUENCE, sequence])
+                else:
+                    length = self._fillTxBuffer(5, buff)
+                    self._txBuffer[1:5] = bytes([length - 2, toAddress & 0xFF, self.address, ack])
+            elif numbered:
+                # The caller's header moves down a byte to make room for the sequence number
+                length = self._fillTxBuffer(2, buff)
+                header = self._txBuffer[2:6]
+                self._txBuffer[1:6] = bytes([header[0] + 1, header[1], header[2],
+                                             header[3] | CTL_SEQUENCE, sequence])
             else:
-                # self.spi.xfer2([REG_FIFO | 0x80, len(buff) + 3, toAddress, self.address, ack] + buff)
-                self.spi.xfer2([REG_FIFO | 0x80] + buff)
+                # Other frames are sent raw, without the [length, toAddress, self.address, ack] header
+                length = self._fillTxBuffer(1, buff)
+            self.transport.write_frame(memoryview(self._txBuffer)[:min(length, 1 + RF69_FIFO_SIZE)])
 
-        with self._sendLock:
-            self._setMode(RF69_MODE_TX)
-            self._sendLock.wait(1.0)
-        self._setMode(RF69_MODE_RX)
+        self._setMode(RF69_MODE_TX)
+        try:
+            if length > 1 + RF69_FIFO_SIZE:
+                self._refillFifo(1 + RF69_FIFO_SIZE, length)
+            # The interrupt handler notifies _sendLock on PacketSent, which ends the wait early
+            self._waitFor('packet_sent', lambda: self._readReg(REG_IRQFLAGS2) & RF_IRQFLAGS2_PACKETSENT,
+                          RF69_TX_LIMIT_S, self._sendLock)
+            # Round trip times for acks are measured from here
+            sentAt = time.monotonic()
+        finally:
+            if self.long_packets:
+                # Without the SyncAddress interrupt a long frame would overrun the FIFO before
+                # anything reads it. Short frames are fine with the CrcOk interrupt DIO0 is left on.
+                self._writeReg(REG_DIOMAPPING1, RF_DIOMAPPING1_DIO0_10)
+            self._setMode(RF69_MODE_RX)
+        return sentAt
+
+    def _refillFifo(self, offset, length):
+        # Stream the rest of a long frame into the FIFO while it is being sent. Once FifoLevel
+        # drops there is room for everything above the threshold. Polls are only
+        # RF69_WAIT_MIN_SLEEP_S apart: at 55.5 kbps that room empties in under 5 ms.
+        room = RF69_FIFO_SIZE - RF69_LONG_FIFO_THRESHOLD
+        deadline = time.monotonic() + RF69_TX_LIMIT_S
+        while offset < length:
+            if self._readReg(REG_IRQFLAGS2) & RF_IRQFLAGS2_FIFOLEVEL:
+                if time.monotonic() > deadline:
+                    raise RadioTimeoutError("Timed out refilling the FIFO")
+                time.sleep(RF69_WAIT_MIN_SLEEP_S)
+                continue
+            end = min(offset + room, length)
+            with self._spiLock:
+                # The byte before the chunk has already been sent, so it can hold the FIFO address
+                self._txBuffer[offset - 1] = REG_FIFO | 0x80
+                self.transport.write_frame(memoryview(self._txBuffer)[offset - 1:end])
+            offset = end
+
+    def _drainFifo(self):
+        # Read a long frame into _rxBuffer as it arrives, from the SyncAddress interrupt until
+        # PayloadReady. Returns False if the frame was lost, when the receiver restarts after a
+        # CRC error or the FIFO stops filling.
+        received, length = 0, None
+        deadline = time.monotonic() + RF69_TX_LIMIT_S
+        while length is None or received < length:
+            flags1, flags2 = self._readBurst(REG_IRQFLAGS1, 2)
+            if flags2 & RF_IRQFLAGS2_PAYLOADREADY:
+                available = RF69_LONG_PACKET_LEN + 1
+            elif flags2 & RF_IRQFLAGS2_FIFOLEVEL:
+                available = RF69_LONG_FIFO_THRESHOLD + 1
+            elif length is None and flags2 & RF_IRQFLAGS2_FIFONOTEMPTY:
+                available = 1
+            elif not flags1 & RF_IRQFLAGS1_SYNCADDRESSMATCH or time.monotonic() > deadline:
+                return False
+            else:
+                time.sleep(RF69_WAIT_MIN_SLEEP_S)
+                continue
+            if length is None:
+                self._rxBuffer[1] = self._readBurst(REG_FIFO, 1)[0]
+                received, length, available = 1, self._rxBuffer[1] + 1, available - 1
+            count = min(available, length - received)
+            if count:
+                self._rxBuffer[1 + received:1 + received + count] = bytes(self._readBurst(REG_FIFO, count))
+                received += count
+        return True
+
+    def _fillTxBuffer(self, offset, buff):
+        # Copy buff into the transmit buffer after the FIFO address and any header bytes.
+        # Frames longer than the FIFO are truncated. Returns the length of the transfer.
+        if isinstance(buff, str):
+            buff = buff.encode('latin-1')
+        end = offset + len(buff)
+        if end <= len(self._txBuffer) and isinstance(buff, (bytes, bytearray, list, tuple)):
+            self._txBuffer[offset:end] = buff
+            return end
+        if not isinstance(buff, (list, tuple)):
+            # Any other object supporting the buffer protocol, viewed as raw bytes
+            buff = memoryview(buff).cast('B')
+        end = min(offset + len(buff), len(self._txBuffer))
+        self._txBuffer[offset:end] = buff[:end - offset]
+        return end
 
     def _readRSSI(self, forceTrigger=False):
         rssi = 0
         if forceTrigger:
             self._writeReg(REG_RSSICONFIG, RF_RSSI_START)
-            while self._readReg(REG_RSSICONFIG) & RF_RSSI_DONE == 0x00:
-                pass
+            self._waitFor('rssi', lambda: self._readReg(REG_RSSICONFIG) & RF_RSSI_DONE, RF69_RSSI_TIMEOUT_S)
         rssi = self._readReg(REG_RSSIVALUE) * -1
         rssi = rssi >> 1
         return rssi
 
+    def _waitModeReady(self):
+        self._waitFor('mode_ready', lambda: self._readReg(REG_IRQFLAGS1) & RF_IRQFLAGS1_MODEREADY,
+                      RF69_MODE_READY_TIMEOUT_S)
+
+    def _waitCanSend(self):
+        # Carrier sense gives up after RF69_CSMA_LIMIT_S and sends anyway
+        try:
+            self._waitFor('csma', self._canSend, RF69_CSMA_LIMIT_S)
+        except RadioTimeoutError:
+            self._debug("Channel busy for {}s, sending anyway".format(RF69_CSMA_LIMIT_S))
+
+    def _waitFor(self, name, predicate, timeout, condition=None):
+        """Wait until predicate() returns a true value
+
+        Polls back to back for RF69_WAIT_SPIN_S, then sleeps between polls for
+        intervals doubling from RF69_WAIT_MIN_SLEEP_S up to RF69_WAIT_MAX_SLEEP_S.
+        If a condition is given there is no spinning and the sleeps are waits on
+        it, so a DIO0 interrupt notifying it ends the sleep straight away. Time spent is added to wait_stats[name].
+
+        Args:
+            name (str): Kind of wait, the key in wait_stats
+            predicate (function): Polled until it returns a true value
+            timeout (float): Deadline in seconds
+            condition (threading.Condition): Notified when the state may have changed
+
+        Returns:
+            The true value returned by predicate
+
+        Raises:
+            RadioTimeoutError: If predicate is still false after timeout seconds
+        """
+        start = time.monotonic()
+        spinUntil = start + RF69_WAIT_SPIN_S if condition is None else start
+        deadline = start + timeout
+        interval = RF69_WAIT_MIN_SLEEP_S
+        polls = 0
+        timedOut = False
+        try:
+            while True:
+                polls += 1
+                result = predicate()
+                if result:
+                    return result
+                now = time.monotonic()
+                if now >= deadline:
+                    timedOut = True
+                    raise RadioTimeoutError("Timed out after {}s waiting for {}".format(timeout, name))
+                if now < spinUntil:
+                    continue
+                delay = min(interval, deadline - now)
+                if condition is None:
+                    time.sleep(delay)
+                else:
+                    with condition:
+                        condition.wait(delay)
+                interval = min(interval * 2, RF69_WAIT_MAX_SLEEP_S)
+        finally:
+            elapsed = time.monotonic() - start
+            # Waits run on the transmit thread, the interrupt thread and callers' threads at once.
+            # Predicates take _spiLock themselves, so it is never held here.
+            with self._spiLock:
+                stats = self.wait_stats.get(name)
+                if stats is None:
+                    stats = self.wait_stats[name] = dict(waits=0, polls=0, timeouts=0, time=0.0)
+                stats['waits'] += 1
+                stats['polls'] += polls
+                stats['timeouts'] += timedOut
+                stats['time'] += elapsed
+
     def _encrypt(self, key):
         self._setMode(RF69_MODE_STANDBY)
         if key != 0 and len(key) == 16:
+            if self.long_packets:
+                raise ValueError("Encryption is limited to frames that fit the FIFO, it can't be used with longPackets")
             self._encryptKey = key
-            with self._spiLock:
-                self.spi.xfer([REG_AESKEY1 | 0x80] + [int(ord(i)) for i in list(key)])
+            self._writeBurst(REG_AESKEY1, [int(ord(i)) for i in list(key)])
             self._writeReg(REG_PACKETCONFIG2, (self._readReg(REG_PACKETCONFIG2) & 0xFE) | RF_PACKET2_AES_ON)
         else:
             self._encryptKey = None
             self._writeReg(REG_PACKETCONFIG2, (self._readReg(REG_PACKETCONFIG2) & 0xFE) | RF_PACKET2_AES_OFF)
 
-    def _readReg(self, addr):
+    def _readReg(self, addr, bypassCache=False):
         with self._spiLock:
-            return self.spi.xfer([addr & 0x7F, 0])[1]
+            if not bypassCache and addr in self._regCache:
+                self.register_cache_hits += 1
+                return self._regCache[addr]
+            value = self.transport.read_register(addr)
+            self._cacheReg(addr, value)
+            return value
 
     def _writeReg(self, addr, value):
         with self._spiLock:
-            self.spi.xfer([addr | 0x80, value])
+            self.transport.write_register(addr, value)
+            self._cacheReg(addr, value)
+
+    def _readBurst(self, addr, length):
+        # Burst reads bypass the register shadow, they are only used for volatile registers
+        with self._spiLock:
+            return self.transport.read_burst(addr, length)
+
+    def _writeBurst(self, addr, values):
+        # The address auto-increments after each byte, so one transfer covers a run of registers
+        with self._spiLock:
+            self.transport.write_burst(addr, values)
+            for offset, value in enumerate(values):
+                self._cacheReg(addr + offset, value)
+
+    def _cacheReg(self, addr, value):
+        # Must be called with the SPI lock held
+        if self._useRegCache and addr not in RF69_VOLATILE_REGS:
+            self._regCache[addr] = value & RF69_SHADOW_MASKS.get(addr, 0xFF)
 
     def _promiscuous(self, onOff):
         self.promiscuousMode = onOff
@@ -531,14 +957,18 @@ class Radio:
 
         Puts the radio to sleep and cleans up the GPIO connections.
         """
-        GPIO.remove_event_detect(self.intPin)
+        with self._modeLock:
+            self._txClosed = True
+        if self._txWorker is not None:
+            # Let a transmission in progress finish, queued messages fail
+            self._txWorker.stop(RF69_CSMA_LIMIT_S + RF69_TX_LIMIT_S)
+        self.transport.remove_interrupt_callback()
         self._modeLock.acquire()
         self._setHighPower(False)
         self.sleep()
-        GPIO.cleanup([self.intPin, self.rstPin])
         self._intLock.acquire()
         self._spiLock.acquire()
-        self.spi.close()
+        self.transport.close()
 
     def __str__(self): # pragma: no cover
         return "Radio RFM69"
@@ -572,69 +1002,106 @@ class Radio:
 
     # pylint: disable=unused-argument
     def _interruptHandler(self, pin): # pragma: no cover
-        self._intLock.acquire()
-        with self._modeLock:
+        # RX is restarted only after both locks are released, since begin_receive
+        # takes _intLock before _modeLock
+        restart, ackTo, ackSequence = False, None, 0
+        with self._intLock, self._modeLock:
             with self._sendLock:
                 self._sendLock.notify_all()
 
-            if self.mode == RF69_MODE_RX and self._readReg(REG_IRQFLAGS2) & RF_IRQFLAGS2_PAYLOADREADY:
-                self._setMode(RF69_MODE_STANDBY)
+            if self.mode == RF69_MODE_RX:
+                restart, ackTo, ackSequence = self._receiveFrame()
 
-                with self._spiLock:
-                    payload_length, target_id, sender_id, CTLbyte = self.spi.xfer2([REG_FIFO & 0x7f, 0, 0, 0, 0])[1:]
-
-                if payload_length > 66:
-                    payload_length = 66
-
-                if not (self.promiscuousMode or target_id == self.address or target_id == RF69_BROADCAST_ADDR):
-                    self._debug("Ignore Interrupt")
-                    self._intLock.release()
-                    self.begin_receive()
-                    return
+        if restart:
+            self.begin_receive()
+        if ackTo is not None:
+            self._debug("Queueing an ack")
+            self._queueAck(ackTo, ackSequence)
+
+    def _receiveFrame(self): # pragma: no cover
+        # Returns whether to restart RX, and the node and sequence number to acknowledge if any
+        receivedNs, receivedWallNs = time.monotonic_ns(), time.time_ns()
+        now = receivedNs / 1e9
+        # RSSI and the IRQ flags are adjacent, so one burst both checks for
+        # PayloadReady and samples the RSSI before we leave RX mode
+        status = self._readBurst(REG_RSSIVALUE, REG_IRQFLAGS2 - REG_RSSIVALUE + 1)
+        if self.long_packets:
+            if not (status[REG_IRQFLAGS1 - REG_RSSIVALUE] & RF_IRQFLAGS1_SYNCADDRESSMATCH or
+                    status[REG_IRQFLAGS2 - REG_RSSIVALUE] & RF_IRQFLAGS2_PAYLOADREADY):
+                return False, None, 0
+            rssi = (status[0] * -1) >> 1
+            lost = not self._drainFifo()
+            self._setMode(RF69_MODE_STANDBY)
+            if lost:
+                self._debug("Lost a long frame")
+                return True, None, 0
+        else:
+            if not status[REG_IRQFLAGS2 - REG_RSSIVALUE] & RF_IRQFLAGS2_PAYLOADREADY:
+                return False, None, 0
+            rssi = (status[0] * -1) >> 1
+            self._setMode(RF69_MODE_STANDBY)
 
-                data_length = payload_length - 3
-                ack_received = bool(CTLbyte & 0x80)
-                ack_requested = bool(CTLbyte & 0x40) and target_id == self.address # Only send back an ack if we're the intended recipient
-                with self._spiLock:
-                    data = self.spi.xfer2([REG_FIFO & 0x7f] + [0 for i in range(0, data_length)])[1:]
-                rssi = self._readRSSI()
-
-                if ack_received:
-                    self._debug("Incoming ack from {}".format(sender_id))
-                    # Record acknowledgement
-                    with self._ackLock:
-                        self.acks.setdefault(sender_id, 1)
-                        self._ackLock.notify_all()
-                elif ack_requested:
-                    self._debug("replying to ack request")
-                else:
-                    self._debug("Other ??")
-
-                # When message received
-                if not ack_received:
-                    self._debug("Incoming data packet")
-                    # self._packetQueue.put(
-                    #     Packet(int(target_id), int(sender_id), int(rssi), list(data))
-                    # )
-                    with self._packetLock:
-                        self._packets.append(
-                            Packet(int(target_id), int(sender_id), int(rssi), list(data))
-                        )
-                        self._packetLock.notify_all()
-
-                # Send acknowledgement if needed
-                if ack_requested and self.auto_acknowledge:
-                    self._debug("Sending an ack")
-                    self._intLock.release()
-                    self.send_ack(sender_id)
-                    self.begin_receive()
-                    return
-
-                self._intLock.release()
-                self.begin_receive()
-                return
+            # Read the length and header, then only as many payload bytes as the length byte
+            # gives. Frames for other nodes are left in the FIFO, which is flushed when RX restarts.
+            with self._spiLock:
+                self._rxBuffer[:5] = self.transport.xfer(self._rxHeaderRequest)
+        payload_length, target_id, sender_id, CTLbyte = self._rxBuffer[1:5]
+        target_id |= (CTLbyte & CTL_TARGET_HIGH) << 6
+        sender_id |= (CTLbyte & CTL_SENDER_HIGH) << 8
+
+        if payload_length > self._maxPayloadLength:
+            payload_length = self._maxPayloadLength
+
+        if not (self.promiscuousMode or target_id == self.address or target_id == RF69_BROADCAST_ADDR):
+            self._debug("Ignore Interrupt")
+            return True, None, 0
+        if not self.long_packets and payload_length > 3:
+            self._rxBuffer[5:2 + payload_length] = bytes(self._readBurst(REG_FIFO, payload_length - 3))
+
+        header = 5
+        sequence = 0
+        if CTLbyte & CTL_SEQUENCE and self.sequence_header and payload_length >= 4:
+            sequence = self._rxBuffer[5]
+            header = 6
+            self.ack_tracker.sequenced_nodes.add(sender_id)
+        data_length = max(payload_length - (header - 2), 0)
+        ack_received = bool(CTLbyte & CTL_ACK_SENT)
+        ack_requested = bool(CTLbyte & CTL_ACK_REQUESTED) and target_id == self.address # Only send back an ack if we're the intended recipient
+        data = bytes(memoryview(self._rxBuffer)[header:header + data_length])
+
+        if ack_received:
+            self._debug("Incoming ack from {}".format(sender_id))
+            # Record acknowledgement
+            with self._ackLock:
+                self.acks.setdefault(sender_id, 1)
+                self._ackLock.notify_all()
+            if self._txWorker is not None:
+                self._txWorker.ack_received(sender_id, sequence, now)
+        elif ack_requested:
+            self._debug("replying to ack request")
+        else:
+            self._debug("Other ??")
+
+        # When message received. Only numbered frames can be told apart from a new frame
+        # with the same payload.
+        if not ack_received and sequence and self.duplicate_filter is not None \
+                and self.duplicate_filter.seen(sender_id, sequence, data, now):
+            self._debug("Duplicate of frame {} from {}".format(sequence, sender_id))
+        elif not ack_received:
+            self._debug("Incoming data packet")
+            # self._packetQueue.put(
+            #     Packet(int(target_id), int(sender_id), int(rssi), list(data))
+            # )
+            packet = Packet(target_id, sender_id, rssi, data, receivedNs, receivedWallNs)
+            if self._packetSink is not None:
+                self._packetSink(packet)
+            else:
+                self._queuePacket(packet)
 
-        self._intLock.release()
+        # Send acknowledgement if needed
+        if ack_requested and self.auto_acknowledge:
+            return True, sender_id, sequence
+        return True, None, 0
 
 
     #
@@ -720,10 +1187,8 @@ class Radio:
     def _listenModeApplyHighSpeedSettings(self): # pragma: no cover
         if not self._isHighSpeed:
             return
-        self._writeReg(REG_BITRATEMSB, RF_BITRATEMSB_200000)
-        self._writeReg(REG_BITRATELSB, RF_BITRATELSB_200000)
-        self._writeReg(REG_FDEVMSB, RF_FDEVMSB_100000)
-        self._writeReg(REG_FDEVLSB, RF_FDEVLSB_100000)
+        self._writeBurst(REG_BITRATEMSB, [RF_BITRATEMSB_200000, RF_BITRATELSB_200000,
+                                          RF_FDEVMSB_100000, RF_FDEVLSB_100000])
         self._writeReg(REG_RXBW, RF_RXBW_DCCFREQ_000 | RF_RXBW_MANT_20 | RF_RXBW_EXP_0)
 
 
@@ -734,15 +1199,15 @@ class Radio:
             toAddress (int): Recipient node's ID
             buff (str): Message buffer to send
         """
-        GPIO.remove_event_detect(self.intPin) #        detachInterrupt(_interruptNum)
+        self.transport.remove_interrupt_callback() #        detachInterrupt(_interruptNum)
         self._setMode(RF69_MODE_STANDBY)
         self._writeReg(REG_PACKETCONFIG1, RF_PACKET1_FORMAT_VARIABLE | RF_PACKET1_DCFREE_WHITENING | RF_PACKET1_CRC_ON | RF_PACKET1_CRCAUTOCLEAR_ON)
         self._writeReg(REG_PACKETCONFIG2, RF_PACKET2_RXRESTARTDELAY_NONE | RF_PACKET2_AUTORXRESTART_ON | RF_PACKET2_AES_OFF)
-        self._writeReg(REG_SYNCVALUE1, 0x5A)
-        self._writeReg(REG_SYNCVALUE2, 0x5A)
+        self._writeBurst(REG_SYNCVALUE1, [0x5A, 0x5A])
         self._listenModeApplyHighSpeedSettings()
-        self._writeReg(REG_FRFMSB, self._readReg(REG_FRFMSB) + 1)
-        self._writeReg(REG_FRFLSB, self._readReg(REG_FRFLSB))      # MUST write to LSB to affect change!
+        # MUST write to LSB to affect change!
+        self._writeBurst(REG_FRFMSB, [(self._readReg(REG_FRFMSB) + 1) & 0xFF,
+                                      self._readReg(REG_FRFMID), self._readReg(REG_FRFLSB)])
 
         cycleDurationMs = int(self._listenCycleDurationUs / 1000)
         timeRemaining = int(cycleDurationMs)
@@ -750,17 +1215,23 @@ class Radio:
         self._setMode(RF69_MODE_TX)
         startTime = int(time.time() * 1000) #millis()
 
-        while timeRemaining > 0:
-            with self._spiLock:
-                if isinstance(buff, str):
-                    self.spi.xfer2([REG_FIFO | 0x80, len(buff) + 4, toAddress, self.address, timeRemaining & 0xFF, (timeRemaining >> 8) & 0xFF] + [int(ord(i)) for i in list(buff)])
-                else:
-                    self.spi.xfer2([REG_FIFO | 0x80, len(buff) + 4, toAddress, self.address, timeRemaining & 0xFF, (timeRemaining >> 8) & 0xFF] + buff)
-
-            while (self._readReg(REG_IRQFLAGS2) & RF_IRQFLAGS2_FIFONOTEMPTY) != 0x00:
-                pass # make sure packet is sent before putting more into the FIFO
-            timeRemaining = cycleDurationMs - (int(time.time()*1000) - startTime)
+        # The payload is copied once, only the time remaining changes between frames
+        with self._spiLock:
+            length = self._fillTxBuffer(6, buff)
+            self._txBuffer[1:4] = bytes([length - 2, toAddress, self.address])
 
-        self._setMode(RF69_MODE_STANDBY)
-        self._reinitRadio()
-        self.begin_receive()
+        try:
+            while timeRemaining > 0:
+                with self._spiLock:
+                    self._txBuffer[4] = timeRemaining & 0xFF
+                    self._txBuffer[5] = (timeRemaining >> 8) & 0xFF
+                    self.transport.write_frame(memoryview(self._txBuffer)[:length])
+
+                # make sure packet is sent before putting more into the FIFO
+                self._waitFor('fifo_empty', lambda: not self._readReg(REG_IRQFLAGS2) & RF_IRQFLAGS2_FIFONOTEMPTY,
+                              RF69_TX_LIMIT_S)
+                timeRemaining = cycleDurationMs - (int(time.time()*1000) - startTime)
+        finally:
+            self._setMode(RF69_MODE_STANDBY)
+            self._reinitRadio()
+            self.begin_receive()
@@ -1087,6 +1087,15 @@ RF69_915MHZ = 91
 # to take advantage of the built in AES/CRC we want to limit the frame
 # size to the internal FIFO size (66 bytes - 3 bytes overhead)
 RF69_MAX_DATA_LEN = 61
+RF69_FIFO_SIZE = 66
+# In long packet mode frames of up to 255 bytes after the length byte stream through the
+# FIFO, which is refilled in TX and drained in RX whenever it crosses the FIFO threshold.
+# AES is not available in this mode.
+RF69_LONG_PACKET_LEN = 255
+RF69_LONG_MAX_DATA_LEN = RF69_LONG_PACKET_LEN - 3
+RF69_LONG_FIFO_THRESHOLD = 32
+# Crystal oscillator frequency, the bitrate is RF69_FXOSC / BitRate
+RF69_FXOSC = 32000000
 
 CSMA_LIMIT = -90 # upper RX signal sensitivity threshold in dBm for carrier sense access
 RF69_MODE_SLEEP = 0 # XTAL OFF
@@ -1101,9 +1110,49 @@ RF69_BROADCAST_ADDR = 0
 RF69_CSMA_LIMIT_MS = 1000
 RF69_CSMA_LIMIT_S = 1
 
+# Deadlines for waiting on the chip, generous compared to the datasheet timings
+RF69_RESET_TIMEOUT_S = 15
+RF69_MODE_READY_TIMEOUT_S = 0.1
+RF69_TX_LIMIT_S = 1
+RF69_TEMPERATURE_TIMEOUT_S = 0.1
+RF69_RCCAL_TIMEOUT_S = 0.1
+RF69_RSSI_TIMEOUT_S = 0.1
+# Acks not sent within this time are dropped, the sender will have given up waiting
+RF69_ACK_DEADLINE_S = 0.1
+# Ack timeouts adapt to the measured round trip time to each node, within these bounds,
+# starting from RF69_ACK_TIMEOUT_INITIAL_S for nodes with no measurements yet
+RF69_ACK_TIMEOUT_INITIAL_S = 0.05
+RF69_ACK_TIMEOUT_MIN_S = 0.02
+RF69_ACK_TIMEOUT_MAX_S = 1
+# Retries wait a random time up to RF69_RETRY_BACKOFF_S, doubling with every attempt
+# up to RF69_RETRY_BACKOFF_MAX_S
+RF69_RETRY_BACKOFF_S = 0.01
+RF69_RETRY_BACKOFF_MAX_S = 0.5
+# Frames received again within this time, with the same sender, sequence number and
+# payload, are retransmissions whose ack was lost
+RF69_DEDUP_EXPIRY_S = 2
+# Partly reassembled messages are discarded after this long without a new fragment
+RF69_FRAGMENT_TIMEOUT_S = 10
+# Duty cycle limits are measured over a sliding window of this many seconds
+RF69_DUTY_CYCLE_WINDOW_S = 3600
+# Waits poll back to back for RF69_WAIT_SPIN_S, then sleep for intervals doubling
+# from RF69_WAIT_MIN_SLEEP_S up to RF69_WAIT_MAX_SLEEP_S
+RF69_WAIT_SPIN_S = 0.0005
+RF69_WAIT_MIN_SLEEP_S = 0.0001
+RF69_WAIT_MAX_SLEEP_S = 0.01
+
 powerLevel = 31
 
 
 # ListenMode Constants
 DEFAULT_LISTEN_RX_US = 256
 DEFAULT_LISTEN_IDLE_US = 1000000
+
+# Registers whose contents are changed by the chip itself and must always be
+# read from hardware rather than from the driver's register shadow
+RF69_VOLATILE_REGS = frozenset([
+    REG_FIFO, REG_OSC1, REG_AFCFEI, REG_AFCMSB, REG_AFCLSB, REG_FEIMSB, REG_FEILSB,
+    REG_RSSICONFIG, REG_RSSIVALUE, REG_IRQFLAGS1, REG_IRQFLAGS2, REG_TEMP1, REG_TEMP2
+])
+# Trigger bits that read back as zero and must not be replayed from the shadow
+RF69_SHADOW_MASKS = {REG_PACKETCONFIG2: 0xFF & ~RF_PACKET2_RXRESTART}
@@ -0,0 +1,185 @@
+import collections
+import threading
+import time
+
+from .registers import *
+from .transport import MemoryTransport
+
+# replay reads the radio's receive queue under the lock its interrupt handler holds
+# pylint: disable=protected-access
+
+# Pass as the speed to replay to deliver each frame as soon as the radio is ready for it
+AS_FAST_AS_POSSIBLE = None
+
+ReplayReport = collections.namedtuple(
+    'ReplayReport', 'offered delivered missed elapsed ingest_rate max_lag '
+                    'queue_high_water queue_dropped queue_growth queue_samples')
+ReplayReport.__doc__ = """Outcome of a replay: frames offered, delivered to the radio and missed
+because it was not ready for them, the seconds the replay took, frames ingested per second, the
+latest a frame was delivered behind schedule in seconds, the receive queue's high water mark and
+drops, its growth in packets per second, and (seconds since the start, queue length) samples"""
+
+
+class ReplayTransport(MemoryTransport):
+    """In-memory module that accepts recorded frames only when the driver is ready for them.
+
+    Like the real module, a frame can only be received while the radio is
+    in RX mode and the previous frame has been read out of the FIFO. A
+    frame arriving at any other time is lost and counted in
+    :attr:`missed`, which is how a gateway that falls behind loses
+    traffic. Frames are delivered through the DIO0 interrupt, so the
+    driver's own interrupt handler reads them.
+
+    Attributes:
+        missed (int): Frames that arrived while the radio was not ready for them
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.missed = 0
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+
+    def deliver(self, frame, rssi, timeout=0):
+        """Deliver a frame as if it had just been received at the given strength
+
+        Args:
+            frame (bytes): Complete frame, starting with the length byte
+            rssi (int): Signal strength in dBm, read back by the driver from RegRssiValue
+            timeout (float): Seconds to wait for the radio to be ready, or None to wait forever.
+                With the default of 0 a frame the radio is not ready for is missed.
+
+        Returns:
+            bool: Whether the frame was delivered
+        """
+        with self._ready:
+            if not self._ready.wait_for(self._isReady, timeout):
+                self.missed += 1
+                return False
+            self.registers[REG_RSSIVALUE] = min(max(-2 * rssi, 0), 0xFF)
+            self.receive(frame)
+            return True
+
+    def wait_ready(self, timeout=None):
+        """Wait until the driver has read the last frame and is receiving again
+
+        Returns:
+            bool: False if timeout seconds passed first
+        """
+        with self._ready:
+            return self._ready.wait_for(self._isReady, timeout)
+
+    def _isReady(self):
+        return self.mode == RF_OPMODE_RECEIVER and not self.registers[REG_IRQFLAGS2] & RF_IRQFLAGS2_PAYLOADREADY
+
+    def _xfer(self, data):
+        with self._lock:
+            return super()._xfer(data)
+
+    def _mode_changed(self):
+        # Called from _xfer with the lock held
+        super()._mode_changed()
+        self._ready.notify_all()
+
+
+def replay(radio, packets, speed=1.0, consumer=None, sampleInterval=0.1):
+    """Feed recorded packets into a radio through its interrupt handler
+
+    Each packet becomes a frame with its receiver, sender and payload,
+    received at its recorded RSSI, so the frame goes through the same
+    receive path, filters and receive queue as live traffic. Frames are
+    delivered with the gaps between their received_ns times divided by
+    speed; a frame due while the radio is still busy with the previous
+    one is missed. With a speed of AS_FAST_AS_POSSIBLE each frame is
+    delivered as soon as the radio is ready, and the ingest rate is the
+    most the driver can sustain.
+
+    The radio must use a :class:`ReplayTransport`. Packets addressed to
+    other nodes are dropped by the driver unless it was created with
+    promiscuousMode. Packets from a :class:`RFM69.journal.JournalReader`
+    scan or from :func:`RFM69.packet.from_binary` can be replayed as they
+    are.
+
+    Args:
+        radio (Radio): The radio to feed
+        packets (iterable): Packet objects in the order they were received
+        speed (float): How many times faster than recorded to replay, or AS_FAST_AS_POSSIBLE
+        consumer (callable): If given, called with each packet from the receive queue on a
+            separate thread while the replay runs, like the application would. It finishes
+            the packets still queued, after the last queue sample, before replay returns.
+        sampleInterval (float): Seconds between samples of the receive queue length
+
+    Returns:
+        ReplayReport: The counts, rates and queue samples
+    """
+    transport = radio.transport
+    if not isinstance(transport, ReplayTransport):
+        raise ValueError("The radio must use a ReplayTransport")
+    if speed is not AS_FAST_AS_POSSIBLE and speed <= 0:
+        raise ValueError("speed must be positive")
+    stop = threading.Event()
+    thread = None
+    if consumer is not None:
+        thread = threading.Thread(target=_consume, args=(radio, consumer, stop), name="rfm69-replay", daemon=True)
+        thread.start()
+
+    radio.begin_receive()
+    with radio._packetLock:
+        initialLength = len(radio.receive_queue)
+        radio.receive_queue.reset_counters()
+    offered = delivered = 0
+    missedBefore = transport.missed
+    maxLag = 0.0
+    first = None
+    start = time.monotonic()
+    samples = [(0.0, initialLength)]
+    nextSample = start + sampleInterval
+    for packet in packets:
+        payload = packet.payload
+        receiver, sender = packet.receiver, packet.sender
+        # 10-bit node IDs keep their high bits in the CTL byte, as LowPowerLab nodes send them
+        frame = bytes((len(payload) + 3, receiver & 0xFF, sender & 0xFF,
+                       (receiver & 0x300) >> 6 | (sender & 0x300) >> 8)) + payload
+        offered += 1
+        if speed is AS_FAST_AS_POSSIBLE:
+            delivered += transport.deliver(frame, packet.RSSI, None)
+        else:
+            if first is None:
+                first = packet.received_ns
+            due = start + (packet.received_ns - first) / 1e9 / speed
+            now = time.monotonic()
+            while now < due:
+                time.sleep(min(due - now, max(nextSample - now, 0)))
+                now = time.monotonic()
+                if now >= nextSample:
+                    samples.append((now - start, radio.num_packets()))
+                    nextSample = now + sampleInterval
+            maxLag = max(maxLag, now - due)
+            delivered += transport.deliver(frame, packet.RSSI)
+        now = time.monotonic()
+        if now >= nextSample:
+            samples.append((now - start, radio.num_packets()))
+            nextSample = now + sampleInterval
+    # Count the last frame once the driver has queued it
+    transport.wait_ready(1.0)
+    elapsed = time.monotonic() - start
+    length = radio.num_packets()
+    samples.append((elapsed, length))
+    stop.set()
+    if thread is not None:
+        thread.join()
+
+    with radio._packetLock:
+        highWater, dropped = radio.receive_queue.high_water, radio.receive_queue.dropped
+    return ReplayReport(offered, delivered, transport.missed - missedBefore, elapsed,
+                        delivered / elapsed if elapsed else 0.0, maxLag, highWater, dropped,
+                        (length - initialLength) / elapsed if elapsed else 0.0, samples)
+
+
+def _consume(radio, consumer, stop):
+    while True:
+        packet = radio.get_packet(timeout=0.05)
+        if packet is not None:
+            consumer(packet)
+        elif stop.is_set():
+            return
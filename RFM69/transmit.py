@@ -0,0 +1,384 @@
+import collections
+import heapq
+import itertools
+import queue
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+from .exceptions import RadioTimeoutError
+from .registers import RF69_ACK_TIMEOUT_MAX_S, RF69_RETRY_BACKOFF_S, RF69_RETRY_BACKOFF_MAX_S
+
+# TxWorker drives the radio's own transmit path
+# pylint: disable=protected-access
+
+PRIORITY_ACK = 0
+PRIORITY_CONTROL = 1
+PRIORITY_DATA = 2
+PRIORITY_BULK = 3
+
+DEFAULT_QUEUE_DEPTHS = {
+    PRIORITY_ACK: 16,
+    PRIORITY_CONTROL: 32,
+    PRIORITY_DATA: 64,
+    PRIORITY_BULK: 256,
+}
+
+_WAKE = 0
+_ACK = 1
+_STOP = 2
+
+
+class _Request:
+    # pylint: disable=too-few-public-methods,too-many-arguments,too-many-instance-attributes
+    __slots__ = ('future', 'toAddress', 'buff', 'attempts', 'attemptsLeft', 'wait', 'requireAck',
+                 'priority', 'deadline', 'ackDeadline', 'sequence')
+
+    def __init__(self, toAddress, buff, attempts, wait, requireAck, priority, deadline, sequence=None):
+        self.future = Future()
+        self.toAddress = toAddress
+        self.buff = buff
+        self.attempts = attempts
+        self.attemptsLeft = attempts
+        self.wait = wait
+        self.requireAck = requireAck
+        self.priority = priority
+        self.deadline = deadline
+        self.ackDeadline = None
+        self.sequence = sequence
+
+    def missed(self):
+        # The deadline passed before the frame (or its retry) could go out
+        if self.attemptsLeft < self.attempts:
+            self.future.set_result(False)
+        else:
+            self.future.set_exception(RadioTimeoutError("Transmit deadline passed before the frame was sent"))
+
+
+class TxScheduler:
+    """Priority queues of frames waiting to be transmitted.
+
+    There is one first-in first-out queue per priority class, from
+    PRIORITY_ACK (highest) through PRIORITY_CONTROL and PRIORITY_DATA to
+    PRIORITY_BULK, each with its own maximum depth. Frames can carry a
+    deadline; a frame still queued when its deadline passes is dropped
+    when it would have been dequeued, instead of taking up airtime.
+
+    Args:
+        depths (dict): Maximum number of queued frames for each priority class.
+            Classes not given use DEFAULT_QUEUE_DEPTHS.
+
+    Attributes:
+        rejected (list): Per priority class, frames refused because the queue was full
+        expired (list): Per priority class, frames dropped because their deadline passed
+    """
+
+    def __init__(self, depths=None):
+        self.depths = dict(DEFAULT_QUEUE_DEPTHS)
+        self.depths.update(depths or {})
+        self.rejected = [0] * len(DEFAULT_QUEUE_DEPTHS)
+        self.expired = [0] * len(DEFAULT_QUEUE_DEPTHS)
+        self._queues = [collections.deque() for _ in DEFAULT_QUEUE_DEPTHS]
+        self._lock = threading.Lock()
+
+    def push(self, request, retry=False):
+        """Queue a frame at the back of its class, or at the front for a retry
+
+        Raises:
+            queue.Full: If the class is at its maximum depth
+        """
+        with self._lock:
+            classQueue = self._queues[request.priority]
+            if retry:
+                classQueue.appendleft(request)
+                return
+            if len(classQueue) >= self.depths[request.priority]:
+                self.rejected[request.priority] += 1
+                raise queue.Full("Transmit queue for priority {} is full".format(request.priority))
+            classQueue.append(request)
+
+    def pop(self, lowest=PRIORITY_BULK, busy=()):
+        """Remove the next frame to send, considering classes up to lowest
+
+        Frames whose deadline has passed are resolved and skipped. Frames to
+        busy nodes, other than acks, stay queued in order behind the frames
+        that can go out.
+
+        Args:
+            lowest (int): Lowest priority class to consider
+            busy (collection): Nodes that must not be sent anything but acks for now
+
+        Returns:
+            The request, or None if there is nothing to send
+        """
+        now = time.monotonic()
+        with self._lock:
+            for priority in range(lowest + 1):
+                classQueue = self._queues[priority]
+                index = 0
+                while index < len(classQueue):
+                    request = classQueue[index]
+                    if request.future.done():
+                        # A retry whose earlier attempt was acknowledged after all
+                        del classQueue[index]
+                        continue
+                    if request.deadline is not None and request.deadline <= now:
+                        del classQueue[index]
+                        self.expired[priority] += 1
+                        if request.future.running() or request.future.set_running_or_notify_cancel():
+                            request.missed()
+                        continue
+                    if priority != PRIORITY_ACK and request.toAddress in busy:
+                        index += 1
+                        continue
+                    del classQueue[index]
+                    if request.future.running() or request.future.set_running_or_notify_cancel():
+                        return request
+        return None
+
+    def drain(self):
+        """Remove and return every queued frame"""
+        with self._lock:
+            requests = [request for classQueue in self._queues for request in classQueue]
+            for classQueue in self._queues:
+                classQueue.clear()
+            return requests
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(classQueue) for classQueue in self._queues)
+
+
+class TxWorker:
+    """Thread transmitting the frames queued in a :class:`TxScheduler`.
+
+    Frames go out highest priority first. Frames that don't need an
+    acknowledgement go out back to back. After a frame that does, the worker
+    leaves the channel quiet, but for acks to other nodes, until the ack
+    arrives or the tracker's ack timeout for the node runs out, since the
+    ack would otherwise collide with the next frame. Past that the frame
+    keeps waiting for its ack for the rest of its wait, but frames to other
+    nodes go out meanwhile, so a slow or absent node holds up the others
+    for no more than a normal ack round trip: one frame can be waiting for
+    an ack per node. Nothing but acks is sent to a node with a frame
+    waiting or backing off, so frames to a node keep their order. The
+    module can't hear an ack while it is transmitting, and the node holds
+    its ack back while the channel is busy, so every transmission pushes
+    back the ack deadlines of the frames already waiting by the time it
+    took. The interrupt handler reports
+    incoming acks with :meth:`ack_received`, so no thread polls for them,
+    and the radio's :class:`RFM69.acks.AckTracker` matches each one to the
+    frame it acknowledges and resolves only that frame's future.
+
+    Frames sent without a fixed wait time wait for their ack for the
+    tracker's timeout for the node, doubled on every retry. Before a retry
+    the worker backs off for a random time up to RF69_RETRY_BACKOFF_S,
+    doubling with each attempt, so nodes whose frames collided don't
+    collide again. Other frames can go out meanwhile.
+
+    If the radio has a duty cycle budget every transmission, acks and
+    retries included, is charged to it first. A frame over budget with the
+    delay policy is held back, and nothing else is sent until it has gone
+    out, so frames keep their order and the budget isn't spent on later
+    ones. See RFM69.dutycycle.DutyCycleBudget.
+
+    Args:
+        radio (Radio): The radio to transmit with
+        scheduler (TxScheduler): Queues to take frames from
+    """
+
+    def __init__(self, radio, scheduler):
+        self._radio = radio
+        self._scheduler = scheduler
+        self._events = queue.Queue()
+        # The frame waiting for an ack from each node
+        self._awaiting = {}
+        # Only acks are sent before this time.monotonic() value, unless the ack for _quietFor arrives
+        self._quietUntil = 0
+        self._quietFor = None
+        # Heap of (time, tiebreak, request) for retries backing off and frames held for duty cycle budget
+        self._backingOff = []
+        self._tiebreak = itertools.count()
+        # Nothing is sent before this time.monotonic() value while a frame waits for duty cycle budget
+        self._holdUntil = 0
+        self._thread = threading.Thread(target=self._run, name="rfm69-tx", daemon=True)
+        self._thread.start()
+
+    def submit(self, toAddress, buff, attempts, wait, requireAck, priority=PRIORITY_DATA, deadline=None,
+               sequence=None):
+        """Queue a frame
+
+        Args:
+            wait (int): Milliseconds to wait for an ack, or None to adapt to the round trip time
+            priority (int): One of the PRIORITY_* classes. Acks are sent with PRIORITY_ACK.
+            deadline (float): time.monotonic() value after which the frame is not worth sending
+            sequence (int): Sequence number for the byte after the header. Acks echo the one they
+                acknowledge; other frames are numbered when first sent, or left at 0.
+
+        Returns:
+            Future: Resolves like Radio.send would return
+
+        Raises:
+            queue.Full: If the queue for the priority class is full
+        """
+        request = _Request(toAddress, buff, attempts, wait, requireAck, priority, deadline, sequence)
+        self._scheduler.push(request)
+        self._events.put((_WAKE, None))
+        return request.future
+
+    def ack_received(self, sender, sequence, when):
+        """Called from the interrupt handler for every ack received
+
+        Args:
+            sender (int): Node the ack came from
+            sequence (int): Sequence number in the ack's CTL byte
+            when (float): time.monotonic() value when the ack arrived
+        """
+        self._events.put((_ACK, (sender, sequence, when)))
+
+    def stop(self, timeout=None):
+        """Stop the worker, failing frames that are still queued or waiting for an ack
+
+        Args:
+            timeout (float): Seconds to wait for a transmission in progress to finish
+        """
+        self._events.put((_STOP, None))
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            timeout = None
+            wakeAt = [request.ackDeadline for request in self._awaiting.values()]
+            if self._quietFor is not None:
+                wakeAt.append(self._quietUntil)
+            if self._backingOff:
+                wakeAt.append(self._backingOff[0][0])
+            if wakeAt:
+                timeout = max(min(wakeAt) - time.monotonic(), 0)
+            try:
+                kind, item = self._events.get(timeout=timeout)
+            except queue.Empty:
+                kind, item = None, None
+            if kind == _STOP:
+                self._failAll()
+                return
+            if kind == _ACK:
+                self._radio.ack_tracker.received(*item)
+            self._expire()
+            self._retry()
+            while self._holdUntil <= time.monotonic():
+                lowest = PRIORITY_BULK if self._quietUntil <= time.monotonic() else PRIORITY_ACK
+                request = self._scheduler.pop(lowest, self._busy())
+                if request is None:
+                    break
+                self._transmit(request)
+
+    def _transmit(self, request):
+        radio = self._radio
+        try:
+            if request.priority == PRIORITY_ACK:
+                overhead = 5 if radio._numberedAck(request.toAddress, request.buff, request.sequence) else 4
+            else:
+                if request.sequence is None:
+                    # Retries keep the sequence number, so an ack for any attempt matches
+                    request.sequence = radio._nextSequence(request.toAddress, request.buff)
+                overhead = (0 if radio.raw_frames else 4) + (1 if request.sequence else 0)
+            hold = radio._reserveAirtime(request.buff, overhead)
+            if hold:
+                # Back in its queue, ahead of the frames behind it, once the budget allows
+                self._holdUntil = time.monotonic() + hold
+                heapq.heappush(self._backingOff, (self._holdUntil, next(self._tiebreak), request))
+                return
+            started = time.monotonic()
+            if request.priority == PRIORITY_ACK:
+                radio._waitCanSend()
+                radio._sendFrame(request.toAddress, request.buff, False, True, request.sequence or 0)
+                self._delayAcks(time.monotonic() - started)
+                request.future.set_result(None)
+                return
+            if request.requireAck and request.attemptsLeft == request.attempts:
+                radio.ack_tracker.expect(request.toAddress, request.sequence,
+                                         lambda record, request=request: self._acked(request))
+                # However the frame ends, acked, given up on or shut down, stop expecting its ack
+                request.future.add_done_callback(
+                    lambda future, request=request: radio.ack_tracker.forget(request.toAddress,
+                                                                             request.sequence))
+            sentAt = radio._send(request.toAddress, request.buff, request.requireAck, request.sequence)
+        except Exception as error: # pylint: disable=broad-except
+            request.future.set_exception(error)
+            return
+        self._delayAcks(sentAt - started)
+        request.attemptsLeft -= 1
+        if not request.requireAck:
+            request.future.set_result(None)
+            return
+        radio.ack_tracker.sent(request.toAddress, request.sequence, sentAt)
+        if request.wait is None:
+            sent = request.attempts - request.attemptsLeft
+            wait = min(radio.ack_tracker.timeout(request.toAddress) * 2 ** (sent - 1), RF69_ACK_TIMEOUT_MAX_S)
+        else:
+            wait = request.wait / 1000
+        request.ackDeadline = sentAt + wait
+        self._awaiting[request.toAddress] = request
+        self._quietUntil = sentAt + min(wait, radio.ack_tracker.timeout(request.toAddress))
+        self._quietFor = request
+
+    def _busy(self):
+        # Nodes with a frame waiting for its ack or backing off before a retry, which later
+        # frames to the node must not overtake
+        busy = set(self._awaiting)
+        busy.update(entry[2].toAddress for entry in self._backingOff)
+        return busy
+
+    def _delayAcks(self, busy):
+        # Acks can't be heard, and aren't sent, while this radio transmits
+        for request in self._awaiting.values():
+            request.ackDeadline += busy
+
+    def _acked(self, request):
+        # Called by the ack tracker, on this thread, for the frame the ack matched
+        if self._awaiting.get(request.toAddress) is request:
+            del self._awaiting[request.toAddress]
+        if self._quietFor is request:
+            self._quietUntil, self._quietFor = 0, None
+        with self._radio._ackLock:
+            self._radio.acks.pop(request.toAddress, None)
+        request.future.set_result(True)
+
+    def _expire(self):
+        now = time.monotonic()
+        if self._quietFor is not None and self._quietUntil <= now:
+            self._quietFor = None
+        expired = [request for request in self._awaiting.values() if request.ackDeadline <= now]
+        for request in expired:
+            del self._awaiting[request.toAddress]
+            if request.attemptsLeft > 0:
+                sent = request.attempts - request.attemptsLeft
+                backoff = random.uniform(0, min(RF69_RETRY_BACKOFF_S * 2 ** (sent - 1), RF69_RETRY_BACKOFF_MAX_S))
+                heapq.heappush(self._backingOff, (now + backoff, next(self._tiebreak), request))
+            else:
+                request.future.set_result(False)
+
+    def _retry(self):
+        now = time.monotonic()
+        while self._backingOff and self._backingOff[0][0] <= now:
+            request = heapq.heappop(self._backingOff)[2]
+            # Retries go ahead of new frames of the same class, but behind acks
+            self._scheduler.push(request, retry=True)
+
+    def _failAll(self):
+        error = RuntimeError("Radio was shut down")
+        for request in self._awaiting.values():
+            request.future.set_exception(error)
+        self._awaiting.clear()
+        backingOff = [entry[2] for entry in self._backingOff]
+        self._backingOff.clear()
+        for request in backingOff:
+            if not request.future.done():
+                request.future.set_exception(error)
+        for request in self._scheduler.drain():
+            if request.future.running():
+                request.future.set_exception(error)
+            else:
+                request.future.cancel()
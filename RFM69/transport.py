@@ -0,0 +1,361 @@
+import queue
+import threading
+import time
+
+from .registers import *
+
+
+class Transport:
+    """Connection between :class:`RFM69.Radio` and an RFM69 module.
+
+    A transport moves bytes over SPI, delivers rising edges on the DIO0
+    interrupt pin and drives the reset pin. Subclasses implement
+    :meth:`_xfer` and the GPIO methods; register helpers are built on top
+    of :meth:`xfer`. The radio serialises all calls with its own SPI lock.
+
+    Attributes:
+        transactions (int): Number of SPI transactions performed
+        bytes_transferred (int): Number of bytes clocked over SPI, including address bytes
+    """
+
+    def __init__(self):
+        self.transactions = 0
+        self.bytes_transferred = 0
+
+    def xfer(self, data):
+        """Perform a full duplex SPI transaction with chip select held throughout
+
+        Args:
+            data (list): Bytes to send, starting with the register address
+
+        Returns:
+            list: Bytes clocked in while sending data
+        """
+        self.transactions += 1
+        self.bytes_transferred += len(data)
+        return self._xfer(data)
+
+    def write_frame(self, frame):
+        """Write a prebuilt transaction without reading anything back
+
+        Args:
+            frame: Any buffer-protocol object starting with the register address
+        """
+        self.transactions += 1
+        self.bytes_transferred += len(frame)
+        self._write(frame)
+
+    def read_register(self, addr):
+        """Read a single register"""
+        return self.xfer([addr & 0x7F, 0])[1]
+
+    def write_register(self, addr, value):
+        """Write a single register"""
+        self.xfer([addr | 0x80, value])
+
+    def read_burst(self, addr, length):
+        """Read length bytes starting at addr. Reads of REG_FIFO drain the FIFO."""
+        return self.xfer([addr & 0x7F] + [0] * length)[1:]
+
+    def write_burst(self, addr, values):
+        """Write values to consecutive registers starting at addr"""
+        self.xfer([addr | 0x80] + list(values))
+
+    def reset_counters(self):
+        """Zero the transaction and byte counters"""
+        self.transactions = 0
+        self.bytes_transferred = 0
+
+    def add_interrupt_callback(self, callback):
+        """Call callback(pin) on every rising edge of DIO0"""
+        raise NotImplementedError
+
+    def remove_interrupt_callback(self):
+        """Stop delivering interrupts"""
+        raise NotImplementedError
+
+    def reset(self):
+        """Hard reset the module, if a reset pin is connected"""
+        raise NotImplementedError
+
+    def close(self):
+        """Release the SPI device and GPIO pins"""
+        raise NotImplementedError
+
+    def _xfer(self, data):
+        raise NotImplementedError
+
+    def _write(self, frame):
+        self._xfer(list(frame))
+
+
+class SpiDevTransport(Transport):
+    """Transport using spidev and RPi.GPIO on a Raspberry Pi.
+
+    Args:
+        spiBus (int): SPI bus number.
+        spiDevice (int): SPI device number.
+        interruptPin (int): Pin number of interrupt pin.
+        resetPin (int): Pin number of reset pin, or None if not connected.
+        use_board_pin_numbers (bool): Use BOARD (not BCM) pin numbers. Defaults to True.
+    """
+
+    def __init__(self, spiBus, spiDevice, interruptPin, resetPin, use_board_pin_numbers=True):
+        super().__init__()
+        import spidev
+        import RPi.GPIO as GPIO # pylint: disable=consider-using-from-import
+        self._GPIO = GPIO
+        self.intPin = interruptPin
+        self.rstPin = resetPin
+
+        self.spi = spidev.SpiDev()
+        self.spi.open(spiBus, spiDevice)
+        self.spi.max_speed_hz = 4000000
+
+        if use_board_pin_numbers:
+            GPIO.setmode(GPIO.BOARD)
+        else:
+            GPIO.setmode(GPIO.BCM)
+        GPIO.setup(self.intPin, GPIO.IN)
+        if self.rstPin:
+            GPIO.setup(self.rstPin, GPIO.OUT)
+
+    def _xfer(self, data):
+        return self.spi.xfer2(data)
+
+    def _write(self, frame):
+        self.spi.writebytes2(frame)
+
+    def add_interrupt_callback(self, callback):
+        self._GPIO.add_event_detect(self.intPin, self._GPIO.RISING, callback=callback)
+
+    def remove_interrupt_callback(self):
+        self._GPIO.remove_event_detect(self.intPin)
+
+    def reset(self):
+        if self.rstPin:
+            self._GPIO.output(self.rstPin, self._GPIO.HIGH)
+            time.sleep(0.3)
+            self._GPIO.output(self.rstPin, self._GPIO.LOW)
+            time.sleep(0.3)
+
+    def close(self):
+        self._GPIO.cleanup([self.intPin, self.rstPin])
+        self.spi.close()
+
+
+class GpiodTransport(Transport):
+    """Transport using spidev and the Linux GPIO character device (libgpiod 2.x bindings).
+
+    Pins are line offsets on the GPIO chip, which on a Raspberry Pi are the BCM numbers.
+
+    Args:
+        spiBus (int): SPI bus number.
+        spiDevice (int): SPI device number.
+        interruptPin (int): Line offset of the interrupt pin.
+        resetPin (int): Line offset of the reset pin, or None if not connected.
+        chip (str): Path of the GPIO character device. Defaults to /dev/gpiochip0.
+    """
+
+    def __init__(self, spiBus, spiDevice, interruptPin, resetPin, chip='/dev/gpiochip0'):
+        super().__init__()
+        import spidev
+        import gpiod
+        from gpiod.line import Direction, Edge, Value
+        self._Value = Value
+        self.intPin = interruptPin
+        self.rstPin = resetPin
+
+        self.spi = spidev.SpiDev()
+        self.spi.open(spiBus, spiDevice)
+        self.spi.max_speed_hz = 4000000
+
+        config = {interruptPin: gpiod.LineSettings(direction=Direction.INPUT, edge_detection=Edge.RISING)}
+        if resetPin:
+            config[resetPin] = gpiod.LineSettings(direction=Direction.OUTPUT, output_value=Value.INACTIVE)
+        self._request = gpiod.request_lines(chip, consumer="rpi-rfm69", config=config)
+
+        self._callback = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _xfer(self, data):
+        return self.spi.xfer2(data)
+
+    def _write(self, frame):
+        self.spi.writebytes2(frame)
+
+    def _watch_edges(self):
+        while not self._stop.is_set():
+            if self._request.wait_edge_events(0.1):
+                for event in self._request.read_edge_events():
+                    callback = self._callback
+                    if callback is not None:
+                        callback(event.line_offset)
+
+    def add_interrupt_callback(self, callback):
+        self._callback = callback
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._watch_edges, name="rfm69-gpiod", daemon=True)
+            self._thread.start()
+
+    def remove_interrupt_callback(self):
+        self._callback = None
+
+    def reset(self):
+        if self.rstPin:
+            self._request.set_value(self.rstPin, self._Value.ACTIVE)
+            time.sleep(0.3)
+            self._request.set_value(self.rstPin, self._Value.INACTIVE)
+            time.sleep(0.3)
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            # The watcher may be blocked in the radio's handler, so don't wait forever
+            self._thread.join(1.0)
+        self._request.release()
+        self.spi.close()
+
+
+class MemoryTransport(Transport):
+    """In-memory stand-in for an RFM69 module, for running the driver without hardware.
+
+    Registers are kept in a bytearray and read back what was written, with
+    the calibration, temperature and RSSI triggers completing instantly and
+    ModeReady always set. Frames written to the FIFO are recorded in
+    :attr:`sent` when the radio enters TX mode, and frames passed to
+    :meth:`receive` are delivered as if they had just arrived over the air.
+    Interrupts are delivered from a separate thread, like RPi.GPIO does.
+
+    Attributes:
+        sent (list): Frames transmitted so far, as bytes
+        registers (bytearray): Register contents
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.registers = bytearray(0x80)
+        self.registers[REG_OPMODE] = RF_OPMODE_STANDBY
+        self.registers[REG_IRQFLAGS1] = RF_IRQFLAGS1_MODEREADY
+        self.registers[REG_RSSIVALUE] = 0xFF
+        self.fifo = bytearray()
+        self.sent = []
+        self.intPin = None
+        self._callback = None
+        self._events = None
+        self._thread = None
+
+    @property
+    def mode(self):
+        """The RF_OPMODE_* mode bits of REG_OPMODE"""
+        return self.registers[REG_OPMODE] & 0x1C
+
+    def receive(self, frame):
+        """Deliver a frame as if it had just been received over the air
+
+        Args:
+            frame (bytes): Complete frame, starting with the length byte
+        """
+        self.fifo[:] = frame
+        self.registers[REG_IRQFLAGS2] |= RF_IRQFLAGS2_PAYLOADREADY
+        if self.mode == RF_OPMODE_RECEIVER and self._dio0Mapping() == RF_DIOMAPPING1_DIO0_01:
+            self.interrupt()
+
+    def interrupt(self):
+        """Raise a rising edge on DIO0"""
+        if self._events is not None:
+            self._events.put(self.intPin)
+
+    def _dio0Mapping(self):
+        return self.registers[REG_DIOMAPPING1] & 0xC0
+
+    def _xfer(self, data):
+        addr = data[0] & 0x7F
+        write = data[0] & 0x80
+        result = [0]
+        for value in data[1:]:
+            if write:
+                self._write_register(addr, value)
+                result.append(0)
+            else:
+                result.append(self._read_register(addr))
+            if addr != REG_FIFO:
+                addr += 1
+        return result
+
+    def _read_register(self, addr):
+        if addr == REG_FIFO:
+            return self._read_fifo()
+        if addr == REG_IRQFLAGS2:
+            flags = self.registers[REG_IRQFLAGS2] & ~RF_IRQFLAGS2_FIFONOTEMPTY
+            return flags | (RF_IRQFLAGS2_FIFONOTEMPTY if self.fifo else 0)
+        return self.registers[addr]
+
+    def _write_register(self, addr, value):
+        if addr == REG_FIFO:
+            self.fifo.append(value)
+            return
+        if addr == REG_OSC1 and value & RF_OSC1_RCCAL_START:
+            value = RF_OSC1_RCCAL_DONE
+        elif addr == REG_TEMP1:
+            value &= ~RF_TEMP1_MEAS_RUNNING
+        elif addr == REG_RSSICONFIG and value & RF_RSSI_START:
+            value = RF_RSSI_DONE
+        elif addr == REG_PACKETCONFIG2:
+            if value & RF_PACKET2_RXRESTART:
+                # Restarting the receiver flushes whatever is left of the last frame
+                self.fifo.clear()
+                self.registers[REG_IRQFLAGS2] &= ~RF_IRQFLAGS2_PAYLOADREADY
+            value &= ~RF_PACKET2_RXRESTART
+        self.registers[addr] = value
+        if addr == REG_OPMODE:
+            self._mode_changed()
+
+    def _read_fifo(self):
+        if not self.fifo:
+            return 0
+        value = self.fifo.pop(0)
+        if not self.fifo:
+            self.registers[REG_IRQFLAGS2] &= ~RF_IRQFLAGS2_PAYLOADREADY
+        return value
+
+    def _mode_changed(self):
+        self.registers[REG_IRQFLAGS2] &= ~RF_IRQFLAGS2_PACKETSENT
+        if self.mode == RF_OPMODE_TRANSMITTER and self.fifo:
+            self.sent.append(bytes(self.fifo))
+            self.fifo.clear()
+            self.registers[REG_IRQFLAGS2] |= RF_IRQFLAGS2_PACKETSENT
+            if self._dio0Mapping() == RF_DIOMAPPING1_DIO0_00:
+                self.interrupt()
+
+    def _dispatch_interrupts(self, events):
+        while True:
+            pin = events.get()
+            if pin is events:
+                return
+            callback = self._callback
+            if callback is not None:
+                callback(pin)
+
+    def add_interrupt_callback(self, callback):
+        self._callback = callback
+        if self._thread is None:
+            self._events = queue.Queue()
+            self._thread = threading.Thread(target=self._dispatch_interrupts, args=(self._events,),
+                                            name="rfm69-memory-irq", daemon=True)
+            self._thread.start()
+
+    def remove_interrupt_callback(self):
+        self._callback = None
+
+    def reset(self):
+        self.registers[REG_SYNCVALUE1] = 0x01
+
+    def close(self):
+        if self._thread is not None:
+            # Wake the dispatcher with its own queue as the stop marker. It is not joined
+            # because it may be blocked in a handler waiting on the radio's locks.
+            self._events.put(self._events)
+            self._thread = None
+            self._events = None
@@ -0,0 +1,77 @@
+# pylint: disable=missing-function-docstring
+"""Simulate a gateway and a number of nodes sharing one channel.
+
+Every node sends frames to the gateway with ``send(attempts=..., wait=...)``
+and the gateway acknowledges them automatically. Reports goodput and ack
+success so retry parameters can be compared as the number of nodes grows.
+
+Run from the repository root, for example
+``python -m benchmarks.bench_medium --nodes 20 --frames 10``.
+"""
+
+import argparse
+import random
+import threading
+import time
+
+from RFM69 import Radio, FREQ_868MHZ
+from RFM69.emulator import Emulator
+from RFM69.medium import Medium
+
+GATEWAY_ID = 1
+
+
+def run_node(radio, node_id, args, results):
+    rng = random.Random(node_id)
+    for counter in range(args.frames):
+        time.sleep(rng.uniform(0, args.interval))
+        payload = "node {} frame {}".format(node_id, counter).encode()
+        # Frames are sent raw, so the node writes the header itself and requests an ack
+        frame = bytes([len(payload) + 3, GATEWAY_ID, node_id, 0x40]) + payload
+        acked = radio.send(GATEWAY_ID, frame, attempts=args.attempts, wait=args.wait)
+        results.append(bool(acked))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--nodes', type=int, default=10)
+    parser.add_argument('--frames', type=int, default=10, help="frames sent by each node")
+    parser.add_argument('--interval', type=float, default=1.0, help="maximum random delay between frames, seconds")
+    parser.add_argument('--attempts', type=int, default=3)
+    parser.add_argument('--wait', type=int, help="milliseconds to wait for each ack, adaptive if omitted")
+    parser.add_argument('--loss', type=float, default=0.0, help="probability of a link losing a frame")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--time-scale', type=float, default=5.0,
+                        help="slow the emulated chips down so Python's latency matters less")
+    args = parser.parse_args()
+
+    medium = Medium(loss=args.loss, seed=args.seed)
+    gateway = Radio(FREQ_868MHZ, GATEWAY_ID, transport=medium.add(Emulator(time_scale=args.time_scale)))
+    nodes = [Radio(FREQ_868MHZ, node_id, transport=medium.add(Emulator(time_scale=args.time_scale)))
+             for node_id in range(2, args.nodes + 2)]
+    for radio in [gateway] + nodes:
+        radio.begin_receive()
+
+    results = []
+    threads = [threading.Thread(target=run_node, args=(radio, radio.address, args, results))
+               for radio in nodes]
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - start
+
+    received = {packet.payload for packet in gateway.get_packets()}
+    sent = args.nodes * args.frames
+    print("nodes:            {}".format(args.nodes))
+    print("frames sent:      {}".format(sent))
+    print("unique received:  {} ({:.1%})".format(len(received), len(received) / sent))
+    print("acked:            {} ({:.1%})".format(sum(results), sum(results) / sent))
+    print("goodput:          {:.1f} frames/s".format(len(received) / elapsed))
+    print("medium:           {}".format(medium.stats))
+    medium.close()
+
+
+if __name__ == '__main__':
+    main()
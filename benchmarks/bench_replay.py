@@ -0,0 +1,80 @@
+# pylint: disable=missing-function-docstring
+"""Replay recorded traffic into the driver and report how well it keeps up.
+
+Reads packets from a journal directory written by ``PacketJournal``, or a
+``to_binary`` capture file, or generates random traffic, and feeds them
+through ``RFM69.replay.replay`` once for each speed. A speed of ``max``
+delivers each frame as soon as the radio is ready, which gives the most
+the driver can ingest. Reports frames delivered and missed, the ingest
+rate and how the receive queue grew, optionally with a consumer that
+spends some time on each packet.
+
+Run from the repository root, for example
+``python -m benchmarks.bench_replay --journal /var/lib/gateway/journal --speed 1 10 max``.
+"""
+
+import argparse
+import random
+import time
+
+from RFM69 import Radio, Packet, FREQ_868MHZ
+from RFM69.journal import JournalReader
+from RFM69.packet import from_binary
+from RFM69.replay import ReplayTransport, replay, AS_FAST_AS_POSSIBLE
+
+
+def make_packets(count, rate, seed):
+    rng = random.Random(seed)
+    received = time.monotonic_ns()
+    packets = []
+    for _ in range(count):
+        # Poisson arrivals at rate packets a second
+        received += int(rng.expovariate(rate) * 1e9)
+        packets.append(Packet(1, rng.randrange(2, 255), -rng.randrange(30, 110),
+                              bytes(rng.randrange(256) for _ in range(rng.randrange(1, 60))), received))
+    return packets
+
+
+def load_packets(args):
+    if args.journal:
+        with JournalReader(args.journal) as reader:
+            return list(reader.scan())
+    if args.binary:
+        with open(args.binary, 'rb') as f:
+            return from_binary(f.read())
+    return make_packets(args.packets, args.rate, args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--journal', help="journal directory to replay")
+    source.add_argument('--binary', help="file of to_binary encoded packets to replay")
+    parser.add_argument('--packets', type=int, default=5000, help="packets to generate without a capture")
+    parser.add_argument('--rate', type=float, default=200, help="generated packets per second")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--speed', nargs='+', default=['max'], help="replay speeds, numbers or max")
+    parser.add_argument('--queue-size', type=int, default=1000, help="receive queue capacity")
+    parser.add_argument('--consumer-delay', type=float, default=None,
+                        help="seconds the consumer spends on each packet; no consumer by default")
+    args = parser.parse_args()
+
+    packets = load_packets(args)
+    consumer = None
+    if args.consumer_delay is not None:
+        consumer = lambda packet: time.sleep(args.consumer_delay)
+    print("{} packets over {:.1f} s".format(
+        len(packets), (packets[-1].received_ns - packets[0].received_ns) / 1e9 if packets else 0))
+    print("{:>6} {:>9} {:>9} {:>7} {:>11} {:>9} {:>10} {:>8} {:>12}".format(
+        "speed", "delivered", "missed", "seconds", "ingest/s", "max lag", "high water", "dropped", "growth/s"))
+    for speed in args.speed:
+        with Radio(FREQ_868MHZ, 1, transport=ReplayTransport(), promiscuousMode=True,
+                   receiveQueueSize=args.queue_size) as radio:
+            report = replay(radio, packets, AS_FAST_AS_POSSIBLE if speed == 'max' else float(speed), consumer)
+        print("{:>6} {:>9} {:>9} {:>7.2f} {:>11.0f} {:>8.1f}ms {:>10} {:>8} {:>12.1f}".format(
+            speed, report.delivered, report.missed, report.elapsed, report.ingest_rate, report.max_lag * 1e3,
+            report.queue_high_water, report.queue_dropped, report.queue_growth))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+# pylint: disable=missing-function-docstring,protected-access
+"""Measure the SPI cost and CPU time of the receive interrupt path.
+
+Run from the repository root with ``python -m benchmarks.bench_rx``.
+"""
+
+import time
+
+from RFM69 import Radio, FREQ_433MHZ
+from RFM69.transport import MemoryTransport
+from RFM69.registers import RF69_MODE_RX, REG_IRQFLAGS2, RF_IRQFLAGS2_PAYLOADREADY
+
+ITERATIONS = 10000
+
+
+def make_frame(sender, receiver, payload):
+    return bytes([len(payload) + 3, receiver, sender, 0]) + bytes(payload)
+
+
+def main():
+    spi = MemoryTransport()
+    radio = Radio(FREQ_433MHZ, 1, transport=spi)
+    frame = make_frame(2, 1, range(20))
+
+    radio.begin_receive()
+    spi.reset_counters()
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        spi.fifo[:] = frame
+        spi.registers[REG_IRQFLAGS2] |= RF_IRQFLAGS2_PAYLOADREADY
+        radio._interruptHandler(radio.intPin)
+        assert radio.mode == RF69_MODE_RX
+    elapsed = time.perf_counter() - start
+    received = len(radio.get_packets())
+
+    print("packets received:        {}".format(received))
+    print("SPI transactions/packet: {:.1f}".format(spi.transactions / ITERATIONS))
+    print("SPI bytes/packet:        {:.1f}".format(spi.bytes_transferred / ITERATIONS))
+    print("us/packet:               {:.1f}".format(elapsed / ITERATIONS * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+# pylint: disable=missing-function-docstring
+"""Compare the cost of serialising received packets.
+
+Encodes the same packets with ``str(packet)``, which goes through
+``to_dict``, ``strftime`` and ``json.dumps``, with the batch encoders
+``to_ndjson`` and ``to_binary``, and one at a time with ``to_bytes``, and
+decodes the binary blob again with ``from_binary``. Reports microseconds
+per packet and bytes per packet, and the memory the packets themselves
+take, as traced by ``tracemalloc``, per 100k packets.
+
+Run from the repository root, for example
+``python -m benchmarks.bench_serialize --packets 10000``.
+"""
+
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+
+from RFM69.packet import Packet, to_binary, from_binary, to_ndjson
+
+
+def make_packets(count, size, seed):
+    rng = random.Random(seed)
+    start = time.monotonic_ns()
+    # About 50 packets a second, so a batch spans a few minutes of traffic
+    return [Packet(1, rng.randrange(2, 255), -rng.randrange(30, 110), bytes(rng.randrange(256) for _ in range(size)),
+                   start + index * 20000000)
+            for index in range(count)]
+
+
+def measure_memory(count, size, seed):
+    """Returns the bytes allocated to hold count packets, payloads included"""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        packets = make_packets(count, size, seed)
+        return tracemalloc.get_traced_memory()[0] - before - sys.getsizeof(packets)
+    finally:
+        tracemalloc.stop()
+
+
+def measure(operation, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = operation()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--packets', type=int, default=10000)
+    parser.add_argument('--size', type=int, default=20, help="payload bytes per packet")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    packets = make_packets(args.packets, args.size, args.seed)
+    blob = to_binary(packets)
+    encoders = [
+        ("str(packet) per packet", lambda: "\n".join([str(packet) for packet in packets])),
+        ("to_ndjson batch", lambda: to_ndjson(packets)),
+        ("to_bytes per packet", lambda: b"".join([packet.to_bytes() for packet in packets])),
+        ("to_binary batch", lambda: to_binary(packets)),
+        ("from_binary batch", lambda: from_binary(blob)),
+    ]
+    baseline = None
+    print("{:<24} {:>10} {:>10} {:>9}".format("", "us/packet", "bytes", "speedup"))
+    for name, operation in encoders:
+        elapsed, result = measure(operation, args.repeat)
+        baseline = baseline or elapsed
+        size = len(result) if isinstance(result, (str, bytes)) else len(blob)
+        print("{:<24} {:>10.2f} {:>10.1f} {:>8.1f}x".format(
+            name, elapsed / args.packets * 1e6, size / args.packets, baseline / elapsed))
+    held = measure_memory(args.packets, args.size, args.seed)
+    print("packets held in memory: {:.1f} bytes/packet, {:.1f} MB per 100k packets".format(
+        held / args.packets, held / args.packets * 100000 / 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+# pylint: disable=missing-function-docstring,protected-access
+"""Measure per-operation SPI cost, receive latency and busy-wait CPU time as JSON.
+
+SPI transactions and bytes are counted on ``MemoryTransport``, where every
+wait completes instantly, so the figures are exact and repeatable. Receive
+latency is the time from a frame arriving to ``get_packet()`` returning it.
+Busy-wait figures run against the timed ``Emulator``: the process CPU time
+burnt while the chip settles, including the transmit thread's, is the cost
+of polling.
+
+Run from the repository root, for example
+``python -m benchmarks.bench_suite --output results.json``. Pass
+``--baseline old.json`` to exit with status 1 if any SPI count grew.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+from RFM69 import Radio, FREQ_433MHZ
+from RFM69.transport import MemoryTransport
+from RFM69.emulator import Emulator
+from RFM69.registers import RF69_MODE_STANDBY, REG_IRQFLAGS2, RF_IRQFLAGS2_PAYLOADREADY
+
+PAYLOAD = bytes([23, 1, 2, 0]) + bytes(range(20))
+
+
+def make_frame(sender, receiver, payload):
+    return bytes([len(payload) + 3, receiver, sender, 0]) + bytes(payload)
+
+
+def spi_cost(transport, operation, iterations, setup=None):
+    transactions = bytes_transferred = 0
+    for _ in range(iterations):
+        if setup is not None:
+            setup()
+        transport.reset_counters()
+        operation()
+        transactions += transport.transactions
+        bytes_transferred += transport.bytes_transferred
+    return {
+        'transactions': transactions / iterations,
+        'bytes': bytes_transferred / iterations,
+    }
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    def pick(fraction):
+        return samples[min(int(fraction * len(samples)), len(samples) - 1)]
+    return {
+        'p50': pick(0.50),
+        'p90': pick(0.90),
+        'p99': pick(0.99),
+        'max': samples[-1],
+        'mean': sum(samples) / len(samples),
+    }
+
+
+def measure_spi(iterations):
+    spi = MemoryTransport()
+    results = {'initialize': spi_cost(spi, lambda: Radio(FREQ_433MHZ, 1, transport=spi), 1)}
+    with Radio(FREQ_433MHZ, 1, transport=spi) as radio:
+        results['_initialize'] = spi_cost(spi, lambda: radio._initialize(FREQ_433MHZ, 1, 100), iterations)
+        # Interrupts are delivered by hand from here on so the counts don't depend on thread timing
+        spi.remove_interrupt_callback()
+        results['begin_receive'] = spi_cost(spi, radio.begin_receive, iterations,
+                                            setup=lambda: radio._setMode(RF69_MODE_STANDBY))
+        def send():
+            radio.send(2, PAYLOAD, attempts=1, require_ack=False)
+            # The PacketSent edge, which is handled once the radio is back in RX
+            radio._interruptHandler(radio.intPin)
+        results['send'] = spi_cost(spi, send, iterations)
+
+        frame = make_frame(2, 1, range(20))
+        def deliver():
+            spi.fifo[:] = frame
+            spi.registers[REG_IRQFLAGS2] |= RF_IRQFLAGS2_PAYLOADREADY
+            radio._interruptHandler(radio.intPin)
+        results['receive'] = spi_cost(spi, deliver, iterations, setup=radio.begin_receive)
+        radio.get_packets()
+    return results
+
+
+def measure_latency(iterations):
+    spi = MemoryTransport()
+    samples = []
+    with Radio(FREQ_433MHZ, 1, transport=spi) as radio:
+        frame = make_frame(2, 1, range(20))
+        for _ in range(iterations):
+            radio.begin_receive()
+            start = time.perf_counter()
+            spi.receive(frame)
+            packet = radio.get_packet(timeout=1)
+            samples.append((time.perf_counter() - start) * 1e6)
+            assert packet is not None
+    return percentiles(samples)
+
+
+def busy_wait(operation, iterations):
+    wall = cpu = 0
+    for _ in range(iterations):
+        startWall, startCpu = time.perf_counter(), time.process_time()
+        operation()
+        wall += time.perf_counter() - startWall
+        cpu += time.process_time() - startCpu
+    return {
+        'wall_ms': wall / iterations * 1e3,
+        'cpu_ms': cpu / iterations * 1e3,
+    }
+
+
+def measure_busy_wait(iterations):
+    emulator = Emulator()
+    results = {'initialize': busy_wait(lambda: Radio(FREQ_433MHZ, 1, transport=emulator), 1)}
+    with Radio(FREQ_433MHZ, 1, transport=emulator) as radio:
+        operations = {
+            '_initialize': lambda: radio._initialize(FREQ_433MHZ, 1, 100),
+            'send': lambda: radio.send(2, PAYLOAD, attempts=1, require_ack=False),
+            'read_temperature': radio.read_temperature,
+            'calibrate_radio': radio.calibrate_radio,
+            'sleep_to_standby': lambda: (radio.sleep(), radio._setMode(RF69_MODE_STANDBY)),
+        }
+        for name, operation in operations.items():
+            results[name] = busy_wait(operation, iterations)
+            emulator.reset_counters()
+            operation()
+            results[name]['transactions'] = emulator.transactions
+    return results
+
+
+def regressions(results, baseline):
+    found = []
+    for name, cost in baseline.get('spi', {}).items():
+        for key, value in cost.items():
+            current = results['spi'].get(name, {}).get(key)
+            if current is not None and current > value:
+                found.append("spi.{}.{}: {} -> {}".format(name, key, value, current))
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--latency-samples', type=int, default=1000)
+    parser.add_argument('--busy-wait-iterations', type=int, default=20)
+    parser.add_argument('--output', help="write the JSON to this file instead of stdout")
+    parser.add_argument('--baseline', help="JSON from an earlier run to check SPI counts against")
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with open(os.path.join(root, 'VERSION'), encoding='utf-8') as f:
+        version = f.read().strip()
+
+    results = {
+        'version': version,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'timestamp': time.time(),
+        'spi': measure_spi(args.iterations),
+        'receive_latency_us': measure_latency(args.latency_samples),
+        'busy_wait': measure_busy_wait(args.busy_wait_iterations),
+    }
+
+    text = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            found = regressions(results, json.load(f))
+        for line in found:
+            print("SPI regression " + line, file=sys.stderr)
+        sys.exit(1 if found else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+# pylint: disable=missing-function-docstring,protected-access
+"""Compare the old list-building frame construction with the preallocated transmit buffer.
+
+Run from the repository root with ``python -m benchmarks.bench_tx``.
+"""
+
+import timeit
+
+from RFM69 import Radio, FREQ_433MHZ
+from RFM69.transport import MemoryTransport
+from RFM69.registers import REG_FIFO
+
+ITERATIONS = 100000
+
+
+def legacy_frame(buff):
+    # Frame construction as done by _sendFrame before the transmit buffer was introduced
+    if isinstance(buff, str):
+        return [REG_FIFO | 0x80] + [int(ord(i)) for i in list(buff)]
+    if isinstance(buff, bytes):
+        return [REG_FIFO | 0x80] + list(buff)
+    return [REG_FIFO | 0x80] + buff
+
+
+def legacy_send(buff):
+    # spidev converts the list to a C buffer item by item, bytes() does the same work
+    return bytes(legacy_frame(buff))
+
+
+def buffered_send(radio, buff):
+    # writebytes2 reads the transmit buffer in place through the buffer protocol
+    return memoryview(radio._txBuffer)[:radio._fillTxBuffer(1, buff)]
+
+
+def main():
+    radio = Radio(FREQ_433MHZ, 1, transport=MemoryTransport())
+    payloads = {
+        'str': "temperature=21.5;humidity=40",
+        'bytes': bytes(range(28)),
+        'bytearray': bytearray(range(28)),
+        'memoryview': memoryview(bytes(range(28))),
+        'list': list(range(28)),
+    }
+    print("{:<12}{:>14}{:>14}".format("payload", "legacy us", "buffer us"))
+    for name, payload in payloads.items():
+        if name in ('bytearray', 'memoryview'):
+            legacy = float('nan')
+        else:
+            legacy = timeit.timeit(lambda p=payload: legacy_send(p), number=ITERATIONS)
+        current = timeit.timeit(lambda p=payload: buffered_send(radio, p), number=ITERATIONS)
+        print("{:<12}{:>14.3f}{:>14.3f}".format(name, legacy / ITERATIONS * 1e6, current / ITERATIONS * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -3,6 +3,7 @@
 import asyncio
 from aiohttp import ClientSession
 from RFM69 import Radio, FREQ_433MHZ
+from RFM69.aio import AsyncRadio
 
 async def call_API(url, packet):
     async with ClientSession() as session:
@@ -12,16 +13,14 @@ async def call_API(url, packet):
             print("Server responded", response)
 
 async def receiver(radio):
-    while True:
-        print("Receiver")
-        for packet in radio.get_packets():
-            print("Packet received", packet.to_dict())
-            await call_API("http://httpbin.org/post", packet)
-        await asyncio.sleep(10)
+    print("Receiver")
+    async for packet in radio.packets():
+        print("Packet received", packet.to_dict())
+        await call_API("http://httpbin.org/post", packet)
 
 async def send(radio, to, message):
     print ("Sending")
-    if radio.send(to, message, attempts=3, waitTime=100):
+    if await radio.send(to, message, attempts=3, wait=100):
         print ("Acknowledgement received")
     else:
         print ("No Acknowledgement")
@@ -35,13 +34,13 @@ async def pinger(radio):
         await asyncio.sleep(5)
 
 
-loop = asyncio.get_event_loop()
+async def main(radio):
+    async with AsyncRadio(radio) as aradio:
+        await asyncio.gather(receiver(aradio), pinger(aradio))
+
+
 node_id = 1
 network_id = 100
 with Radio(FREQ_433MHZ, node_id, network_id, isHighPower=True, verbose=False) as radio:
     print ("Started radio")
-    loop.create_task(receiver(radio))
-    loop.create_task(pinger(radio))
-    loop.run_forever()
-
-loop.close()
+    asyncio.run(main(radio))
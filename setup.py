@@ -77,7 +77,7 @@ setup(
     #
     # For an analysis of "install_requires" vs pip's requirements files see:
     # https://packaging.python.org/en/latest/requirements.html
-    install_requires=['spidev', 'RPI.GPIO'],  # Optional
+    install_requires=['spidev>=3.4', 'RPI.GPIO'],  # Optional
 
     # List additional groups of dependencies here (e.g. development
     # dependencies). Users will be able to install these using the "extras"
@@ -87,10 +87,9 @@ setup(
     #
     # Similar to `install_requires` above, these must be valid existing
     # projects.
-    # extras_require={  # Optional
-    #     'dev': ['check-manifest'],
-    #     'test': ['coverage'],
-    # },
+    extras_require={  # Optional
+        'gpiod': ['gpiod>=2.0'],
+    },
 
     # If there are data files included in your packages that need to be
     # installed, specify them here.
@@ -0,0 +1,172 @@
+# pylint: disable=missing-docstring,protected-access
+
+import time
+from RFM69 import Radio, FREQ_433MHZ
+from RFM69.acks import AckTracker, RttEstimator, CTL_ACK_SENT, CTL_ACK_REQUESTED, CTL_SEQUENCE
+from RFM69.registers import RF69_ACK_TIMEOUT_INITIAL_S, RF69_ACK_TIMEOUT_MIN_S
+from RFM69.emulator import Emulator
+from RFM69.medium import Medium
+from RFM69.transport import MemoryTransport
+
+
+def test_ack_matched_by_node_and_sequence():
+    tracker = AckTracker()
+    acked = []
+    for node in (2, 3):
+        sequence = tracker.next_sequence(node)
+        tracker.expect(node, sequence, acked.append)
+        tracker.sent(node, sequence, 10.0)
+    assert tracker.received(3, 1, 10.25) == (3, 1, 0.25, 1)
+    assert acked == [(3, 1, 0.25, 1)]
+    assert len(tracker) == 1
+
+def test_stale_ack_does_not_match_later_frame():
+    tracker = AckTracker()
+    acked = []
+    first = tracker.next_sequence(2)
+    tracker.expect(2, first, acked.append)
+    tracker.forget(2, first)
+    second = tracker.next_sequence(2)
+    tracker.expect(2, second, acked.append)
+    # The late ack for the frame that was given up on
+    assert tracker.received(2, first, 1.0) is None
+    assert tracker.unmatched == 1 and not acked
+    assert tracker.received(2, second, 1.0).sequence == second
+
+def test_unnumbered_ack_matches_only_unnumbered_frame():
+    tracker = AckTracker()
+    acked = []
+    tracker.expect(2, 5, acked.append)
+    assert tracker.received(2, 0, 1.0) is None
+    tracker.expect(2, 0, acked.append)
+    tracker.received(2, 0, 1.0)
+    assert [record.sequence for record in acked] == [0]
+
+def test_late_unnumbered_ack_ignored():
+    tracker = AckTracker()
+    acked = []
+    tracker.expect(2, 0, acked.append)
+    tracker.sent(2, 0, 1.0)
+    tracker.forget(2, 0)
+    tracker.expect(2, 0, acked.append)
+    tracker.sent(2, 0, 1.5)
+    # The first ack could be the late one for the frame that was given up on
+    assert tracker.received(2, 0, 1.6) is None
+    assert tracker.received(2, 0, 1.7).rtt == 1.7 - 1.5
+
+def test_sequence_wraps():
+    tracker = AckTracker()
+    assert [tracker.next_sequence(2) for _ in range(256)] == list(range(1, 256)) + [1]
+
+def test_framed_send_records_rtt():
+    medium = Medium()
+    with Radio(FREQ_433MHZ, 1, 100, transport=medium.add(Emulator()), rawFrames=False,
+               sequencePeers=[2]) as gateway, \
+            Radio(FREQ_433MHZ, 2, 100, transport=medium.add(Emulator())) as node:
+        node.begin_receive()
+        assert gateway.send(2, b"hello", attempts=2, wait=200)
+        # The numbered frame showed the node that the gateway reads the sequence byte
+        assert node.ack_tracker.sequenced_nodes == {1}
+        assert gateway.send(2, b"again", attempts=2, wait=200)
+        assert [packet.data_string for packet in node.get_packets()] == ["hello", "again"]
+        records = list(gateway.ack_tracker.records)
+        assert gateway.ack_tracker.rtt[2].samples == 2
+        assert [record.sequence for record in records] == [1, 2]
+        assert all(0 < record.rtt < 0.2 for record in records)
+        assert len(gateway.ack_tracker) == 0
+    medium.close()
+
+def test_raw_frames_numbered():
+    medium = Medium()
+    gatewayTransport = medium.add(Emulator())
+    with Radio(FREQ_433MHZ, 1, 100, transport=gatewayTransport, sequencePeers=[2]) as gateway, \
+            Radio(FREQ_433MHZ, 2, 100, transport=medium.add(Emulator())) as node:
+        node.begin_receive()
+        for _ in range(2):
+            assert gateway.send(2, bytes([6, 2, 1, 0x40]) + b"raw", attempts=2, wait=200)
+        # Node 3 isn't a peer, so its frame is sent as given
+        gateway.send(3, bytes([6, 3, 1, 0]) + b"raw", attempts=1, require_ack=False)
+        assert gatewayTransport.sent == [bytes([7, 2, 1, 0x40 | CTL_SEQUENCE, 1]) + b"raw",
+                                         bytes([7, 2, 1, 0x40 | CTL_SEQUENCE, 2]) + b"raw",
+                                         bytes([6, 3, 1, 0]) + b"raw"]
+        assert [packet.data_string for packet in node.get_packets()] == ["raw", "raw"]
+        assert [record.sequence for record in gateway.ack_tracker.records] == [1, 2]
+    medium.close()
+
+def test_acks_numbered_only_for_numbered_peers():
+    transport = MemoryTransport()
+    with Radio(FREQ_433MHZ, 1, 100, transport=transport) as radio:
+        # A LowPowerLab node gets the plain 4-byte ack
+        transport.receive(bytes([5, 1, 3, CTL_ACK_REQUESTED]) + b"hi")
+        assert radio.get_packet(timeout=2).sender == 3
+        assert wait_sent(transport, 1) == bytes([3, 3, 1, CTL_ACK_SENT])
+        # A node that numbers its frames has its number echoed
+        radio.begin_receive()
+        transport.receive(bytes([6, 1, 2, CTL_ACK_REQUESTED | CTL_SEQUENCE, 9]) + b"hi")
+        assert radio.get_packet(timeout=2).payload == b"hi"
+        assert wait_sent(transport, 2) == bytes([4, 2, 1, CTL_ACK_SENT | CTL_SEQUENCE, 9])
+        assert radio.ack_tracker.sequenced_nodes == {2}
+        # and an unnumbered frame from it gets an ack numbered 0
+        radio.begin_receive()
+        transport.receive(bytes([5, 1, 2, CTL_ACK_REQUESTED]) + b"ho")
+        assert radio.get_packet(timeout=2).payload == b"ho"
+        assert wait_sent(transport, 3) == bytes([4, 2, 1, CTL_ACK_SENT | CTL_SEQUENCE, 0])
+        # Acks sent with a payload stay plain
+        radio.send_ack(2, b"x")
+        assert transport.sent[3] == bytes([4, 2, 1, CTL_ACK_SENT]) + b"x"
+
+def wait_sent(transport, count):
+    deadline = time.monotonic() + 2
+    while len(transport.sent) < count and time.monotonic() < deadline:
+        time.sleep(0.001)
+    return transport.sent[count - 1]
+
+def test_lowpowerlab_frame_layout():
+    # LowPowerLab nodes keep the high bits of 10-bit target and sender IDs in CTL bits 3-2
+    # and 1-0, and never read or send the sequence byte
+    transport = MemoryTransport()
+    with Radio(FREQ_433MHZ, 1, 100, transport=transport, rawFrames=False) as radio:
+        # From node 300 (0x12C), asking for an ack
+        transport.receive(bytes([5, 1, 0x2C, CTL_ACK_REQUESTED | 0x01]) + b"hi")
+        packet = radio.get_packet(timeout=2)
+        assert (packet.receiver, packet.sender, packet.payload) == (1, 300, b"hi")
+        # The ack is addressed to 300, in the plain LowPowerLab layout
+        assert wait_sent(transport, 1) == bytes([3, 0x2C, 1, CTL_ACK_SENT | 0x04])
+        # For node 257, not for us
+        radio.begin_receive()
+        transport.receive(bytes([4, 1, 0x2C, 0x04 | 0x01, 7]))
+        assert radio.get_packet(timeout=0.1) is None
+        # Frames to 300 stay unnumbered, and its ack, with no sequence byte, matches
+        future = radio.send_async(300, b"yo", attempts=1, wait=1000)
+        assert wait_sent(transport, 2) == bytes([5, 0x2C, 1, CTL_ACK_REQUESTED | 0x04]) + b"yo"
+        radio.begin_receive()
+        transport.receive(bytes([3, 1, 0x2C, CTL_ACK_SENT | 0x01]))
+        assert future.result(2)
+        assert 300 not in radio.ack_tracker.sequenced_nodes
+
+def test_rtt_estimate():
+    estimator = RttEstimator()
+    assert estimator.timeout == RF69_ACK_TIMEOUT_INITIAL_S
+    estimator.sample(0.1)
+    assert (estimator.srtt, estimator.rttvar) == (0.1, 0.05)
+    assert abs(estimator.timeout - 0.3) < 1e-9
+    for _ in range(50):
+        estimator.sample(0.004)
+    assert abs(estimator.srtt - 0.004) < 1e-3
+    assert estimator.timeout == RF69_ACK_TIMEOUT_MIN_S
+
+def test_retransmitted_frames_not_sampled():
+    tracker = AckTracker()
+    tracker.expect(2, 1, lambda record: None)
+    tracker.sent(2, 1, 1.0)
+    tracker.sent(2, 1, 2.0)
+    assert tracker.received(2, 1, 2.01).attempts == 2
+    assert 2 not in tracker.rtt
+
+def test_wait_time_alias():
+    medium = Medium()
+    with Radio(FREQ_433MHZ, 1, 100, transport=medium.add(Emulator())) as radio:
+        start = time.monotonic()
+        assert not radio.send(9, bytes([4, 9, 1, 0x40, 0]), attempts=1, waitTime=150)
+        assert time.monotonic() - start >= 0.15
+    medium.close()
@@ -0,0 +1,70 @@
+# pylint: disable=missing-docstring,protected-access
+
+import asyncio
+from RFM69 import Radio, FREQ_433MHZ
+from RFM69.aio import AsyncRadio
+from RFM69.emulator import Emulator
+from RFM69.fragment import FragmentTransport
+from RFM69.medium import Medium
+from RFM69.transport import MemoryTransport
+
+
+def test_get_packet():
+    async def main(radio):
+        async with AsyncRadio(radio) as aradio:
+            assert await aradio.get_packet(timeout=0.05) is None
+            radio.transport.receive(bytes([8, 1, 2, 0]) + b"Apple")
+            packet = await aradio.get_packet(timeout=1)
+            assert packet.data_string == "Apple"
+
+    with Radio(FREQ_433MHZ, 1, 100, transport=MemoryTransport()) as radio:
+        asyncio.run(main(radio))
+
+def test_packets_iterator():
+    async def main(radio):
+        async with AsyncRadio(radio) as aradio:
+            received = []
+            radio.transport.receive(bytes([4, 1, 2, 0, 0]))
+            async for packet in aradio.packets():
+                received.append(packet.data[0])
+                if len(received) == 3:
+                    break
+                await asyncio.sleep(0.01) # Let the interrupt thread restart RX
+                radio.transport.receive(bytes([4, 1, 2, 0, len(received)]))
+            assert received == [0, 1, 2]
+
+    with Radio(FREQ_433MHZ, 1, 100, transport=MemoryTransport()) as radio:
+        asyncio.run(main(radio))
+
+def test_send_with_ack():
+    medium = Medium()
+    async def main(node):
+        async with AsyncRadio(node) as anode:
+            assert await anode.send(1, bytes([8, 1, 2, 0x40]) + b"Apple", attempts=3, wait=100)
+            assert await anode.send(3, bytes([8, 3, 2, 0x40]) + b"Apple", attempts=2, wait=20) is False
+
+    with Radio(FREQ_433MHZ, 1, 100, transport=medium.add(Emulator())) as gateway, \
+            Radio(FREQ_433MHZ, 2, 100, transport=medium.add(Emulator())) as node:
+        asyncio.run(main(node))
+        assert gateway.get_packet(timeout=1).data_string == "Apple"
+    medium.close()
+
+def test_close_keeps_other_packet_sinks():
+    async def main(radio):
+        # Closing restores the layer underneath
+        with FragmentTransport(radio) as fragments:
+            async with AsyncRadio(radio):
+                pass
+            assert radio._packetSink is fragments._sink
+        assert radio._packetSink is None
+        # A layer added on top stays, and packets it passes on are queued once closed
+        aradio = AsyncRadio(radio)
+        with FragmentTransport(radio) as fragments:
+            aradio.close()
+            assert radio._packetSink is fragments._sink
+            radio.transport.receive(bytes([8, 1, 2, 0]) + b"Apple")
+            await asyncio.sleep(0.05)
+            assert radio.get_packet(timeout=1).data_string == "Apple"
+
+    with Radio(FREQ_433MHZ, 1, 100, transport=MemoryTransport()) as radio:
+        asyncio.run(main(radio))
@@ -0,0 +1,59 @@
+# pylint: disable=missing-docstring,protected-access
+
+from RFM69 import Radio, FREQ_433MHZ
+from RFM69.dedup import DuplicateFilter
+from RFM69.emulator import Emulator
+from RFM69.medium import Medium
+from RFM69.transport import MemoryTransport
+
+
+def test_duplicate_recognised():
+    dedup = DuplicateFilter()
+    assert not dedup.seen(2, 1, b"hello", 1.0)
+    assert dedup.seen(2, 1, b"hello", 1.5)
+    assert not dedup.seen(3, 1, b"hello", 1.5)
+    assert dedup.duplicates == 1
+
+def test_duplicate_expires():
+    dedup = DuplicateFilter(expiry=1)
+    dedup.seen(2, 1, b"hello", 1.0)
+    assert not dedup.seen(2, 1, b"hello", 2.5)
+
+def test_wrapped_sequence_with_new_payload():
+    dedup = DuplicateFilter()
+    dedup.seen(2, 1, [1, 2, 3], 1.0)
+    assert not dedup.seen(2, 1, [4, 5, 6], 1.1)
+
+def test_capacity():
+    dedup = DuplicateFilter(capacity=2)
+    for sequence in (1, 2, 3):
+        dedup.seen(2, sequence, b"", 1.0)
+    assert len(dedup) == 2
+    # The oldest entry was discarded
+    assert not dedup.seen(2, 1, b"", 1.0)
+
+def test_retransmission_acked_but_not_queued():
+    medium = Medium()
+    sender, receiver = medium.add(Emulator()), medium.add(Emulator())
+    with Radio(FREQ_433MHZ, 1, 100, transport=sender, rawFrames=False, sequencePeers=[2]) as gateway, \
+            Radio(FREQ_433MHZ, 2, 100, transport=receiver) as node:
+        node.begin_receive()
+        # Every ack is lost, so each attempt is retransmitted
+        medium.set_link(receiver, sender, loss=1, symmetric=False)
+        assert not gateway.send(2, b"once", attempts=3, wait=50)
+        assert [packet.data_string for packet in node.get_packets()] == ["once"]
+        assert node.duplicate_filter.duplicates == 2
+        assert medium.stats['transmitted'] == 6
+    medium.close()
+
+def test_unnumbered_repeats_queued():
+    transport = MemoryTransport()
+    with Radio(FREQ_433MHZ, 1, 100, transport=transport) as radio:
+        # A LowPowerLab node 258 sending the same reading twice, its ID's high bits in the CTL byte
+        for _ in range(2):
+            radio.begin_receive()
+            transport.receive(bytes([5, 1, 2, 0x02]) + b"21")
+            assert radio.get_packet(timeout=2).payload == b"21"
+        assert radio.duplicate_filter.duplicates == 0
+    with Radio(FREQ_433MHZ, 1, 100, transport=MemoryTransport(), sequenceHeader=False) as radio:
+        assert radio.duplicate_filter is None
@@ -0,0 +1,78 @@
+# pylint: disable=missing-docstring,protected-access
+
+import math
+import time
+import pytest
+from RFM69 import Radio, FREQ_433MHZ, DutyCycleExceededError
+from RFM69.dutycycle import DutyCycleBudget, SubBand, frame_airtime, REJECT, SUB_BANDS_868
+from RFM69.emulator import Emulator
+
+PAYLOAD = bytes([23, 2, 1, 0]) + bytes(20)
+
+
+def test_frame_airtime():
+    assert frame_airtime(10, 8000) == (3 + 2 + 10 + 2) * 8 / 8000
+    assert frame_airtime(10, 8000, preamble=4, sync=0, crc=False) == 14 * 8 / 8000
+    # Encrypted frames are padded to a 16 byte block after the length byte
+    assert frame_airtime(10, 8000, aes=True) == frame_airtime(17, 8000)
+
+def test_radio_airtime_matches_emulator():
+    emulator = Emulator()
+    with Radio(FREQ_433MHZ, 1, transport=emulator) as radio:
+        assert radio.airtime(len(PAYLOAD)) == pytest.approx(emulator.airtime(len(PAYLOAD)))
+        radio._encrypt("sampleEncryptKey")
+        assert radio.airtime(len(PAYLOAD)) == pytest.approx(emulator.airtime(len(PAYLOAD)))
+
+def test_sliding_window():
+    budget = DutyCycleBudget([SubBand(100, 200, 0.1)], window=10)
+    assert budget.reserve(150, 0.6, now=0) == 0
+    assert budget.remaining(150, now=1) == pytest.approx(0.4)
+    # The frame fits once the first one has left the window
+    assert budget.reserve(150, 0.6, now=1) == 9
+    assert budget.delayed == 1
+    assert budget.remaining(150, now=10) == 1
+    assert budget.reserve(150, 0.6, now=10) == 0
+    # Outside every sub-band nothing is limited
+    assert budget.reserve(300, 100, now=10) == 0
+    assert budget.remaining(300) == math.inf
+
+def test_868_sub_bands():
+    budget = DutyCycleBudget()
+    assert budget.band(868300000).limit == 0.01
+    assert budget.band(869525000).limit == 0.1
+    assert budget.budget(868300000) == 36
+    assert budget.band(868650000) is None
+    assert len(SUB_BANDS_868) == 6
+
+def test_reject_policy():
+    budget = DutyCycleBudget([SubBand(100, 200, 0.1)], window=10, policy=REJECT)
+    budget.reserve(150, 0.6, now=0)
+    with pytest.raises(DutyCycleExceededError):
+        budget.reserve(150, 0.6, now=1)
+    assert budget.rejected == 1
+
+def test_send_rejected_over_budget():
+    window = 60
+    with Radio(FREQ_433MHZ, 1, transport=Emulator()) as radio:
+        # Room for two and a half frames, in a window long enough that none leaves it during the test
+        band = SubBand(430000000, 440000000, 2.5 * radio.airtime(len(PAYLOAD)) / window)
+        radio.duty_cycle = DutyCycleBudget([band], window=window, policy=REJECT)
+        radio.send(2, PAYLOAD, attempts=1, require_ack=False)
+        radio.broadcast(PAYLOAD)
+        assert radio.remaining_airtime() < radio.airtime(len(PAYLOAD))
+        with pytest.raises(DutyCycleExceededError):
+            radio.broadcast(PAYLOAD)
+
+def test_send_delayed_over_budget():
+    window = 0.2
+    with Radio(FREQ_433MHZ, 1, transport=Emulator()) as radio:
+        assert radio.remaining_airtime() == math.inf
+        limit = 2.5 * radio.airtime(len(PAYLOAD)) / window
+        radio.duty_cycle = DutyCycleBudget([SubBand(430000000, 440000000, limit)], window=window)
+        start = time.monotonic()
+        futures = [radio.send_async(2, PAYLOAD, attempts=1, require_ack=False) for _ in range(3)]
+        for future in futures:
+            future.result(timeout=1)
+        # The third frame waits for the first to leave the window
+        assert time.monotonic() - start >= window * 0.9
+        assert radio.duty_cycle.delayed >= 1
@@ -0,0 +1,130 @@
+# pylint: disable=missing-docstring,protected-access
+
+import sys
+import threading
+import time
+import pytest
+from RFM69 import Radio, RadioTimeoutError, FREQ_915MHZ
+from RFM69.registers import *
+from RFM69.acks import CTL_ACK_SENT
+from RFM69.emulator import Emulator
+from RFM69.transport import MemoryTransport
+
+
+def make_radio(**kwargs):
+    return Radio(FREQ_915MHZ, 1, 100, transport=Emulator(**kwargs), encryptionKey="sampleEncryptKey")
+
+def test_mode_ready_timing():
+    emulator = Emulator(time_scale=100)
+    emulator.write_register(REG_OPMODE, RF_OPMODE_SEQUENCER_ON | RF_OPMODE_RECEIVER)
+    assert not emulator.read_register(REG_IRQFLAGS1) & RF_IRQFLAGS1_MODEREADY
+    time.sleep(0.05)
+    flags = emulator.read_register(REG_IRQFLAGS1)
+    assert flags & RF_IRQFLAGS1_MODEREADY and flags & RF_IRQFLAGS1_RXREADY
+    emulator.close()
+
+def test_fifo_overrun():
+    emulator = Emulator()
+    emulator.write_burst(REG_FIFO, [1] * (RF69_FIFO_SIZE + 1))
+    flags = emulator.read_register(REG_IRQFLAGS2)
+    assert flags & RF_IRQFLAGS2_FIFOFULL and flags & RF_IRQFLAGS2_FIFOOVERRUN
+    emulator.write_register(REG_IRQFLAGS2, RF_IRQFLAGS2_FIFOOVERRUN)
+    assert not emulator.read_register(REG_IRQFLAGS2) & RF_IRQFLAGS2_FIFONOTEMPTY
+    emulator.close()
+
+def test_read_temperature():
+    with make_radio(temperature=31) as radio:
+        assert radio.read_temperature() == 31
+
+def test_send_waits_for_airtime():
+    with make_radio() as radio:
+        frame = bytes([20, 2, 1, 0]) + bytes(17)
+        start = time.monotonic()
+        assert radio.send(2, frame, attempts=1, require_ack=False) is None
+        elapsed = time.monotonic() - start
+        assert radio.transport.sent == [frame]
+        # 3 preamble, 2 sync, 21 frame padded for AES to 33, 2 CRC bytes at 55.5 kbps
+        assert radio.transport.airtime(len(frame)) < elapsed < 0.5
+        assert radio.mode == RF69_MODE_RX
+
+def test_receive_packet():
+    with make_radio(rssi=-72) as radio:
+        time.sleep(0.01) # Wait for RxReady
+        radio.transport.receive(bytes([8, 1, 2, 0]) + b"Apple", key=b"sampleEncryptKey")
+        packet = radio.get_packet(timeout=1)
+        assert packet.data_string == "Apple"
+        assert packet.RSSI == -72
+
+def test_receive_wrong_key_is_ignored():
+    with make_radio() as radio:
+        time.sleep(0.01)
+        radio.transport.receive(bytes([8, 1, 2, 0]) + b"Apple", key=None)
+        assert radio.get_packet(timeout=0.2) is None
+
+def test_listen_mode_send_burst():
+    with make_radio() as radio:
+        radio.listen_mode_set_durations(256, 100000)
+        radio.listen_mode_send_burst(2, "listen mode test")
+        sent = radio.transport.sent
+        assert len(sent) > 1
+        assert sent[0][0] == len("listen mode test") + 4
+        assert sent[0][5:] == b"listen mode test"
+        assert radio.mode == RF69_MODE_RX
+        assert radio.transport.registers[REG_SYNCVALUE2] == 100
+        assert radio.wait_stats['fifo_empty']['waits'] == len(sent)
+
+def test_listen_mode_send_burst_times_out(monkeypatch):
+    monkeypatch.setattr('RFM69.radio.RF69_TX_LIMIT_S', 0.05)
+    # The memory transport never sends what follows the first frame, so the FIFO stays full
+    with Radio(FREQ_915MHZ, 1, 100, transport=MemoryTransport()) as radio:
+        radio.listen_mode_set_durations(256, 100000)
+        with pytest.raises(RadioTimeoutError):
+            radio.listen_mode_send_burst(2, "listen mode test")
+        assert radio.wait_stats['fifo_empty']['timeouts'] == 1
+        assert radio.mode == RF69_MODE_RX
+
+def test_waits_back_off(monkeypatch):
+    # Without the initial spin, whose poll count depends on the machine's speed
+    monkeypatch.setattr('RFM69.radio.RF69_WAIT_SPIN_S', 0)
+    with make_radio(time_scale=100) as radio:
+        # The emulated measurement takes 10ms, which a busy loop would poll thousands of times
+        radio.wait_stats.clear()
+        assert radio.read_temperature() == 25
+        stats = radio.wait_stats['temperature']
+        assert stats['waits'] == 1 and stats['timeouts'] == 0
+        assert 0.005 < stats['time'] < 0.1
+        assert stats['polls'] < 50
+
+def test_wait_timeout():
+    with make_radio() as radio:
+        with pytest.raises(RadioTimeoutError):
+            radio._waitFor('test', lambda: False, 0.01)
+        assert radio.wait_stats['test']['timeouts'] == 1
+
+def test_wait_stats_from_many_threads():
+    def wait():
+        for _ in range(500):
+            radio._waitFor('test', lambda: True, 1)
+    # Switch threads as often as possible to give lost updates a chance
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        with make_radio() as radio:
+            threads = [threading.Thread(target=wait) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            assert radio.wait_stats['test']['waits'] == radio.wait_stats['test']['polls'] == 4000
+    finally:
+        sys.setswitchinterval(interval)
+
+def test_send_ack_gives_up_on_busy_channel(monkeypatch):
+    monkeypatch.setattr('RFM69.radio.RF69_CSMA_LIMIT_S', 0.05)
+    with make_radio() as radio:
+        radio.transport.channel_rssi = -40
+        radio.begin_receive()
+        time.sleep(0.01)
+        radio.send_ack(2)
+        assert radio.wait_stats['csma']['timeouts'] == 1
+        assert radio.transport.sent[-1][:4] == bytes([3, 2, 1, CTL_ACK_SENT])
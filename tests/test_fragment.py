@@ -0,0 +1,134 @@
+# pylint: disable=missing-docstring,protected-access
+
+import os
+import queue
+import time
+import pytest
+from RFM69 import Radio, FREQ_433MHZ
+from RFM69.emulator import Emulator
+from RFM69.fragment import FragmentTransport, FRAG_DATA, FRAG_POLL
+from RFM69.medium import Medium
+from RFM69.transmit import PRIORITY_BULK
+from RFM69.transport import MemoryTransport
+
+
+def fragment(frameType, messageId, index, count, chunk=b"x"):
+    return bytes([frameType, messageId, index >> 8, index & 0xFF, count >> 8, count & 0xFF]) + chunk
+
+def test_message_over_lossy_link():
+    medium = Medium(loss=0.1, seed=3)
+    message = os.urandom(3000)
+    with Radio(FREQ_433MHZ, 1, 100, transport=medium.add(Emulator())) as gateway, \
+            Radio(FREQ_433MHZ, 2, 100, transport=medium.add(Emulator())) as node, \
+            FragmentTransport(gateway) as sender, FragmentTransport(node) as receiver:
+        node.begin_receive()
+        assert sender.send(2, message)
+        received = receiver.get_message(timeout=1)
+        assert received.sender == 1 and received.data == message
+        assert sender.stats['sent'] == 55
+        assert sender.stats['retransmitted'] > 0
+        # SACKs keep the retransmissions to about the frames lost, not whole windows
+        assert sender.stats['retransmitted'] < 30
+    medium.close()
+
+def test_other_packets_pass_through():
+    medium = Medium()
+    with Radio(FREQ_433MHZ, 1, 100, transport=medium.add(Emulator())) as gateway, \
+            Radio(FREQ_433MHZ, 2, 100, transport=medium.add(Emulator())) as node, \
+            FragmentTransport(node):
+        node.begin_receive()
+        gateway.send(2, bytes([8, 2, 1, 0]) + b"Apple", attempts=1, require_ack=False)
+        assert node.get_packet(timeout=1).data_string == "Apple"
+    medium.close()
+
+def test_reassembly_limits():
+    chunk = b"x" * 55
+    with Radio(FREQ_433MHZ, 1, 100, transport=MemoryTransport()) as radio:
+        receiver = FragmentTransport(radio, maxMessage=1000, maxBuffered=1500, timeout=60)
+        receiver._onFragment(2, fragment(FRAG_DATA, 0, 0, 100, chunk))
+        assert receiver.stats['refused'] == 1
+        receiver._onFragment(2, fragment(FRAG_DATA, 0, 0, 10, chunk))
+        receiver._onFragment(3, fragment(FRAG_DATA, 0, 0, 10, chunk))
+        # Room for a third message is made by evicting the least recently active one
+        receiver._onFragment(4, fragment(FRAG_DATA, 0, 0, 10, chunk))
+        assert receiver.stats['evicted'] == 1
+        assert list(receiver._reassembly) == [3, 4]
+        receiver._onFragment(5, fragment(FRAG_POLL, 0, 0, 1, b"done"))
+        assert receiver.get_message(timeout=0) == (5, b"done")
+        receiver.close()
+
+def test_reassembly_timeout():
+    with Radio(FREQ_433MHZ, 1, 100, transport=MemoryTransport()) as radio:
+        receiver = FragmentTransport(radio, timeout=0)
+        receiver._onFragment(2, fragment(FRAG_DATA, 0, 0, 2))
+        receiver._onFragment(3, fragment(FRAG_DATA, 0, 0, 2))
+        assert receiver.stats['expired'] == 1
+        receiver.close()
+
+def test_reservation_follows_sender_fragment_size():
+    with Radio(FREQ_433MHZ, 1, 100, transport=MemoryTransport()) as radio:
+        receiver = FragmentTransport(radio, maxBuffered=500, timeout=60)
+        # Senders with 20 byte fragments need 200 bytes each, not 10 of this end's 55
+        receiver._onFragment(2, fragment(FRAG_DATA, 0, 0, 10, b"x" * 20))
+        receiver._onFragment(3, fragment(FRAG_DATA, 0, 0, 10, b"x" * 20))
+        assert receiver._buffered == 400 and not receiver.stats['evicted']
+        # Only a short last fragment: at most a full frame for each of the others, until one arrives
+        receiver._onFragment(4, fragment(FRAG_DATA, 0, 2, 3, b"x" * 5))
+        assert receiver._buffered == 200 + 2 * 55 + 5 and receiver.stats['evicted'] == 1
+        receiver._onFragment(4, fragment(FRAG_DATA, 0, 0, 3, b"x" * 30))
+        assert receiver._buffered == 200 + 90
+        receiver.close()
+
+def test_completed_message_id_reused():
+    with Radio(FREQ_433MHZ, 1, 100, transport=MemoryTransport()) as radio:
+        receiver = FragmentTransport(radio, timeout=60)
+        receiver._onFragment(2, fragment(FRAG_POLL, 7, 0, 1, b"first"))
+        # The poll again, after its SACK was lost
+        receiver._onFragment(2, fragment(FRAG_POLL, 7, 0, 1, b"first"))
+        # The sender restarted and reused the ID, for a message with another count or contents
+        receiver._onFragment(2, fragment(FRAG_POLL, 7, 0, 1, b"second"))
+        receiver._onFragment(2, fragment(FRAG_DATA, 7, 0, 2, b"th"))
+        receiver._onFragment(2, fragment(FRAG_POLL, 7, 1, 2, b"ird"))
+        assert [receiver.get_message(timeout=0).data for _ in range(3)] == [b"first", b"second", b"third"]
+        assert receiver.get_message(timeout=0) is None
+        receiver.close()
+
+def test_completed_messages_forgotten():
+    with Radio(FREQ_433MHZ, 1, 100, transport=MemoryTransport()) as radio:
+        receiver = FragmentTransport(radio, timeout=0)
+        receiver._onFragment(2, fragment(FRAG_POLL, 7, 0, 1, b"once"))
+        receiver._onFragment(3, fragment(FRAG_POLL, 7, 0, 1, b"other"))
+        assert not receiver._completed.get(2)
+        receiver.close()
+
+def test_sender_restart():
+    medium = Medium()
+    with Radio(FREQ_433MHZ, 1, 100, transport=medium.add(Emulator())) as gateway, \
+            Radio(FREQ_433MHZ, 2, 100, transport=medium.add(Emulator())) as node, \
+            FragmentTransport(node) as receiver:
+        node.begin_receive()
+        first = FragmentTransport(gateway)
+        assert first.send(2, b"before the restart")
+        first.close()
+        restarted = FragmentTransport(gateway)
+        # The worst case: numbering starts again at the ID the receiver completed last
+        restarted._messageIds[2] = (first._messageIds[2] - 1) & 0xFF
+        assert restarted.send(2, b"after the restart!")
+        assert receiver.get_message(timeout=1).data == b"before the restart"
+        assert receiver.get_message(timeout=1).data == b"after the restart!"
+        restarted.close()
+    medium.close()
+
+def test_transmit_queue_full():
+    with Radio(FREQ_433MHZ, 1, 100, transport=MemoryTransport(), txQueueDepths={PRIORITY_BULK: 2}) as radio:
+        sender = FragmentTransport(radio, window=8)
+        # Hold up the transmit thread so the fragments pile up in the queue
+        with radio._spiLock:
+            with pytest.raises(queue.Full):
+                sender.send(2, b"x" * 500)
+            assert not sender._transfers
+        # What was queued of the message is dropped, at most the fragment already being sent goes out
+        time.sleep(0.1)
+        assert len(radio.transport.sent) <= 1
+        sender.close()
+        assert radio._packetSink is None
@@ -0,0 +1,129 @@
+# pylint: disable=missing-docstring
+
+import os
+import threading
+from RFM69 import Packet
+from RFM69.journal import PacketJournal, JournalReader, INDEX_ENTRY, SEGMENT_MAGIC
+
+
+def make_packets(count, start=0):
+    return [Packet(1, 2 + index % 5, -60 - index % 40, bytes([index % 256]) * (index % 30),
+                   1000000000 + (start + index) * 1000000)
+            for index in range(count)]
+
+def key(packet):
+    return packet.received_wall_ns, packet.sender, packet.RSSI, packet.payload
+
+def test_append_and_scan(tmp_path):
+    packets = make_packets(100)
+    with PacketJournal(str(tmp_path), syncEvery=16, indexInterval=8) as journal:
+        for packet in packets:
+            journal.append(packet)
+        assert journal.syncs >= 6
+    with JournalReader(str(tmp_path)) as reader:
+        assert [key(packet) for packet in reader.scan()] == [key(packet) for packet in packets]
+    assert os.path.getsize(str(tmp_path / '00000000.idx')) == 13 * INDEX_ENTRY.size
+
+def test_reopen_continues(tmp_path):
+    packets = make_packets(30)
+    with PacketJournal(str(tmp_path)) as journal:
+        for packet in packets[:20]:
+            journal.append(packet)
+    with PacketJournal(str(tmp_path)) as journal:
+        for packet in packets[20:]:
+            journal.append(packet)
+    with JournalReader(str(tmp_path)) as reader:
+        assert [key(packet) for packet in reader.scan()] == [key(packet) for packet in packets]
+
+def test_segments_rotate(tmp_path):
+    packets = make_packets(500)
+    with PacketJournal(str(tmp_path), segmentSize=4096) as journal:
+        for packet in packets:
+            journal.append(packet)
+    assert len([name for name in os.listdir(str(tmp_path)) if name.endswith('.seg')]) > 3
+    with JournalReader(str(tmp_path)) as reader:
+        assert [key(packet) for packet in reader.scan()] == [key(packet) for packet in packets]
+
+def test_scan_by_time_and_sender(tmp_path):
+    packets = make_packets(300)
+    with PacketJournal(str(tmp_path), segmentSize=8192, indexInterval=16) as journal:
+        for packet in packets:
+            journal.append(packet)
+    start, end = packets[100].received_wall_ns, packets[150].received_wall_ns
+    with JournalReader(str(tmp_path)) as reader:
+        assert [key(packet) for packet in reader.scan(start, end)] == [key(packet) for packet in packets[100:150]]
+        assert [key(packet) for packet in reader.scan(sender=3)] == \
+            [key(packet) for packet in packets if packet.sender == 3]
+        assert [key(packet) for packet in reader.scan(start, end, sender=4)] == \
+            [key(packet) for packet in packets[100:150] if packet.sender == 4]
+        assert not list(reader.scan(sender=9))
+
+def test_scan_after_clock_step_back(tmp_path):
+    # NTP steps the clock back 5 s halfway through the first index block
+    second = 1000000000
+    times = [10 * second + index for index in range(4)] + [5 * second + index for index in range(4)] + \
+        [20 * second + index for index in range(8)]
+    packets = [Packet(1, 2, -60, bytes([index]), received_wall_ns=wallNs) for index, wallNs in enumerate(times)]
+    with PacketJournal(str(tmp_path), indexInterval=8) as journal:
+        for packet in packets:
+            journal.append(packet)
+    with JournalReader(str(tmp_path)) as reader:
+        assert [key(packet) for packet in reader.scan(5 * second, 6 * second)] == \
+            [key(packet) for packet in packets[4:8]]
+        assert [key(packet) for packet in reader.scan(10 * second, 11 * second)] == \
+            [key(packet) for packet in packets[:4]]
+        assert not list(reader.scan(11 * second, 20 * second))
+
+def test_scan_by_10_bit_sender(tmp_path):
+    packets = [Packet(1, sender, -60, b"x", 1000000000 + index) for index, sender in enumerate((2, 258, 2, 770))]
+    with PacketJournal(str(tmp_path), indexInterval=2) as journal:
+        for packet in packets:
+            journal.append(packet)
+    with JournalReader(str(tmp_path)) as reader:
+        # 258 shares its low byte, and so its index bit, with 2
+        assert [packet.sender for packet in reader.scan(sender=258)] == [258]
+        assert [packet.sender for packet in reader.scan(sender=2)] == [2, 2]
+
+def test_torn_record_discarded(tmp_path):
+    packets = make_packets(10)
+    with PacketJournal(str(tmp_path)) as journal:
+        for packet in packets:
+            journal.append(packet)
+        end = journal._offset # pylint: disable=protected-access
+    with open(str(tmp_path / '00000000.seg'), 'r+b') as f:
+        # Damage the payload of the last record, as if it hadn't reached the card
+        f.seek(end - 1)
+        f.write(b"\xff")
+    with PacketJournal(str(tmp_path)) as journal:
+        journal.append(packets[9])
+    with JournalReader(str(tmp_path)) as reader:
+        assert [key(packet) for packet in reader.scan()] == [key(packet) for packet in packets]
+    with open(str(tmp_path / '00000000.seg'), 'rb') as f:
+        assert f.read(len(SEGMENT_MAGIC)) == SEGMENT_MAGIC
+
+def test_tail_follows_writer(tmp_path):
+    packets = make_packets(200)
+    journal = PacketJournal(str(tmp_path), segmentSize=2048, syncEvery=1)
+    journal.append(packets[0])
+    followed = []
+    reader = JournalReader(str(tmp_path))
+    tail = reader.tail(fromStart=True, poll=0.001, timeout=2)
+    thread = threading.Thread(target=lambda: followed.extend(packet for _, packet in zip(range(200), tail)))
+    thread.start()
+    for packet in packets[1:]:
+        journal.append(packet)
+    thread.join(5)
+    journal.close()
+    reader.close()
+    assert [key(packet) for packet in followed] == [key(packet) for packet in packets]
+
+def test_tail_starts_at_end(tmp_path):
+    packets = make_packets(20)
+    with PacketJournal(str(tmp_path)) as journal:
+        for packet in packets[:10]:
+            journal.append(packet)
+        with JournalReader(str(tmp_path)) as reader:
+            tail = reader.tail(poll=0.001, timeout=0.05)
+            journal.append(packets[10])
+            assert key(next(tail)) == key(packets[10])
+            assert not list(tail)
@@ -0,0 +1,64 @@
+# pylint: disable=missing-docstring,protected-access
+
+import os
+import time
+import pytest
+from RFM69 import Radio, FREQ_915MHZ
+from RFM69.registers import *
+from RFM69.emulator import Emulator
+from RFM69.fragment import FragmentTransport
+from RFM69.medium import Medium
+
+
+def make_radio(medium, node_id, **kwargs):
+    return Radio(FREQ_915MHZ, node_id, 100, transport=medium.add(Emulator()), longPackets=True, **kwargs)
+
+def test_long_frame_round_trip():
+    medium = Medium()
+    payload = os.urandom(RF69_LONG_MAX_DATA_LEN)
+    with make_radio(medium, 1, rawFrames=False) as sender, make_radio(medium, 2) as receiver:
+        receiver.begin_receive()
+        time.sleep(0.01)
+        assert sender.send(2, payload, attempts=2, wait=200)
+        packet = receiver.get_packet(timeout=1)
+        assert bytes(packet.data) == payload
+        assert len(sender.transport.sent[0]) == RF69_LONG_PACKET_LEN + 1
+        assert sender.transport.underruns == 0
+    medium.close()
+
+def test_short_frames_in_long_mode():
+    medium = Medium()
+    with make_radio(medium, 1) as sender, make_radio(medium, 2) as receiver:
+        receiver.begin_receive()
+        time.sleep(0.01)
+        sender.send(2, bytes([8, 2, 1, 0]) + b"Apple", attempts=1, require_ack=False)
+        assert receiver.get_packet(timeout=1).data_string == "Apple"
+    medium.close()
+
+def test_back_to_back_long_frames():
+    medium = Medium()
+    message = os.urandom(2000)
+    with make_radio(medium, 1) as gateway, make_radio(medium, 2) as node, \
+            FragmentTransport(gateway) as sender, FragmentTransport(node) as receiver:
+        node.begin_receive()
+        assert sender.send(2, message)
+        assert receiver.get_message(timeout=1).data == message
+        # 246 byte fragments, all received first time
+        assert sender.stats['sent'] == 9 and not sender.stats['retransmitted']
+    medium.close()
+
+def test_fifo_underrun():
+    # At the power on bitrate of 4.8 kbps the FIFO's worth takes 110ms to send
+    emulator = Emulator(time_scale=0.1)
+    emulator.write_register(REG_OPMODE, RF_OPMODE_SEQUENCER_ON | RF_OPMODE_TRANSMITTER)
+    # A 100 byte frame, of which only the FIFO's worth is ever written
+    emulator.write_burst(REG_FIFO, [100] + [0] * (RF69_FIFO_SIZE - 1))
+    time.sleep(0.05)
+    assert emulator.underruns == 1
+    assert emulator.read_register(REG_IRQFLAGS2) & RF_IRQFLAGS2_PACKETSENT
+    assert not emulator.sent
+    emulator.close()
+
+def test_no_encryption_with_long_packets():
+    with pytest.raises(ValueError):
+        Radio(FREQ_915MHZ, 1, 100, transport=Emulator(), longPackets=True, encryptionKey="sampleEncryptKey")
@@ -0,0 +1,78 @@
+# pylint: disable=missing-docstring,protected-access
+
+import time
+from RFM69 import Radio, FREQ_915MHZ
+from RFM69.registers import *
+from RFM69.emulator import Emulator
+from RFM69.medium import Medium
+
+
+def make_radio(medium, node_id, **kwargs):
+    return Radio(FREQ_915MHZ, node_id, 100, transport=medium.add(Emulator(**kwargs)))
+
+def test_frame_reaches_other_radio():
+    medium = Medium(rssi=-70)
+    with make_radio(medium, 1) as gateway, make_radio(medium, 2) as node:
+        gateway.begin_receive()
+        time.sleep(0.01)
+        node.send(1, bytes([8, 1, 2, 0]) + b"Apple", attempts=1, require_ack=False)
+        packet = gateway.get_packet(timeout=1)
+        assert packet.data_string == "Apple"
+        assert packet.RSSI == -70
+        assert medium.stats['transmitted'] == 1
+    medium.close()
+
+def test_different_network_is_not_heard():
+    medium = Medium()
+    with make_radio(medium, 1) as gateway:
+        node = Radio(FREQ_915MHZ, 2, 101, transport=medium.add(Emulator()))
+        gateway.begin_receive()
+        time.sleep(0.01)
+        node.send(1, bytes([8, 1, 2, 0]) + b"Apple", attempts=1, require_ack=False)
+        assert gateway.get_packet(timeout=0.2) is None
+        node._shutdown()
+    medium.close()
+
+def test_collision():
+    medium = Medium()
+    a, b, c = (medium.add(Emulator()) for _ in range(3))
+    c.write_register(REG_OPMODE, RF_OPMODE_SEQUENCER_ON | RF_OPMODE_RECEIVER)
+    time.sleep(0.01)
+    for emulator in (a, b):
+        medium.begin(emulator)
+    medium.end(a, bytes([3, 1, 2, 0]), None)
+    medium.end(b, bytes([3, 1, 3, 0]), None)
+    assert medium.stats['collisions'] == 2
+    assert medium.stats['delivered'] == 0
+    for emulator in (a, b, c):
+        emulator.close()
+    medium.close()
+
+def test_capture_effect():
+    medium = Medium()
+    a, b, c = (medium.add(Emulator()) for _ in range(3))
+    medium.set_link(a, c, rssi=-40)
+    medium.set_link(b, c, rssi=-80)
+    c.write_register(REG_OPMODE, RF_OPMODE_SEQUENCER_ON | RF_OPMODE_RECEIVER)
+    time.sleep(0.01)
+    for emulator in (a, b):
+        medium.begin(emulator)
+    medium.end(a, bytes([3, 1, 2, 0]), None)
+    assert medium.stats['delivered'] == 1
+    for emulator in (a, b, c):
+        emulator.close()
+    medium.close()
+
+def test_carrier_sense_sees_busy_channel():
+    medium = Medium(rssi=-50)
+    a, b = medium.add(Emulator()), medium.add(Emulator())
+    b.write_register(REG_RSSICONFIG, RF_RSSI_START)
+    assert b.read_register(REG_RSSIVALUE) == 220
+    medium.begin(a)
+    b.write_register(REG_RSSICONFIG, RF_RSSI_START)
+    assert b.read_register(REG_RSSIVALUE) == 100
+    medium.abort(a)
+    assert medium.stats['aborted'] == 1
+    a.close()
+    b.close()
+    medium.close()
@@ -0,0 +1,109 @@
+# pylint: disable=missing-docstring,wildcard-import,unused-wildcard-import
+
+import time
+import pytest
+from RFM69 import Radio, FREQ_433MHZ, FREQ_868MHZ
+from RFM69.modem import compile_profile, get_profile, PRESETS
+from RFM69.registers import *
+from RFM69.emulator import Emulator
+from RFM69.medium import Medium
+
+
+def test_compile_matches_default_settings():
+    profile = compile_profile(55555, 50000, FREQ_433MHZ)
+    registers = profile.registers
+    assert (registers[REG_BITRATEMSB], registers[REG_BITRATELSB]) == (RF_BITRATEMSB_55555, RF_BITRATELSB_55555)
+    assert (registers[REG_FDEVMSB], registers[REG_FDEVLSB]) == (RF_FDEVMSB_50000, RF_FDEVLSB_50000)
+    assert registers[REG_PACKETCONFIG2] & 0xF0 == RF_PACKET2_RXRESTARTDELAY_2BITS
+    assert registers[REG_TESTDAGC] == RF_DAGC_IMPROVED_LOWBETA0
+
+@pytest.mark.parametrize('name', list(PRESETS))
+def test_presets_pass_the_signal(name):
+    for band in (FREQ_433MHZ, FREQ_868MHZ):
+        profile = get_profile(name, band)
+        bitrate, fdev = PRESETS[name]
+        assert abs(profile.bitrate - bitrate) / bitrate < 0.01
+        assert abs(profile.fdev - fdev) / fdev < 0.01
+        # Half the Carson bandwidth fits in the receiver and AFC bandwidths
+        assert profile.rxbw >= profile.fdev + profile.bitrate / 2
+        assert profile.afcbw >= profile.rxbw
+
+def test_narrowest_bandwidth_chosen():
+    profile = compile_profile(4800, 5000, FREQ_433MHZ)
+    # 7.4 kHz of signal plus 8.7 kHz of crystal offset
+    assert profile.rxbw == 32e6 / (24 * 2 ** 6)
+    assert profile.registers[REG_RXBW] == RF_RXBW_DCCFREQ_010 | RF_RXBW_MANT_24 | RF_RXBW_EXP_4
+
+def test_limits():
+    with pytest.raises(ValueError):
+        compile_profile(300000, 400000)
+    # The modulation index must be from 0.5 to 10
+    compile_profile(2400, 600)
+    compile_profile(1200, 6000)
+    with pytest.raises(ValueError):
+        compile_profile(100000, 10000)
+    with pytest.raises(ValueError):
+        compile_profile(1200, 10000)
+    with pytest.raises(ValueError):
+        compile_profile(600000, 150000)
+    with pytest.raises(ValueError):
+        get_profile('1M')
+
+def test_radio_with_preset():
+    medium = Medium()
+    with Radio(FREQ_433MHZ, 1, transport=medium.add(Emulator()), modemProfile='300k') as sender, \
+            Radio(FREQ_433MHZ, 2, transport=medium.add(Emulator()), modemProfile='300k') as receiver, \
+            Radio(FREQ_433MHZ, 3, transport=medium.add(Emulator())) as other:
+        assert abs(sender.transport.bitrate() - 300000) < 1000
+        receiver.begin_receive()
+        other.begin_receive()
+        assert sender.send(2, bytes([5, 2, 1, 0x40, 1, 2]), attempts=2)
+        assert [packet.data for packet in receiver.get_packets()] == [[1, 2]]
+        # A receiver at another bitrate hears nothing
+        assert not other.get_packets()
+    medium.close()
+
+def test_apply_profile_writes_only_changes():
+    emulator = Emulator()
+    with Radio(FREQ_433MHZ, 1, transport=emulator, modemProfile='55.5k') as radio:
+        radio.begin_receive()
+        emulator.reset_counters()
+        radio.apply_profile('200k')
+        assert abs(emulator.bitrate() - 200000) < 1000
+        assert radio.mode == RF69_MODE_RX
+        # A check for a frame waiting in the FIFO, three bursts for BitRate to Fdev, RxBw and AfcBw,
+        # and PacketConfig2, then standby and back to RX
+        assert emulator.transactions == 8
+        emulator.reset_counters()
+        radio.apply_profile('200k')
+        assert emulator.transactions == 0
+
+def test_apply_profile_keeps_pending_frame():
+    emulator = Emulator(time_scale=0)
+    with Radio(FREQ_433MHZ, 1, transport=emulator, modemProfile='55.5k') as radio:
+        # The frame arrives, but its interrupt hasn't been handled when the profile is switched
+        emulator.remove_interrupt_callback()
+        radio.begin_receive()
+        emulator.receive(bytes([6, 1, 2, 0x40, 1, 2, 3]))
+        assert emulator.registers[REG_IRQFLAGS2] & RF_IRQFLAGS2_PAYLOADREADY
+        radio.apply_profile('200k')
+        assert abs(emulator.bitrate() - 200000) < 1000
+        assert radio.mode == RF69_MODE_RX
+        assert [packet.data for packet in radio.get_packets()] == [[1, 2, 3]]
+        # and it is acknowledged
+        deadline = time.monotonic() + 2
+        while not emulator.sent and time.monotonic() < deadline:
+            time.sleep(0.001)
+        assert emulator.sent == [bytes([3, 2, 1, 0x80])]
+
+def test_switch_profiles_at_runtime():
+    medium = Medium()
+    with Radio(FREQ_433MHZ, 1, transport=medium.add(Emulator())) as sender, \
+            Radio(FREQ_433MHZ, 2, transport=medium.add(Emulator())) as receiver:
+        receiver.begin_receive()
+        for profile in ('200k', '4.8k', '55.5k'):
+            receiver.apply_profile(profile)
+            sender.apply_profile(profile)
+            assert sender.send(2, bytes([5, 2, 1, 0x40, 1, 2]), attempts=3)
+            assert [packet.data for packet in receiver.get_packets()] == [[1, 2]]
+    medium.close()
@@ -1,6 +1,11 @@
 # pylint: disable=missing-docstring
 
+import json
+import time
+import pytest
+from datetime import datetime, timedelta, timezone
 from RFM69 import Packet
+from RFM69.packet import HEADER, to_binary, from_binary, to_ndjson
 
 def test_packet():
     # Data corresponds to the string "this is a test"
@@ -10,3 +15,62 @@ def test_packet():
     assert packet.data_string == "this is a test"
     print(repr(packet))
     print(str(packet))
+
+def test_compact_packet():
+    before = time.time()
+    packet = Packet(1, 2, -10, b"Apple")
+    assert packet.payload == b"Apple"
+    assert packet.data == [65, 112, 112, 108, 101]
+    packet.data.append(1)
+    assert packet.data == [65, 112, 112, 108, 101]
+    assert packet.to_bytes().endswith(b"Apple")
+    assert packet.data_string == "Apple"
+    assert abs(packet.received_wall_ns / 1e9 - before) < 1
+    assert abs((packet.received - datetime(1970, 1, 1)).total_seconds() - before) < 1
+    assert packet.to_dict()['data'] == packet.data
+    packet.data = [1, 2]
+    assert packet.payload == bytes([1, 2]) and packet.data == [1, 2]
+
+def test_received_setter():
+    packet = Packet(1, 2, -10, b"Apple")
+    packet.received = datetime(2024, 5, 6, 7, 8, 9, 123456)
+    assert packet.received == datetime(2024, 5, 6, 7, 8, 9, 123456)
+    assert packet.received_wall_ns == 1714979289123456000
+    assert Packet.from_bytes(packet.to_bytes()).received == packet.received
+    packet.received = datetime(2024, 5, 6, 9, 8, 9, 123456, timezone(timedelta(hours=2)))
+    assert packet.received == datetime(2024, 5, 6, 7, 8, 9, 123456)
+
+def test_wall_clock_read_per_packet(monkeypatch):
+    before = Packet(1, 2, -10, b"")
+    # Step the system clock forward an hour, as NTP might after boot
+    timeNs = time.time_ns
+    monkeypatch.setattr(time, 'time_ns', lambda: timeNs() + 3600 * 10**9)
+    after = Packet(1, 2, -10, b"")
+    assert after.received_ns - before.received_ns < 10**9
+    assert after.received_wall_ns - before.received_wall_ns > 3599 * 10**9
+    assert abs((after.received - before.received).total_seconds() - 3600) < 1
+    assert abs(Packet(1, 2, -10, b"", after.received_ns).received_wall_ns - after.received_wall_ns) < 10**9
+
+def test_binary_round_trip():
+    packets = [Packet(1, 2, -70, b"Apple"), Packet(0, 255, -128, b""), Packet(3, 4, 0, bytes(range(252))),
+               Packet(1, 1023, -50, b"10-bit")]
+    blob = to_binary(packets)
+    assert len(blob) == 4 * HEADER.size + 5 + 252 + 6
+    assert blob[:HEADER.size + 5] == packets[0].to_bytes()
+    for decoded, packet in zip(from_binary(blob), packets):
+        assert (decoded.receiver, decoded.sender, decoded.RSSI, decoded.payload, decoded.received_wall_ns) == \
+            (packet.receiver, packet.sender, packet.RSSI, packet.payload, packet.received_wall_ns)
+        assert abs(decoded.received_ns - packet.received_ns) < 10**9
+    assert Packet.from_bytes(blob, HEADER.size + 5).sender == 255
+    with pytest.raises(ValueError):
+        from_binary(blob[:-1])
+
+def test_ndjson():
+    packets = [Packet(1, 2, -70, b"Apple"), Packet(3, 4, -90, b"", Packet(1, 2, 0, b"").received_ns + 1500000000)]
+    lines = to_ndjson(packets).splitlines()
+    assert len(lines) == 2
+    for line, packet in zip(lines, packets):
+        decoded = json.loads(line)
+        expected = packet.to_dict()
+        assert decoded.pop('received') == expected.pop('received').strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+        assert decoded == expected
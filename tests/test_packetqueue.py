@@ -0,0 +1,66 @@
+# pylint: disable=missing-docstring,protected-access
+
+import warnings
+import pytest
+from RFM69 import Radio, FREQ_433MHZ
+from RFM69.packet import Packet
+from RFM69.packetqueue import PacketQueue, DROP_NEWEST, SENDER_QUOTA
+from RFM69.transport import MemoryTransport
+
+
+def packet(sender, n=0):
+    return Packet(1, sender, -60, [n])
+
+def test_drop_oldest():
+    queue = PacketQueue(3)
+    for n in range(5):
+        assert queue.append(packet(2, n))
+    assert [p.data[0] for p in queue.drain()] == [2, 3, 4]
+    assert queue.dropped == 2
+    assert queue.dropped_by_sender == {2: 2}
+    assert queue.high_water == 3
+
+def test_drop_newest():
+    queue = PacketQueue(3, DROP_NEWEST)
+    results = [queue.append(packet(2, n)) for n in range(5)]
+    assert results == [True, True, True, False, False]
+    assert [queue.popleft().data[0] for _ in range(3)] == [0, 1, 2]
+    assert len(queue) == 0
+
+def test_sender_quota():
+    queue = PacketQueue(10, SENDER_QUOTA, sender_quota=2)
+    for n in range(5):
+        queue.append(packet(7, n))
+    assert queue.append(packet(3))
+    assert [p.sender for p in queue] == [7, 7, 3]
+    assert queue.dropped_by_sender == {7: 3}
+    queue.popleft()
+    assert queue.append(packet(7, 9))
+
+def test_invalid_policy():
+    with pytest.raises(ValueError):
+        PacketQueue(10, 'drop_random')
+
+def test_radio_receive_queue_bound():
+    with Radio(FREQ_433MHZ, 1, 100, transport=MemoryTransport(), receiveQueueSize=2) as radio:
+        radio.transport.remove_interrupt_callback()
+        for n in range(4):
+            radio.begin_receive()
+            radio.transport.receive(bytes([4, 1, 2, 0, n]))
+            radio._interruptHandler(radio.intPin)
+        assert radio.num_packets() == 2
+        assert radio.receive_queue.dropped == 2
+        assert radio.get_packet().data == [2]
+        assert [p.data for p in radio.get_packets()] == [[3]]
+        assert not radio.has_received_packet()
+
+def test_deprecated_packets_is_a_list():
+    with Radio(FREQ_433MHZ, 1, 100, transport=MemoryTransport()) as radio:
+        radio._queuePacket(packet(2, 9))
+        radio._queuePacket(packet(3, 10))
+        with warnings.catch_warnings(record=True):
+            packets = radio.packets
+        assert isinstance(packets, list)
+        assert len(packets) == 2 and packets[0].data == [9] and [p.sender for p in packets[1:]] == [3]
+        packets.clear()
+        assert radio.num_packets() == 2
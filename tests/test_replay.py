@@ -0,0 +1,65 @@
+# pylint: disable=missing-docstring
+
+import pytest
+from RFM69 import Radio, Packet, FREQ_868MHZ
+from RFM69.packet import to_binary, from_binary
+from RFM69.transport import MemoryTransport
+from RFM69.replay import ReplayTransport, replay, AS_FAST_AS_POSSIBLE
+
+
+def make_packets(count, spacing=1000000, receiver=1):
+    return [Packet(receiver, 2 + index % 5, -40 - index % 60, bytes([index % 256]) * (index % 50), index * spacing)
+            for index in range(count)]
+
+def key(packet):
+    return packet.receiver, packet.sender, packet.RSSI, packet.payload
+
+def test_as_fast_as_possible():
+    packets = make_packets(500)
+    with Radio(FREQ_868MHZ, 1, transport=ReplayTransport()) as radio:
+        report = replay(radio, packets, AS_FAST_AS_POSSIBLE)
+        assert (report.offered, report.delivered, report.missed) == (500, 500, 0)
+        assert report.queue_high_water == 500
+        assert report.ingest_rate > 0
+        assert report.queue_samples[-1][1] == 500
+        assert [key(packet) for packet in radio.get_packets()] == [key(packet) for packet in packets]
+
+def test_paced_replay():
+    packets = make_packets(20, spacing=50000000)
+    with Radio(FREQ_868MHZ, 1, transport=ReplayTransport()) as radio:
+        report = replay(radio, packets, speed=10)
+        # 19 gaps of 5 ms
+        assert 0.09 < report.elapsed < 1
+        assert report.delivered + report.missed == 20
+        assert len(radio.get_packets()) == report.delivered
+
+def test_frame_missed_when_not_receiving():
+    transport = ReplayTransport()
+    with Radio(FREQ_868MHZ, 1, transport=transport) as radio:
+        radio.sleep()
+        assert not transport.deliver(bytes([4, 1, 2, 0, 7]), -50)
+        assert transport.missed == 1
+        radio.begin_receive()
+        assert transport.deliver(bytes([4, 1, 2, 0, 7]), -50)
+        assert transport.wait_ready(1)
+        assert [key(packet) for packet in radio.get_packets()] == [(1, 2, -50, bytes([7]))]
+
+def test_consumer_and_address_filter():
+    packets = from_binary(to_binary(make_packets(100) + make_packets(50, receiver=9)))
+    consumed = []
+    with Radio(FREQ_868MHZ, 1, transport=ReplayTransport()) as radio:
+        report = replay(radio, packets, AS_FAST_AS_POSSIBLE, consumer=consumed.append)
+        assert report.delivered == 150
+    assert [key(packet) for packet in consumed] == [key(packet) for packet in packets[:100]]
+    consumed.clear()
+    with Radio(FREQ_868MHZ, 1, transport=ReplayTransport(), promiscuousMode=True) as radio:
+        replay(radio, packets, AS_FAST_AS_POSSIBLE, consumer=consumed.append)
+    assert len(consumed) == 150
+
+def test_invalid_arguments():
+    with Radio(FREQ_868MHZ, 1, transport=ReplayTransport()) as radio:
+        with pytest.raises(ValueError):
+            replay(radio, [], speed=0)
+    with Radio(FREQ_868MHZ, 1, transport=MemoryTransport()) as radio:
+        with pytest.raises(ValueError):
+            replay(radio, [])
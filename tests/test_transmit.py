@@ -0,0 +1,104 @@
+# pylint: disable=missing-docstring,protected-access
+
+import queue
+import time
+import pytest
+from RFM69 import Radio, RadioTimeoutError, FREQ_433MHZ
+from RFM69.transmit import TxScheduler, _Request, PRIORITY_ACK, PRIORITY_CONTROL, PRIORITY_DATA, PRIORITY_BULK
+from RFM69.emulator import Emulator
+from RFM69.medium import Medium
+from RFM69.transport import MemoryTransport
+
+
+def test_send_async_without_ack():
+    with Radio(FREQ_433MHZ, 1, 100, transport=MemoryTransport()) as radio:
+        futures = [radio.send_async(2, bytes([4, 2, 1, 0, n]), attempts=1, require_ack=False)
+                   for n in range(3)]
+        assert [future.result(timeout=1) for future in futures] == [None] * 3
+        assert [frame[4] for frame in radio.transport.sent] == [0, 1, 2]
+
+def test_send_async_fan_out():
+    medium = Medium()
+    nodes = [Radio(FREQ_433MHZ, node, 100, transport=medium.add(Emulator())) for node in (2, 3, 4)]
+    with Radio(FREQ_433MHZ, 1, 100, transport=medium.add(Emulator())) as gateway:
+        for node in nodes:
+            node.begin_receive()
+        futures = [gateway.send_async(node, bytes([4, node, 1, 0x40, 0]), attempts=2, wait=100)
+                   for node in (2, 3, 4, 9)]
+        assert [future.result(timeout=5) for future in futures] == [True, True, True, False]
+    for node in nodes:
+        node._shutdown()
+    medium.close()
+
+def test_shutdown_fails_pending_sends():
+    radio = Radio(FREQ_433MHZ, 1, 100, transport=MemoryTransport())
+    future = radio.send_async(2, b"hello", attempts=1, require_ack=True, wait=10000)
+    radio._shutdown()
+    with pytest.raises(RuntimeError):
+        future.result(timeout=1)
+
+def request(priority, deadline=None):
+    return _Request(2, b"", 1, 50, False, priority, deadline)
+
+def test_scheduler_priority_order():
+    scheduler = TxScheduler()
+    for priority in (PRIORITY_DATA, PRIORITY_BULK, PRIORITY_ACK, PRIORITY_CONTROL, PRIORITY_DATA):
+        scheduler.push(request(priority))
+    order = [scheduler.pop().priority for _ in range(5)]
+    assert order == [PRIORITY_ACK, PRIORITY_CONTROL, PRIORITY_DATA, PRIORITY_DATA, PRIORITY_BULK]
+    assert scheduler.pop() is None
+
+def test_scheduler_depth():
+    scheduler = TxScheduler({PRIORITY_BULK: 1})
+    scheduler.push(request(PRIORITY_BULK))
+    with pytest.raises(queue.Full):
+        scheduler.push(request(PRIORITY_BULK))
+    scheduler.push(request(PRIORITY_DATA))
+    assert scheduler.rejected[PRIORITY_BULK] == 1
+    assert len(scheduler) == 2
+
+def test_scheduler_drops_expired_frames():
+    scheduler = TxScheduler()
+    late = request(PRIORITY_DATA, deadline=time.monotonic() - 1)
+    scheduler.push(late)
+    assert scheduler.pop() is None
+    assert scheduler.expired[PRIORITY_DATA] == 1
+    with pytest.raises(RadioTimeoutError):
+        late.future.result(timeout=0)
+
+def test_acks_not_delayed_by_retries():
+    medium = Medium()
+    with Radio(FREQ_433MHZ, 1, 100, transport=medium.add(Emulator())) as gateway, \
+            Radio(FREQ_433MHZ, 2, 100, transport=medium.add(Emulator())) as node:
+        # The gateway keeps retrying a node that isn't there
+        dead = gateway.send_async(9, bytes([4, 9, 1, 0x40, 0]), attempts=5, wait=200)
+        time.sleep(0.02)
+        assert node.send(1, bytes([4, 1, 2, 0x40, 0]), attempts=1, wait=100)
+        assert not dead.done()
+        assert gateway.get_packet(timeout=1).sender == 2
+    medium.close()
+
+def test_scheduler_holds_frames_to_busy_nodes():
+    scheduler = TxScheduler()
+    frames = [_Request(node, b"", 1, 50, False, PRIORITY_DATA, None) for node in (2, 3, 2, 4)]
+    for frame in frames:
+        scheduler.push(frame)
+    ack = _Request(2, b"", 1, 50, False, PRIORITY_ACK, None)
+    scheduler.push(ack)
+    assert [scheduler.pop(busy={2}) for _ in range(4)] == [ack, frames[1], frames[3], None]
+    assert [scheduler.pop() for _ in range(3)] == [frames[0], frames[2], None]
+
+def test_send_async_does_not_wait_for_other_nodes_acks():
+    medium = Medium()
+    with Radio(FREQ_433MHZ, 1, 100, transport=medium.add(Emulator())) as gateway, \
+            Radio(FREQ_433MHZ, 2, 100, transport=medium.add(Emulator())) as node:
+        node.begin_receive()
+        # Node 9 isn't there, so its frame waits the whole second for an ack
+        dead = gateway.send_async(9, bytes([4, 9, 1, 0x40, 0]), attempts=1, wait=1000)
+        start = time.monotonic()
+        assert gateway.send_async(2, bytes([4, 2, 1, 0x40, 7]), attempts=1, wait=1000).result(timeout=5)
+        assert time.monotonic() - start < 0.5
+        assert node.get_packet(timeout=1).payload == bytes([7])
+        assert not dead.done()
+        assert dead.result(timeout=5) is False
+    medium.close()
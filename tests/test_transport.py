@@ -0,0 +1,89 @@
+# pylint: disable=missing-docstring,protected-access
+
+from RFM69 import Radio, FREQ_433MHZ
+from RFM69.registers import *
+from RFM69.transport import MemoryTransport
+
+
+def make_radio(**kwargs):
+    transport = MemoryTransport()
+    return Radio(FREQ_433MHZ, 1, 100, transport=transport, **kwargs), transport
+
+def test_memory_transport_registers():
+    transport = MemoryTransport()
+    transport.write_burst(REG_FRFMSB, [0x6C, 0x40, 0x00])
+    assert transport.read_burst(REG_FRFMSB, 3) == [0x6C, 0x40, 0x00]
+    assert transport.read_register(REG_FRFMID) == 0x40
+    assert transport.transactions == 3
+    assert transport.bytes_transferred == 4 + 4 + 2
+
+def test_init_configures_radio():
+    radio, transport = make_radio()
+    assert transport.registers[REG_SYNCVALUE2] == 100
+    assert transport.registers[REG_NODEADRS] == 1
+    assert radio.get_frequency_in_Hz() == 433000000
+
+def test_register_cache():
+    radio, transport = make_radio()
+    transport.reset_counters()
+    hits = radio.register_cache_hits
+    radio.set_power_level(50)
+    assert transport.transactions == 1
+    assert radio.register_cache_hits == hits + 1
+    assert transport.registers[REG_PALEVEL] & 0x1F == 16
+
+def test_register_cache_disabled():
+    radio, transport = make_radio(registerCache=False)
+    transport.reset_counters()
+    radio.set_power_level(50)
+    assert transport.transactions == 2
+    assert radio.register_cache_hits == 0
+
+def test_set_frequency_is_one_burst():
+    radio, transport = make_radio()
+    transport.reset_counters()
+    radio.set_frequency_in_Hz(868000000)
+    assert transport.transactions == 1
+    assert radio.get_frequency_in_Hz() == 868000000
+
+def test_send_raw_frame():
+    with Radio(FREQ_433MHZ, 1, 100, transport=MemoryTransport()) as radio:
+        assert radio.send(2, bytearray(b"\x05\x02\x01\x00hi"), attempts=1, require_ack=False) is None
+        assert radio.send(2, memoryview(b"x" * 100), attempts=1, require_ack=False) is None
+        assert radio.transport.sent == [b"\x05\x02\x01\x00hi", b"x" * RF69_FIFO_SIZE]
+
+def test_receive_packet():
+    with Radio(FREQ_433MHZ, 1, 100, transport=MemoryTransport()) as radio:
+        radio.transport.registers[REG_RSSIVALUE] = 120
+        radio.transport.receive(bytes([8, 1, 2, 0]) + b"Apple")
+        packet = radio.get_packet(timeout=5)
+        assert packet.data_string == "Apple"
+        assert packet.sender == 2
+        assert packet.RSSI == -60
+        assert radio.mode == RF69_MODE_RX
+
+def test_receive_ignores_other_nodes():
+    with Radio(FREQ_433MHZ, 1, 100, transport=MemoryTransport()) as radio:
+        radio.transport.receive(bytes([8, 7, 2, 0]) + b"Apple")
+        assert radio.get_packet(timeout=0.2) is None
+
+def test_receive_longest_frame():
+    with Radio(FREQ_433MHZ, 1, 100, transport=MemoryTransport()) as radio:
+        radio.transport.receive(bytes([66, 1, 2, 0]) + bytes(range(63)))
+        assert radio.get_packet(timeout=5).payload == bytes(range(63))
+
+def test_receive_reads_only_the_frame():
+    with Radio(FREQ_433MHZ, 1, 100, transport=MemoryTransport()) as radio:
+        transport = radio.transport
+        transport.remove_interrupt_callback()
+        cost = []
+        for payload in (b"", b"hi", bytes(40)):
+            radio.begin_receive()
+            transport.receive(bytes([len(payload) + 3, 1, 2, 0]) + payload)
+            transport.reset_counters()
+            radio._interruptHandler(radio.intPin)
+            cost.append((transport.transactions, transport.bytes_transferred))
+        assert [packet.payload for packet in radio.get_packets()] == [b"", b"hi", bytes(40)]
+        # The payload is a second transfer of exactly its own length
+        assert cost[1] == (cost[0][0] + 1, cost[0][1] + 3)
+        assert cost[2] == (cost[1][0], cost[1][1] + 38)